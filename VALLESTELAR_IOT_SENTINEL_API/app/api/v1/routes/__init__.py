@@ -24,6 +24,8 @@ from .daily_metric_router import router as daily_metric_router
 from .security_mode_router import router as security_mode_router
 from .energy_system_router import router as energy_system_router
 
+from .metrics_router import router as metrics_router
+
 
 
 all_routers = [
@@ -52,4 +54,6 @@ all_routers = [
 
     security_mode_router,
     energy_system_router,
+
+    metrics_router,
 ]
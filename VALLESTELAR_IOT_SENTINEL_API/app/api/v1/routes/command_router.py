@@ -3,12 +3,14 @@ from __future__ import annotations
 from typing import Optional, Sequence
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from tortoise.exceptions import IntegrityError
 
 from app.models.entities import Command
 from app.services.generic_service import GenericService
+from app.dbs.postgres.generic_repository import CountMode
 from app.services.service_factory import service_factory
+from app.services.command_service import CommandService
 
 from app.schemas.command_schema import (
     CommandCreate,
@@ -17,14 +19,26 @@ from app.schemas.command_schema import (
     CommandPage,
     PageMeta,
 )
+from app.schemas.bulk_schema import (
+    MAX_BULK_ITEMS,
+    BulkDeleteResult,
+    BulkIds,
+    BulkUpdate,
+    BulkUpdateResult,
+    bulk_changes,
+)
 
 from app.core.auth.dependencies import require_access_token
 # router = APIRouter(prefix="/api/v1/commands", tags=["Commands"], dependencies=[Depends(require_access_token())])
 router = APIRouter(prefix="/api/v1/commands", tags=["Commands"])
 
+# changes of PATCH /bulk: every field optional, unique-key columns rejected
+CommandBulkChanges = bulk_changes(CommandUpdate, Command)
+
 
-async def get_command_service() -> GenericService[Command]:
-    return service_factory.get(Command)
+async def get_command_service() -> CommandService:
+    # queued commands wake the dispatcher (NOTIFY), see services/command_service.py
+    return service_factory.get(Command)  # type: ignore[return-value]
 
 
 @router.post("/", response_model=CommandOut, status_code=status.HTTP_201_CREATED)
@@ -42,6 +56,47 @@ async def create_command(
         )
 
 
+@router.post("/bulk", response_model=list[CommandOut], status_code=status.HTTP_201_CREATED)
+async def create_command_bulk(
+    payload: list[CommandCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    svc: GenericService[Command] = Depends(get_command_service),
+):
+    """Creates every item in one transaction: all or none"""
+    try:
+        objs = await svc.bulk_create([x.model_dump() for x in payload])
+        return [CommandOut.model_validate(x) for x in objs]
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Command batch contains an existing unique key or an unknown reference",
+        )
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+async def update_command_bulk(
+    payload: BulkUpdate[CommandBulkChanges],
+    svc: GenericService[Command] = Depends(get_command_service),
+):
+    """Applies the same changes to every id with a single UPDATE"""
+    try:
+        updated = await svc.bulk_update(payload.ids, **payload.changes.model_dump(exclude_unset=True))
+        return BulkUpdateResult(updated=updated)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Command with same unique key already exists",
+        )
+
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_command_bulk(
+    payload: BulkIds,
+    svc: GenericService[Command] = Depends(get_command_service),
+):
+    deleted = await svc.bulk_delete(payload.ids)
+    return BulkDeleteResult(deleted=deleted)
+
+
 @router.get("/{obj_id}", response_model=CommandOut)
 async def get_command(
     obj_id: UUID,
@@ -59,6 +114,8 @@ async def list_command_paginated(
     page_size: int = Query(20, ge=1, le=200),
     q: Optional[str] = Query(None, description="Search (icontains)"),
     order_by: Optional[Sequence[str]] = Query(None, description='Order fields, e.g: ["name","-created_at"]'),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page (keyset pagination)"),
+    count: Optional[CountMode] = Query(None, description="Total: exact|estimated|none (default exact, none with cursor)"),
     svc: GenericService[Command] = Depends(get_command_service),
 ):
     filters: dict = {}
@@ -69,11 +126,20 @@ async def list_command_paginated(
         page=page,
         page_size=page_size,
         order_by=order_by,
+        cursor=cursor,
+        count=count,
         **filters,
     )
     return CommandPage(
         items=[CommandOut.model_validate(x) for x in result.items],
-        meta=PageMeta(total=result.total, page=result.page, page_size=result.page_size, pages=result.pages),
+        meta=PageMeta(
+            total=result.total,
+            page=result.page,
+            page_size=result.page_size,
+            pages=result.pages,
+            has_next=result.has_next,
+            next_cursor=result.next_cursor,
+        ),
     )
 
 
@@ -1,14 +1,26 @@
 # app/api/v1/daily_metric_router.py
 from __future__ import annotations
+from datetime import date
 from typing import Optional, Sequence
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from tortoise.exceptions import IntegrityError
 
 from app.models.entities import DailyMetric
 from app.services.generic_service import GenericService
+from app.dbs.postgres.generic_repository import CountMode
 from app.services.service_factory import service_factory
+from app.services.export_service import (
+    DAILY_METRIC_EXPORT_COLUMNS,
+    EXPORT_EXTENSIONS,
+    EXPORT_MEDIA_TYPES,
+    ExportFormat,
+    arrow_available,
+    encode_export,
+)
+from app.repositories.export_repository import stream_daily_metrics
 
 from app.schemas.daily_metric_schema import (
     DailyMetricCreate,
@@ -17,11 +29,28 @@ from app.schemas.daily_metric_schema import (
     DailyMetricPage,
     PageMeta,
 )
+from app.schemas.bulk_schema import (
+    MAX_BULK_ITEMS,
+    BulkConflict,
+    BulkDeleteResult,
+    BulkIds,
+    BulkUpdate,
+    BulkUpdateResult,
+    BulkUpsertResult,
+    bulk_changes,
+)
+from app.schemas.columnar import COLUMNAR_MEDIA_TYPE, ResponseFormat, TsFormat, to_columns, wants_columnar
 
 from app.core.auth.dependencies import require_access_token
 # router = APIRouter(prefix="/api/v1/daily-metrics", tags=["DailyMetrics"], dependencies=[Depends(require_access_token())])
 router = APIRouter(prefix="/api/v1/daily-metrics", tags=["DailyMetrics"])
 
+# changes of PATCH /bulk: every field optional, unique-key columns rejected
+DailyMetricBulkChanges = bulk_changes(DailyMetricUpdate, DailyMetric)
+
+MAX_PAGE_SIZE = 200
+MAX_COLUMNAR_PAGE_SIZE = 10_000
+
 
 async def get_daily_metric_service() -> GenericService[DailyMetric]:
     return service_factory.get(DailyMetric)
@@ -42,6 +71,91 @@ async def create_daily_metric(
         )
 
 
+@router.post("/bulk", response_model=list[DailyMetricOut], status_code=status.HTTP_201_CREATED)
+async def create_daily_metric_bulk(
+    payload: list[DailyMetricCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    svc: GenericService[DailyMetric] = Depends(get_daily_metric_service),
+):
+    """Creates every item in one transaction: all or none"""
+    try:
+        objs = await svc.bulk_create([x.model_dump() for x in payload])
+        return [DailyMetricOut.model_validate(x) for x in objs]
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="DailyMetric batch contains an existing unique key or an unknown reference",
+        )
+
+
+@router.put("/bulk", response_model=BulkUpsertResult)
+async def upsert_daily_metric_bulk(
+    payload: list[DailyMetricCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    on_conflict: BulkConflict = Query("update", description="Items whose unique key already exists: update or ignore"),
+    svc: GenericService[DailyMetric] = Depends(get_daily_metric_service),
+):
+    """Inserts the items, or updates the rows with the same unique key, in one transaction"""
+    try:
+        result = await svc.bulk_upsert([x.model_dump() for x in payload], on_conflict=on_conflict)
+        return BulkUpsertResult(inserted=result.inserted, updated=result.updated, skipped=result.skipped)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="DailyMetric batch contains another existing unique key or an unknown reference",
+        )
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+async def update_daily_metric_bulk(
+    payload: BulkUpdate[DailyMetricBulkChanges],
+    svc: GenericService[DailyMetric] = Depends(get_daily_metric_service),
+):
+    """Applies the same changes to every id with a single UPDATE"""
+    try:
+        updated = await svc.bulk_update(payload.ids, **payload.changes.model_dump(exclude_unset=True))
+        return BulkUpdateResult(updated=updated)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="DailyMetric with same unique key already exists",
+        )
+
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_daily_metric_bulk(
+    payload: BulkIds,
+    svc: GenericService[DailyMetric] = Depends(get_daily_metric_service),
+):
+    deleted = await svc.bulk_delete(payload.ids)
+    return BulkDeleteResult(deleted=deleted)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_daily_metrics(
+    format: ExportFormat = Query("parquet"),
+    tenant_id: Optional[UUID] = Query(None),
+    site_id: Optional[UUID] = Query(None),
+    metric_key: Optional[str] = Query(None, description="Exact metric key"),
+    date_from: Optional[date] = Query(None, alias="from", description="metric_date >= from"),
+    date_to: Optional[date] = Query(None, alias="to", description="metric_date <= to"),
+):
+    """Streams the daily metrics matching the filters, read in batches through a server-side cursor."""
+    if format != "csv" and not arrow_available():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="pyarrow is not installed")
+
+    batches = stream_daily_metrics(
+        tenant_id=tenant_id,
+        site_id=site_id,
+        metric_key=metric_key,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    return StreamingResponse(
+        encode_export(batches, DAILY_METRIC_EXPORT_COLUMNS, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="daily_metrics.{EXPORT_EXTENSIONS[format]}"'},
+    )
+
+
 @router.get("/{obj_id}", response_model=DailyMetricOut)
 async def get_daily_metric(
     obj_id: UUID,
@@ -53,27 +167,74 @@ async def get_daily_metric(
     return DailyMetricOut.model_validate(obj)
 
 
-@router.get("/", response_model=DailyMetricPage)
+@router.get(
+    "/",
+    response_model=DailyMetricPage,
+    responses={200: {"content": {COLUMNAR_MEDIA_TYPE: {}}}},
+)
 async def list_daily_metric_paginated(
+    request: Request,
     page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=200),
+    page_size: int = Query(20, ge=1, le=MAX_COLUMNAR_PAGE_SIZE, description=f"Max {MAX_PAGE_SIZE} unless format=columnar"),
     q: Optional[str] = Query(None, description="Search (icontains)"),
     order_by: Optional[Sequence[str]] = Query(None, description='Order fields, e.g: ["name","-created_at"]'),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page (keyset pagination)"),
+    count: Optional[CountMode] = Query(None, description="Total: exact|estimated|none (default exact, none with cursor)"),
+    site_id: Optional[UUID] = Query(None),
+    metric_key: Optional[str] = Query(None, description="Exact metric key"),
+    date_from: Optional[date] = Query(None, alias="from", description="metric_date >= from"),
+    date_to: Optional[date] = Query(None, alias="to", description="metric_date <= to"),
+    format: Optional[ResponseFormat] = Query(None, description=f"columnar: arrays per field (also Accept: {COLUMNAR_MEDIA_TYPE})"),
+    ts_format: TsFormat = Query("iso", description="Dates in columnar responses: iso|epoch_ms"),
     svc: GenericService[DailyMetric] = Depends(get_daily_metric_service),
 ):
     filters: dict = {}
     if q:
         filters["metric_key__icontains"] = q
+    if site_id:
+        filters["site_id"] = site_id
+    if metric_key:
+        filters["metric_key"] = metric_key
+    if date_from:
+        filters["metric_date__gte"] = date_from
+    if date_to:
+        filters["metric_date__lte"] = date_to
+
+    columnar = wants_columnar(request, format)
+    if not columnar and page_size > MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"page_size above {MAX_PAGE_SIZE} requires format=columnar",
+        )
 
+    fields = ["metric_date", "metric_key", "value"]
+    if not site_id:
+        fields.insert(0, "site_id")
     result = await svc.list_paginated(
         page=page,
         page_size=page_size,
         order_by=order_by,
+        cursor=cursor,
+        count=count,
+        values=fields if columnar else None,
         **filters,
     )
+    meta = PageMeta(
+        total=result.total,
+        page=result.page,
+        page_size=result.page_size,
+        pages=result.pages,
+        has_next=result.has_next,
+        next_cursor=result.next_cursor,
+    )
+    if columnar:
+        return JSONResponse(
+            {"items": to_columns(result.items, fields, ts_format), "meta": meta.model_dump()},
+            media_type=COLUMNAR_MEDIA_TYPE,
+        )
     return DailyMetricPage(
         items=[DailyMetricOut.model_validate(x) for x in result.items],
-        meta=PageMeta(total=result.total, page=result.page, page_size=result.page_size, pages=result.pages),
+        meta=meta,
     )
 
 
@@ -8,6 +8,7 @@ from tortoise.exceptions import IntegrityError
 
 from app.models.entities.ejemplo_asset import Asset
 from app.services.generic_service import GenericService
+from app.dbs.postgres.generic_repository import CountMode
 from app.services.service_factory import service_factory
 
 from app.schemas.ejemplo_asset_schema import (
@@ -85,6 +86,8 @@ async def list_assets_paginated(
     page_size: int = Query(20, ge=1, le=200),
     q: Optional[str] = Query(None, description="Search by name/key (icontains)"),
     order_by: Optional[Sequence[str]] = Query(None, description='Order fields, e.g: ["name","-created_at"]'),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page (keyset pagination)"),
+    count: Optional[CountMode] = Query(None, description="Total: exact|estimated|none (default exact, none with cursor)"),
     svc: GenericService[Asset] = Depends(get_asset_service),
 ):
     filters = {}
@@ -95,11 +98,20 @@ async def list_assets_paginated(
         page=page,
         page_size=page_size,
         order_by=order_by,
+        cursor=cursor,
+        count=count,
         **filters,
     )
     return AssetPage(
         items=[AssetOut.model_validate(x) for x in result.items],
-        meta=PageMeta(total=result.total, page=result.page, page_size=result.page_size, pages=result.pages),
+        meta=PageMeta(
+            total=result.total,
+            page=result.page,
+            page_size=result.page_size,
+            pages=result.pages,
+            has_next=result.has_next,
+            next_cursor=result.next_cursor,
+        ),
     )
 
 
@@ -3,11 +3,12 @@ from __future__ import annotations
 from typing import Optional, Sequence
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from tortoise.exceptions import IntegrityError
 
 from app.models.entities import EnergySystem
 from app.services.generic_service import GenericService
+from app.dbs.postgres.generic_repository import CountMode
 from app.services.service_factory import service_factory
 
 from app.schemas.energy_system_schema import (
@@ -17,11 +18,24 @@ from app.schemas.energy_system_schema import (
     EnergySystemPage,
     PageMeta,
 )
+from app.schemas.bulk_schema import (
+    MAX_BULK_ITEMS,
+    BulkConflict,
+    BulkDeleteResult,
+    BulkIds,
+    BulkUpdate,
+    BulkUpdateResult,
+    BulkUpsertResult,
+    bulk_changes,
+)
 
 from app.core.auth.dependencies import require_access_token
 # router = APIRouter(prefix="/api/v1/energy-systems", tags=["EnergySystems"], dependencies=[Depends(require_access_token())])
 router = APIRouter(prefix="/api/v1/energy-systems", tags=["EnergySystems"])
 
+# changes of PATCH /bulk: every field optional, unique-key columns rejected
+EnergySystemBulkChanges = bulk_changes(EnergySystemUpdate, EnergySystem)
+
 
 async def get_energy_system_service() -> GenericService[EnergySystem]:
     return service_factory.get(EnergySystem)
@@ -42,6 +56,64 @@ async def create_energy_system(
         )
 
 
+@router.post("/bulk", response_model=list[EnergySystemOut], status_code=status.HTTP_201_CREATED)
+async def create_energy_system_bulk(
+    payload: list[EnergySystemCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    svc: GenericService[EnergySystem] = Depends(get_energy_system_service),
+):
+    """Creates every item in one transaction: all or none"""
+    try:
+        objs = await svc.bulk_create([x.model_dump() for x in payload])
+        return [EnergySystemOut.model_validate(x) for x in objs]
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="EnergySystem batch contains an existing unique key or an unknown reference",
+        )
+
+
+@router.put("/bulk", response_model=BulkUpsertResult)
+async def upsert_energy_system_bulk(
+    payload: list[EnergySystemCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    on_conflict: BulkConflict = Query("update", description="Items whose unique key already exists: update or ignore"),
+    svc: GenericService[EnergySystem] = Depends(get_energy_system_service),
+):
+    """Inserts the items, or updates the rows with the same unique key, in one transaction"""
+    try:
+        result = await svc.bulk_upsert([x.model_dump() for x in payload], on_conflict=on_conflict)
+        return BulkUpsertResult(inserted=result.inserted, updated=result.updated, skipped=result.skipped)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="EnergySystem batch contains another existing unique key or an unknown reference",
+        )
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+async def update_energy_system_bulk(
+    payload: BulkUpdate[EnergySystemBulkChanges],
+    svc: GenericService[EnergySystem] = Depends(get_energy_system_service),
+):
+    """Applies the same changes to every id with a single UPDATE"""
+    try:
+        updated = await svc.bulk_update(payload.ids, **payload.changes.model_dump(exclude_unset=True))
+        return BulkUpdateResult(updated=updated)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="EnergySystem with same unique key already exists",
+        )
+
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_energy_system_bulk(
+    payload: BulkIds,
+    svc: GenericService[EnergySystem] = Depends(get_energy_system_service),
+):
+    deleted = await svc.bulk_delete(payload.ids)
+    return BulkDeleteResult(deleted=deleted)
+
+
 @router.get("/{obj_id}", response_model=EnergySystemOut)
 async def get_energy_system(
     obj_id: UUID,
@@ -59,6 +131,8 @@ async def list_energy_system_paginated(
     page_size: int = Query(20, ge=1, le=200),
     q: Optional[str] = Query(None, description="Search (icontains)"),
     order_by: Optional[Sequence[str]] = Query(None, description='Order fields, e.g: ["name","-created_at"]'),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page (keyset pagination)"),
+    count: Optional[CountMode] = Query(None, description="Total: exact|estimated|none (default exact, none with cursor)"),
     svc: GenericService[EnergySystem] = Depends(get_energy_system_service),
 ):
     filters: dict = {}
@@ -69,11 +143,20 @@ async def list_energy_system_paginated(
         page=page,
         page_size=page_size,
         order_by=order_by,
+        cursor=cursor,
+        count=count,
         **filters,
     )
     return EnergySystemPage(
         items=[EnergySystemOut.model_validate(x) for x in result.items],
-        meta=PageMeta(total=result.total, page=result.page, page_size=result.page_size, pages=result.pages),
+        meta=PageMeta(
+            total=result.total,
+            page=result.page,
+            page_size=result.page_size,
+            pages=result.pages,
+            has_next=result.has_next,
+            next_cursor=result.next_cursor,
+        ),
     )
 
 
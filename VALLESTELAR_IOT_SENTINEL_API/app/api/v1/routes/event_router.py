@@ -3,12 +3,14 @@ from __future__ import annotations
 from typing import Optional, Sequence
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from tortoise.exceptions import IntegrityError
 
 from app.models.entities import Event
 from app.services.generic_service import GenericService
+from app.dbs.postgres.generic_repository import CountMode
 from app.services.service_factory import service_factory
+from app.services.event_service import EventService
 
 from app.schemas.event_schema import (
     EventCreate,
@@ -17,24 +19,84 @@ from app.schemas.event_schema import (
     EventPage,
     PageMeta,
 )
+from app.schemas.bulk_schema import (
+    MAX_BULK_ITEMS,
+    BulkDeleteResult,
+    BulkIds,
+    BulkUpdate,
+    BulkUpdateResult,
+    bulk_changes,
+)
 
 from app.core.auth.dependencies import require_access_token
 # router = APIRouter(prefix="/api/v1/events", tags=["Events"], dependencies=[Depends(require_access_token())])
 router = APIRouter(prefix="/api/v1/events", tags=["Events"])
 
+# changes of PATCH /bulk: every field optional, unique-key columns rejected
+EventBulkChanges = bulk_changes(EventUpdate, Event)
+
 
-async def get_event_service() -> GenericService[Event]:
-    return service_factory.get(Event)
+async def get_event_service() -> EventService:
+    return service_factory.get(Event)  # type: ignore[return-value]
 
 
 @router.post("/", response_model=EventOut, status_code=status.HTTP_201_CREATED)
 async def create_event(
     payload: EventCreate,
+    response: Response,
+    svc: EventService = Depends(get_event_service),
+):
+    """
+    Records an occurrence: 201 with the new event, or 200 with the open event of the same
+    (site, event_type, source_id) it was coalesced into. 429 when the site is over its
+    event rate limit.
+    """
+    try:
+        result = await svc.record([payload.model_dump()])
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Event with same unique key already exists",
+        )
+    if result.suppressed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many events for this site, try again later",
+        )
+    if result.coalesced:
+        response.status_code = status.HTTP_200_OK
+    return EventOut.model_validate(result.events[0])
+
+
+@router.post("/bulk", response_model=list[EventOut], status_code=status.HTTP_201_CREATED)
+async def create_event_bulk(
+    payload: list[EventCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    svc: EventService = Depends(get_event_service),
+):
+    """
+    Records every occurrence in one transaction, like POST /: returns one event per
+    (site, event_type, source_id), new or coalesced; occurrences over the site rate limit
+    are dropped.
+    """
+    try:
+        result = await svc.record([x.model_dump() for x in payload])
+        return [EventOut.model_validate(x) for x in result.events]
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Event batch contains an unknown reference",
+        )
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+async def update_event_bulk(
+    payload: BulkUpdate[EventBulkChanges],
     svc: GenericService[Event] = Depends(get_event_service),
 ):
+    """Applies the same changes to every id with a single UPDATE"""
     try:
-        obj = await svc.create(**payload.model_dump())
-        return EventOut.model_validate(obj)
+        updated = await svc.bulk_update(payload.ids, **payload.changes.model_dump(exclude_unset=True))
+        return BulkUpdateResult(updated=updated)
     except IntegrityError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -42,6 +104,15 @@ async def create_event(
         )
 
 
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_event_bulk(
+    payload: BulkIds,
+    svc: GenericService[Event] = Depends(get_event_service),
+):
+    deleted = await svc.bulk_delete(payload.ids)
+    return BulkDeleteResult(deleted=deleted)
+
+
 @router.get("/{obj_id}", response_model=EventOut)
 async def get_event(
     obj_id: UUID,
@@ -59,6 +130,8 @@ async def list_event_paginated(
     page_size: int = Query(20, ge=1, le=200),
     q: Optional[str] = Query(None, description="Search (icontains)"),
     order_by: Optional[Sequence[str]] = Query(None, description='Order fields, e.g: ["name","-created_at"]'),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page (keyset pagination)"),
+    count: Optional[CountMode] = Query(None, description="Total: exact|estimated|none (default exact, none with cursor)"),
     svc: GenericService[Event] = Depends(get_event_service),
 ):
     filters: dict = {}
@@ -69,11 +142,20 @@ async def list_event_paginated(
         page=page,
         page_size=page_size,
         order_by=order_by,
+        cursor=cursor,
+        count=count,
         **filters,
     )
     return EventPage(
         items=[EventOut.model_validate(x) for x in result.items],
-        meta=PageMeta(total=result.total, page=result.page, page_size=result.page_size, pages=result.pages),
+        meta=PageMeta(
+            total=result.total,
+            page=result.page,
+            page_size=result.page_size,
+            pages=result.pages,
+            has_next=result.has_next,
+            next_cursor=result.next_cursor,
+        ),
     )
 
 
@@ -2,7 +2,7 @@
 from fastapi import APIRouter, HTTPException, status
 
 from app.schemas.auth.auth_schema import LoginRequest, TokenResponse
-from app.core.security.passwords import verify_password
+from app.core.security.passwords import verify_password_async
 from app.services.auth_service import AuthService
 from app.repositories.user_repository import get_user_by_email, user_has_membership
 
@@ -28,7 +28,7 @@ async def login(data: LoginRequest) -> TokenResponse:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuario inactivo")
 
     # ✅ su modelo guarda password_hash
-    if not verify_password(data.password, user.password_hash):
+    if not await verify_password_async(data.password, user.password_hash):
         raise invalid_exc
 
     # ✅ multi-tenant: su campo real es tenant_id
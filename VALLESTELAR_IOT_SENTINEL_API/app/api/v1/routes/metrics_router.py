@@ -0,0 +1,19 @@
+# app/api/v1/metrics_router.py
+from __future__ import annotations
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+
+from app.core.auth.dependencies import require_access_token
+from app.dbs.postgres.instrumented_pool import pool_stats
+
+router = APIRouter(prefix="/api/v1/metrics", tags=["Metrics"], dependencies=[Depends(require_access_token())])
+
+
+@router.get("/db-pool")
+async def db_pool_metrics() -> Dict[str, Any]:
+    """
+    Utilization of the asyncpg pool of this process, per connection:
+    size, in_use, idle, waiters (requests waiting for a connection) and acquire latency.
+    """
+    return pool_stats()
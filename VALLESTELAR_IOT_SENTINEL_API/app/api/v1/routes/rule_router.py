@@ -3,12 +3,14 @@ from __future__ import annotations
 from typing import Optional, Sequence
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from tortoise.exceptions import IntegrityError
 
 from app.models.entities import Rule
 from app.services.generic_service import GenericService
+from app.dbs.postgres.generic_repository import CountMode
 from app.services.service_factory import service_factory
+from app.services.rule_engine import RuleCompileError, outside_site, rule_engine, rule_references
 
 from app.schemas.rule_schema import (
     RuleCreate,
@@ -17,29 +19,135 @@ from app.schemas.rule_schema import (
     RulePage,
     PageMeta,
 )
+from app.schemas.bulk_schema import (
+    MAX_BULK_ITEMS,
+    BulkConflict,
+    BulkDeleteResult,
+    BulkIds,
+    BulkUpdate,
+    BulkUpdateResult,
+    BulkUpsertResult,
+    bulk_changes,
+)
 
 from app.core.auth.dependencies import require_access_token
 # router = APIRouter(prefix="/api/v1/rules", tags=["Rules"], dependencies=[Depends(require_access_token())])
 router = APIRouter(prefix="/api/v1/rules", tags=["Rules"])
 
+# changes of PATCH /bulk: every field optional, unique-key columns rejected
+RuleBulkChanges = bulk_changes(RuleUpdate, Rule)
+
 
 async def get_rule_service() -> GenericService[Rule]:
     return service_factory.get(Rule)
 
 
+async def _check_rules(rules: Sequence[tuple[UUID, Optional[dict], Optional[dict]]]) -> None:
+    """
+    Rejects (site_id, condition_json, action_json) the engine could not compile or that
+    refer to a sensor or actuator outside the rule's site
+    """
+    refs = []
+    for site_id, condition_json, action_json in rules:
+        try:
+            refs.append((site_id, *rule_references(condition_json, action_json)))
+        except RuleCompileError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid rule: {e}")
+    for error in await outside_site(refs):
+        if error is not None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid rule: {error}")
+
+
 @router.post("/", response_model=RuleOut, status_code=status.HTTP_201_CREATED)
 async def create_rule(
     payload: RuleCreate,
     svc: GenericService[Rule] = Depends(get_rule_service),
 ):
+    await _check_rules([(payload.site_id, payload.condition_json, payload.action_json)])
     try:
         obj = await svc.create(**payload.model_dump())
-        return RuleOut.model_validate(obj)
     except IntegrityError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Rule with same unique key already exists",
         )
+    await rule_engine.rules_changed([obj.id])
+    return RuleOut.model_validate(obj)
+
+
+@router.post("/bulk", response_model=list[RuleOut], status_code=status.HTTP_201_CREATED)
+async def create_rule_bulk(
+    payload: list[RuleCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    svc: GenericService[Rule] = Depends(get_rule_service),
+):
+    """Creates every item in one transaction: all or none"""
+    await _check_rules([(x.site_id, x.condition_json, x.action_json) for x in payload])
+    try:
+        objs = await svc.bulk_create([x.model_dump() for x in payload])
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Rule batch contains an existing unique key or an unknown reference",
+        )
+    await rule_engine.rules_changed([x.id for x in objs])
+    return [RuleOut.model_validate(x) for x in objs]
+
+
+@router.put("/bulk", response_model=BulkUpsertResult)
+async def upsert_rule_bulk(
+    payload: list[RuleCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    on_conflict: BulkConflict = Query("update", description="Items whose unique key already exists: update or ignore"),
+    svc: GenericService[Rule] = Depends(get_rule_service),
+):
+    """Inserts the items, or updates the rows with the same unique key, in one transaction"""
+    await _check_rules([(x.site_id, x.condition_json, x.action_json) for x in payload])
+    try:
+        result = await svc.bulk_upsert([x.model_dump() for x in payload], on_conflict=on_conflict)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Rule batch contains another existing unique key or an unknown reference",
+        )
+    # rows inserted or updated by (site_id, name): the engine reloads them
+    keys = {(x.site_id, x.name) for x in payload}
+    current = await svc.list(site_id__in=list({k[0] for k in keys}), name__in=list({k[1] for k in keys}), use_primary=True)
+    await rule_engine.rules_changed([r.id for r in current if (r.site_id, r.name) in keys])
+    return BulkUpsertResult(inserted=result.inserted, updated=result.updated, skipped=result.skipped)
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+async def update_rule_bulk(
+    payload: BulkUpdate[RuleBulkChanges],
+    svc: GenericService[Rule] = Depends(get_rule_service),
+):
+    """Applies the same changes to every id with a single UPDATE"""
+    changes = payload.changes.model_dump(exclude_unset=True)
+    if "condition_json" in changes or "action_json" in changes:
+        # checked against the site of each rule
+        current = await svc.list(id__in=payload.ids, use_primary=True)
+        await _check_rules([
+            (r.site_id, changes.get("condition_json", r.condition_json), changes.get("action_json", r.action_json))
+            for r in current
+        ])
+    try:
+        updated = await svc.bulk_update(payload.ids, **changes)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Rule with same unique key already exists",
+        )
+    await rule_engine.rules_changed(payload.ids)
+    return BulkUpdateResult(updated=updated)
+
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_rule_bulk(
+    payload: BulkIds,
+    svc: GenericService[Rule] = Depends(get_rule_service),
+):
+    deleted = await svc.bulk_delete(payload.ids)
+    await rule_engine.rules_changed(payload.ids)
+    return BulkDeleteResult(deleted=deleted)
 
 
 @router.get("/{obj_id}", response_model=RuleOut)
@@ -59,6 +167,8 @@ async def list_rule_paginated(
     page_size: int = Query(20, ge=1, le=200),
     q: Optional[str] = Query(None, description="Search (icontains)"),
     order_by: Optional[Sequence[str]] = Query(None, description='Order fields, e.g: ["name","-created_at"]'),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page (keyset pagination)"),
+    count: Optional[CountMode] = Query(None, description="Total: exact|estimated|none (default exact, none with cursor)"),
     svc: GenericService[Rule] = Depends(get_rule_service),
 ):
     filters: dict = {}
@@ -69,11 +179,20 @@ async def list_rule_paginated(
         page=page,
         page_size=page_size,
         order_by=order_by,
+        cursor=cursor,
+        count=count,
         **filters,
     )
     return RulePage(
         items=[RuleOut.model_validate(x) for x in result.items],
-        meta=PageMeta(total=result.total, page=result.page, page_size=result.page_size, pages=result.pages),
+        meta=PageMeta(
+            total=result.total,
+            page=result.page,
+            page_size=result.page_size,
+            pages=result.pages,
+            has_next=result.has_next,
+            next_cursor=result.next_cursor,
+        ),
     )
 
 
@@ -83,16 +202,27 @@ async def update_rule(
     payload: RuleUpdate,
     svc: GenericService[Rule] = Depends(get_rule_service),
 ):
-    try:
-        updated = await svc.update(obj_id, **payload.model_dump(exclude_unset=True))
-        if not updated:
+    data = payload.model_dump(exclude_unset=True)
+    if data.keys() & {"site_id", "condition_json", "action_json"}:
+        current = await svc.get(obj_id, use_primary=True)
+        if not current:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found")
-        return RuleOut.model_validate(updated)
+        await _check_rules([(
+            data.get("site_id", current.site_id),
+            data.get("condition_json", current.condition_json),
+            data.get("action_json", current.action_json),
+        )])
+    try:
+        updated = await svc.update(obj_id, **data)
     except IntegrityError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Rule with same unique key already exists",
         )
+    if not updated:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found")
+    await rule_engine.rules_changed([obj_id])
+    return RuleOut.model_validate(updated)
 
 
 @router.delete("/{obj_id}", status_code=status.HTTP_200_OK)
@@ -103,4 +233,5 @@ async def delete_rule(
     deleted = await svc.delete(obj_id)
     if deleted == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found")
+    await rule_engine.rules_changed([obj_id])
     return {"deleted": deleted}
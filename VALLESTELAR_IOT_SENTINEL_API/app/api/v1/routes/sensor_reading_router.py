@@ -1,27 +1,65 @@
 # app/api/v1/sensor_reading_router.py
 from __future__ import annotations
+import json
+from datetime import datetime
 from typing import Optional, Sequence
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 from tortoise.exceptions import IntegrityError
 
 from app.models.entities import SensorReading
+from app.dbs.postgres.generic_repository import ConflictPolicy
 from app.services.generic_service import GenericService
+from app.dbs.postgres.generic_repository import CountMode
 from app.services.service_factory import service_factory
+from app.services.export_service import (
+    EXPORT_EXTENSIONS,
+    EXPORT_MEDIA_TYPES,
+    READING_EXPORT_COLUMNS,
+    ExportFormat,
+    arrow_available,
+    encode_export,
+)
+from app.repositories.export_repository import stream_sensor_readings
+from app.repositories.sensor_reading_repository import delete_readings
 
 from app.schemas.sensor_reading_schema import (
     SensorReadingCreate,
+    SensorReadingBulkResult,
     SensorReadingUpdate,
     SensorReadingOut,
     SensorReadingPage,
     PageMeta,
 )
+from app.schemas.bulk_schema import (
+    BulkDeleteResult,
+    BulkIds,
+    BulkUpdate,
+    BulkUpdateResult,
+    bulk_changes,
+)
+from app.schemas.columnar import COLUMNAR_MEDIA_TYPE, ResponseFormat, TsFormat, to_columns, wants_columnar
 
 from app.core.auth.dependencies import require_access_token
 # router = APIRouter(prefix="/api/v1/sensor-readings", tags=["SensorReadings"], dependencies=[Depends(require_access_token())])
 router = APIRouter(prefix="/api/v1/sensor-readings", tags=["SensorReadings"])
 
+# changes of PATCH /bulk: every field optional, unique-key columns rejected
+SensorReadingBulkChanges = bulk_changes(SensorReadingUpdate, SensorReading)
+
+MAX_BULK_READINGS = 10_000
+# Largest /bulk body (1 KB per reading): larger ones are rejected before being read or parsed
+MAX_BULK_BODY_BYTES = MAX_BULK_READINGS * 1024
+MAX_PAGE_SIZE = 200
+MAX_COLUMNAR_PAGE_SIZE = 10_000
+
+# One validator for the whole batch: a single pydantic-core call instead of one per reading
+_bulk_adapter = TypeAdapter(list[SensorReadingCreate])
+
 
 async def get_sensor_reading_service() -> GenericService[SensorReading]:
     return service_factory.get(SensorReading)
@@ -30,16 +68,143 @@ async def get_sensor_reading_service() -> GenericService[SensorReading]:
 @router.post("/", response_model=SensorReadingOut, status_code=status.HTTP_201_CREATED)
 async def create_sensor_reading(
     payload: SensorReadingCreate,
+    on_conflict: ConflictPolicy = Query("error", description="Same (sensor_id, ts) already stored: error|ignore|update"),
     svc: GenericService[SensorReading] = Depends(get_sensor_reading_service),
 ):
+    data = payload.model_dump()
     try:
-        obj = await svc.create(**payload.model_dump())
-        return SensorReadingOut.model_validate(obj)
+        obj = await svc.upsert(on_conflict=on_conflict, **data)
     except IntegrityError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="SensorReading with same unique key already exists",
         )
+    return SensorReadingOut.model_validate(obj)
+
+
+def _too_many_readings() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"At most {MAX_BULK_READINGS} readings (and {MAX_BULK_BODY_BYTES} bytes) per request",
+    )
+
+
+async def _read_bulk_body(request: Request) -> bytes:
+    """Body of a /bulk request, 413 as soon as it is known to exceed MAX_BULK_BODY_BYTES"""
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > MAX_BULK_BODY_BYTES:
+        raise _too_many_readings()
+    # chunked bodies (no Content-Length) are counted while they arrive
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BULK_BODY_BYTES:
+            raise _too_many_readings()
+    return bytes(body)
+
+
+@router.post("/bulk", response_model=SensorReadingBulkResult, status_code=status.HTTP_201_CREATED)
+async def create_sensor_readings_bulk(
+    request: Request,
+    on_conflict: ConflictPolicy = Query("error", description="Same (sensor_id, ts) already stored: error|ignore|update"),
+    svc: GenericService[SensorReading] = Depends(get_sensor_reading_service),
+):
+    """
+    Ingests a batch of readings in one call.
+    - Body: JSON array of SensorReadingCreate, or NDJSON (one reading per line)
+      with Content-Type: application/x-ndjson. At most MAX_BULK_READINGS readings and
+      MAX_BULK_BODY_BYTES bytes (413)
+    - on_conflict=error: rows are written with a single COPY into sensor_readings_5m,
+      any existing (sensor_id, ts) rejects the whole batch
+    - on_conflict=ignore|update: INSERT ... ON CONFLICT (sensor_id, ts), so a gateway
+      can resend a partially-failed batch as is
+    """
+    body = await _read_bulk_body(request)
+    content_type = request.headers.get("content-type", "")
+
+    try:
+        if "ndjson" in content_type:
+            lines = [line for line in body.splitlines() if line.strip()]
+            if len(lines) > MAX_BULK_READINGS:
+                raise _too_many_readings()
+            items = _bulk_adapter.validate_python([json.loads(line) for line in lines])
+        else:
+            items = _bulk_adapter.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid NDJSON body")
+
+    # a JSON array is only counted once parsed, its size is bounded by MAX_BULK_BODY_BYTES
+    if len(items) > MAX_BULK_READINGS:
+        raise _too_many_readings()
+
+    rows = [x.model_dump() for x in items]
+    try:
+        result = await svc.bulk_upsert(rows, on_conflict=on_conflict)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="SensorReading batch contains an existing (sensor_id, ts) or unknown reference",
+        )
+    return SensorReadingBulkResult(
+        received=len(items),
+        inserted=result.inserted,
+        updated=result.updated,
+        skipped=result.skipped,
+    )
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+async def update_sensor_reading_bulk(
+    payload: BulkUpdate[SensorReadingBulkChanges],
+    svc: GenericService[SensorReading] = Depends(get_sensor_reading_service),
+):
+    """Applies the same changes to every id with a single UPDATE"""
+    try:
+        updated = await svc.bulk_update(payload.ids, **payload.changes.model_dump(exclude_unset=True))
+        return BulkUpdateResult(updated=updated)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="SensorReading with same unique key already exists",
+        )
+
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_sensor_reading_bulk(
+    payload: BulkIds,
+):
+    # not svc.bulk_delete: the hours of the deleted readings are recorded for the rollups
+    deleted = await delete_readings(payload.ids)
+    return BulkDeleteResult(deleted=deleted)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_sensor_readings(
+    format: ExportFormat = Query("parquet"),
+    tenant_id: Optional[UUID] = Query(None),
+    site_id: Optional[UUID] = Query(None),
+    sensor_id: Optional[UUID] = Query(None),
+    ts_from: Optional[datetime] = Query(None, alias="from", description="ts >= from"),
+    ts_to: Optional[datetime] = Query(None, alias="to", description="ts < to"),
+):
+    """Streams the readings matching the filters, read in batches through a server-side cursor."""
+    if format != "csv" and not arrow_available():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="pyarrow is not installed")
+
+    batches = stream_sensor_readings(
+        tenant_id=tenant_id,
+        site_id=site_id,
+        sensor_id=sensor_id,
+        ts_from=ts_from,
+        ts_to=ts_to,
+    )
+    return StreamingResponse(
+        encode_export(batches, READING_EXPORT_COLUMNS, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="sensor_readings.{EXPORT_EXTENSIONS[format]}"'},
+    )
 
 
 @router.get("/{obj_id}", response_model=SensorReadingOut)
@@ -53,27 +218,68 @@ async def get_sensor_reading(
     return SensorReadingOut.model_validate(obj)
 
 
-@router.get("/", response_model=SensorReadingPage)
+@router.get(
+    "/",
+    response_model=SensorReadingPage,
+    responses={200: {"content": {COLUMNAR_MEDIA_TYPE: {}}}},
+)
 async def list_sensor_reading_paginated(
+    request: Request,
     page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=200),
+    page_size: int = Query(20, ge=1, le=MAX_COLUMNAR_PAGE_SIZE, description=f"Max {MAX_PAGE_SIZE} unless format=columnar"),
     q: Optional[str] = Query(None, description="Search (icontains)"),
     order_by: Optional[Sequence[str]] = Query(None, description='Order fields, e.g: ["name","-created_at"]'),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page (keyset pagination)"),
+    count: Optional[CountMode] = Query(None, description="Total: exact|estimated|none (default exact, none with cursor)"),
+    sensor_id: Optional[UUID] = Query(None),
+    ts_from: Optional[datetime] = Query(None, alias="from", description="ts >= from"),
+    ts_to: Optional[datetime] = Query(None, alias="to", description="ts < to"),
+    format: Optional[ResponseFormat] = Query(None, description=f"columnar: arrays per field (also Accept: {COLUMNAR_MEDIA_TYPE})"),
+    ts_format: TsFormat = Query("iso", description="Timestamps in columnar responses: iso|epoch_ms"),
     svc: GenericService[SensorReading] = Depends(get_sensor_reading_service),
 ):
     filters: dict = {}
-    # This entity does not have a default text search field.
-    # Add your own filters here if needed.
+    if sensor_id:
+        filters["sensor_id"] = sensor_id
+    if ts_from:
+        filters["ts__gte"] = ts_from
+    if ts_to:
+        filters["ts__lt"] = ts_to
 
+    columnar = wants_columnar(request, format)
+    if not columnar and page_size > MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"page_size above {MAX_PAGE_SIZE} requires format=columnar",
+        )
+
+    # a single sensor does not need its id repeated on every point
+    fields = ["ts", "value", "quality"] if sensor_id else ["sensor_id", "ts", "value", "quality"]
     result = await svc.list_paginated(
         page=page,
         page_size=page_size,
         order_by=order_by,
+        cursor=cursor,
+        count=count,
+        values=fields if columnar else None,
         **filters,
     )
+    meta = PageMeta(
+        total=result.total,
+        page=result.page,
+        page_size=result.page_size,
+        pages=result.pages,
+        has_next=result.has_next,
+        next_cursor=result.next_cursor,
+    )
+    if columnar:
+        return JSONResponse(
+            {"items": to_columns(result.items, fields, ts_format), "meta": meta.model_dump()},
+            media_type=COLUMNAR_MEDIA_TYPE,
+        )
     return SensorReadingPage(
         items=[SensorReadingOut.model_validate(x) for x in result.items],
-        meta=PageMeta(total=result.total, page=result.page, page_size=result.page_size, pages=result.pages),
+        meta=meta,
     )
 
 
@@ -98,9 +304,8 @@ async def update_sensor_reading(
 @router.delete("/{obj_id}", status_code=status.HTTP_200_OK)
 async def delete_sensor_reading(
     obj_id: UUID,
-    svc: GenericService[SensorReading] = Depends(get_sensor_reading_service),
 ):
-    deleted = await svc.delete(obj_id)
+    deleted = await delete_readings([obj_id])
     if deleted == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="SensorReading not found")
     return {"deleted": deleted}
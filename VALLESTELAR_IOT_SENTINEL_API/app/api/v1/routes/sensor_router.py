@@ -1,32 +1,60 @@
 # app/api/v1/sensor_router.py
 from __future__ import annotations
-from typing import Optional, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional, Sequence
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from tortoise.exceptions import IntegrityError
 
 from app.models.entities import Sensor
 from app.services.generic_service import GenericService
+from app.dbs.postgres.generic_repository import CountMode
 from app.services.service_factory import service_factory
+from app.repositories.sensor_reading_repository import get_sensor_series
 
 from app.schemas.sensor_schema import (
     SensorCreate,
     SensorUpdate,
     SensorOut,
     SensorPage,
+    SensorSeriesOut,
     PageMeta,
 )
+from app.schemas.bulk_schema import (
+    MAX_BULK_ITEMS,
+    BulkConflict,
+    BulkDeleteResult,
+    BulkIds,
+    BulkUpdate,
+    BulkUpdateResult,
+    BulkUpsertResult,
+    bulk_changes,
+)
 
 from app.core.auth.dependencies import require_access_token
 # router = APIRouter(prefix="/api/v1/sensors", tags=["Sensors"], dependencies=[Depends(require_access_token())])
 router = APIRouter(prefix="/api/v1/sensors", tags=["Sensors"])
 
+# changes of PATCH /bulk: every field optional, unique-key columns rejected
+SensorBulkChanges = bulk_changes(SensorUpdate, Sensor)
+
 
 async def get_sensor_service() -> GenericService[Sensor]:
     return service_factory.get(Sensor)
 
 
+SERIES_BUCKETS: dict[str, timedelta] = {
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+    "6h": timedelta(hours=6),
+    "1d": timedelta(days=1),
+}
+SERIES_AGGS = ("avg", "min", "max", "sum", "count", "last")
+MAX_SERIES_POINTS = 5000
+
+
 @router.post("/", response_model=SensorOut, status_code=status.HTTP_201_CREATED)
 async def create_sensor(
     payload: SensorCreate,
@@ -42,6 +70,64 @@ async def create_sensor(
         )
 
 
+@router.post("/bulk", response_model=list[SensorOut], status_code=status.HTTP_201_CREATED)
+async def create_sensor_bulk(
+    payload: list[SensorCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    svc: GenericService[Sensor] = Depends(get_sensor_service),
+):
+    """Creates every item in one transaction: all or none"""
+    try:
+        objs = await svc.bulk_create([x.model_dump() for x in payload])
+        return [SensorOut.model_validate(x) for x in objs]
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Sensor batch contains an existing unique key or an unknown reference",
+        )
+
+
+@router.put("/bulk", response_model=BulkUpsertResult)
+async def upsert_sensor_bulk(
+    payload: list[SensorCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    on_conflict: BulkConflict = Query("update", description="Items whose unique key already exists: update or ignore"),
+    svc: GenericService[Sensor] = Depends(get_sensor_service),
+):
+    """Inserts the items, or updates the rows with the same unique key, in one transaction"""
+    try:
+        result = await svc.bulk_upsert([x.model_dump() for x in payload], on_conflict=on_conflict)
+        return BulkUpsertResult(inserted=result.inserted, updated=result.updated, skipped=result.skipped)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Sensor batch contains another existing unique key or an unknown reference",
+        )
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+async def update_sensor_bulk(
+    payload: BulkUpdate[SensorBulkChanges],
+    svc: GenericService[Sensor] = Depends(get_sensor_service),
+):
+    """Applies the same changes to every id with a single UPDATE"""
+    try:
+        updated = await svc.bulk_update(payload.ids, **payload.changes.model_dump(exclude_unset=True))
+        return BulkUpdateResult(updated=updated)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Sensor with same unique key already exists",
+        )
+
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_sensor_bulk(
+    payload: BulkIds,
+    svc: GenericService[Sensor] = Depends(get_sensor_service),
+):
+    deleted = await svc.bulk_delete(payload.ids)
+    return BulkDeleteResult(deleted=deleted)
+
+
 @router.get("/{obj_id}", response_model=SensorOut)
 async def get_sensor(
     obj_id: UUID,
@@ -53,12 +139,54 @@ async def get_sensor(
     return SensorOut.model_validate(obj)
 
 
+@router.get("/{obj_id}/series", response_model=SensorSeriesOut, response_model_exclude_none=True)
+async def get_sensor_series_route(
+    obj_id: UUID,
+    start: Optional[datetime] = Query(None, alias="from", description="Inclusive, default to - 24h"),
+    end: Optional[datetime] = Query(None, alias="to", description="Exclusive, default now"),
+    bucket: Literal["5m", "15m", "1h", "6h", "1d"] = Query("1h"),
+    agg: str = Query("avg", description="Comma separated: avg,min,max,sum,count,last"),
+    svc: GenericService[Sensor] = Depends(get_sensor_service),
+):
+    aggs = list(dict.fromkeys(a.strip() for a in agg.split(",") if a.strip()))
+    unknown = [a for a in aggs if a not in SERIES_AGGS]
+    if not aggs or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"agg must be a comma separated list of {', '.join(SERIES_AGGS)}",
+        )
+
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=1)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="from must be before to")
+
+    step = SERIES_BUCKETS[bucket]
+    if (end - start) / step > MAX_SERIES_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range too large for bucket {bucket} (max {MAX_SERIES_POINTS} points)",
+        )
+
+    if not await svc.exists(id=obj_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sensor not found")
+
+    columns = await get_sensor_series(obj_id, start, end, step, aggs)
+    return SensorSeriesOut(sensor_id=obj_id, bucket=bucket, start=start, end=end, **columns)
+
+
 @router.get("/", response_model=SensorPage)
 async def list_sensor_paginated(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=200),
     q: Optional[str] = Query(None, description="Search (icontains)"),
     order_by: Optional[Sequence[str]] = Query(None, description='Order fields, e.g: ["name","-created_at"]'),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page (keyset pagination)"),
+    count: Optional[CountMode] = Query(None, description="Total: exact|estimated|none (default exact, none with cursor)"),
     svc: GenericService[Sensor] = Depends(get_sensor_service),
 ):
     filters: dict = {}
@@ -69,11 +197,20 @@ async def list_sensor_paginated(
         page=page,
         page_size=page_size,
         order_by=order_by,
+        cursor=cursor,
+        count=count,
         **filters,
     )
     return SensorPage(
         items=[SensorOut.model_validate(x) for x in result.items],
-        meta=PageMeta(total=result.total, page=result.page, page_size=result.page_size, pages=result.pages),
+        meta=PageMeta(
+            total=result.total,
+            page=result.page,
+            page_size=result.page_size,
+            pages=result.pages,
+            has_next=result.has_next,
+            next_cursor=result.next_cursor,
+        ),
     )
 
 
@@ -3,11 +3,12 @@ from __future__ import annotations
 from typing import Optional, Sequence
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from tortoise.exceptions import IntegrityError
 from app.models.entities import Tenant
 
 from app.services.generic_service import GenericService
+from app.dbs.postgres.generic_repository import CountMode
 from app.services.service_factory import service_factory
 
 from app.schemas.tenant_schema import (
@@ -17,11 +18,22 @@ from app.schemas.tenant_schema import (
     TenantPage,
     PageMeta,
 )
+from app.schemas.bulk_schema import (
+    MAX_BULK_ITEMS,
+    BulkDeleteResult,
+    BulkIds,
+    BulkUpdate,
+    BulkUpdateResult,
+    bulk_changes,
+)
 
 
 from app.core.auth.dependencies import require_access_token
 router = APIRouter(prefix="/api/v1/tenants", tags=["Tenants"],dependencies=[Depends(require_access_token())])
 
+# changes of PATCH /bulk: every field optional, unique-key columns rejected
+TenantBulkChanges = bulk_changes(TenantUpdate, Tenant)
+
 
 async def get_tenant_service() -> GenericService[Tenant]:
     return service_factory.get(Tenant)
@@ -42,6 +54,47 @@ async def create_tenant(
         )
 
 
+@router.post("/bulk", response_model=list[TenantOut], status_code=status.HTTP_201_CREATED)
+async def create_tenant_bulk(
+    payload: list[TenantCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    svc: GenericService[Tenant] = Depends(get_tenant_service),
+):
+    """Creates every item in one transaction: all or none"""
+    try:
+        objs = await svc.bulk_create([x.model_dump() for x in payload])
+        return [TenantOut.model_validate(x) for x in objs]
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Tenant batch contains an existing unique key or an unknown reference",
+        )
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+async def update_tenant_bulk(
+    payload: BulkUpdate[TenantBulkChanges],
+    svc: GenericService[Tenant] = Depends(get_tenant_service),
+):
+    """Applies the same changes to every id with a single UPDATE"""
+    try:
+        updated = await svc.bulk_update(payload.ids, **payload.changes.model_dump(exclude_unset=True))
+        return BulkUpdateResult(updated=updated)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Tenant with same unique key already exists",
+        )
+
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_tenant_bulk(
+    payload: BulkIds,
+    svc: GenericService[Tenant] = Depends(get_tenant_service),
+):
+    deleted = await svc.bulk_delete(payload.ids)
+    return BulkDeleteResult(deleted=deleted)
+
+
 @router.get("/{obj_id}", response_model=TenantOut)
 async def get_tenant(
     obj_id: UUID,
@@ -59,6 +112,8 @@ async def list_tenant_paginated(
     page_size: int = Query(20, ge=1, le=200),
     q: Optional[str] = Query(None, description="Search (icontains)"),
     order_by: Optional[Sequence[str]] = Query(None, description='Order fields, e.g: ["name","-created_at"]'),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page (keyset pagination)"),
+    count: Optional[CountMode] = Query(None, description="Total: exact|estimated|none (default exact, none with cursor)"),
     svc: GenericService[Tenant] = Depends(get_tenant_service),
 ):
     filters: dict = {}
@@ -69,11 +124,20 @@ async def list_tenant_paginated(
         page=page,
         page_size=page_size,
         order_by=order_by,
+        cursor=cursor,
+        count=count,
         **filters,
     )
     return TenantPage(
         items=[TenantOut.model_validate(x) for x in result.items],
-        meta=PageMeta(total=result.total, page=result.page, page_size=result.page_size, pages=result.pages),
+        meta=PageMeta(
+            total=result.total,
+            page=result.page,
+            page_size=result.page_size,
+            pages=result.pages,
+            has_next=result.has_next,
+            next_cursor=result.next_cursor,
+        ),
     )
 
 
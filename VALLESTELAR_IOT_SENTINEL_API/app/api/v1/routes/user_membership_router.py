@@ -3,11 +3,12 @@ from __future__ import annotations
 from typing import Optional, Sequence
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from tortoise.exceptions import IntegrityError
 
 from app.models.entities import UserMembership
 from app.services.generic_service import GenericService
+from app.dbs.postgres.generic_repository import CountMode
 from app.services.service_factory import service_factory
 
 from app.schemas.user_membership_schema import (
@@ -17,11 +18,25 @@ from app.schemas.user_membership_schema import (
     UserMembershipPage,
     PageMeta,
 )
+from app.schemas.bulk_schema import (
+    MAX_BULK_ITEMS,
+    BulkConflict,
+    BulkDeleteResult,
+    BulkIds,
+    BulkUpdate,
+    BulkUpdateResult,
+    BulkUpsertResult,
+    bulk_changes,
+)
 
 from app.core.auth.dependencies import require_access_token
+from app.core.auth.principal_cache import invalidate_user
 # router = APIRouter(prefix="/api/v1/user-memberships", tags=["UserMemberships"], dependencies=[Depends(require_access_token())])
 router = APIRouter(prefix="/api/v1/user-memberships", tags=["UserMemberships"])
 
+# changes of PATCH /bulk: every field optional, unique-key columns rejected
+UserMembershipBulkChanges = bulk_changes(UserMembershipUpdate, UserMembership)
+
 
 async def get_user_membership_service() -> GenericService[UserMembership]:
     return service_factory.get(UserMembership)
@@ -42,6 +57,74 @@ async def create_user_membership(
         )
 
 
+@router.post("/bulk", response_model=list[UserMembershipOut], status_code=status.HTTP_201_CREATED)
+async def create_user_membership_bulk(
+    payload: list[UserMembershipCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    svc: GenericService[UserMembership] = Depends(get_user_membership_service),
+):
+    """Creates every item in one transaction: all or none"""
+    try:
+        objs = await svc.bulk_create([x.model_dump() for x in payload])
+        return [UserMembershipOut.model_validate(x) for x in objs]
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="UserMembership batch contains an existing unique key or an unknown reference",
+        )
+
+
+@router.put("/bulk", response_model=BulkUpsertResult)
+async def upsert_user_membership_bulk(
+    payload: list[UserMembershipCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    on_conflict: BulkConflict = Query("update", description="Items whose unique key already exists: update or ignore"),
+    svc: GenericService[UserMembership] = Depends(get_user_membership_service),
+):
+    """Inserts the items, or updates the rows with the same unique key, in one transaction"""
+    try:
+        result = await svc.bulk_upsert([x.model_dump() for x in payload], on_conflict=on_conflict)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="UserMembership batch contains another existing unique key or an unknown reference",
+        )
+    # roles may have changed: cached principals of these users are stale
+    for user_id in {x.user_id for x in payload}:
+        invalidate_user(user_id)
+    return BulkUpsertResult(inserted=result.inserted, updated=result.updated, skipped=result.skipped)
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+async def update_user_membership_bulk(
+    payload: BulkUpdate[UserMembershipBulkChanges],
+    svc: GenericService[UserMembership] = Depends(get_user_membership_service),
+):
+    """Applies the same changes to every id with a single UPDATE"""
+    try:
+        # the role may change: cached principals of the users are stale
+        current = await svc.list(id__in=payload.ids, use_primary=True)
+        updated = await svc.bulk_update(payload.ids, **payload.changes.model_dump(exclude_unset=True))
+        for user_id in {m.user_id for m in current}:
+            invalidate_user(user_id)
+        return BulkUpdateResult(updated=updated)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="UserMembership with same unique key already exists",
+        )
+
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_user_membership_bulk(
+    payload: BulkIds,
+    svc: GenericService[UserMembership] = Depends(get_user_membership_service),
+):
+    current = await svc.list(id__in=payload.ids, use_primary=True)
+    deleted = await svc.bulk_delete(payload.ids)
+    for user_id in {m.user_id for m in current}:
+        invalidate_user(user_id)
+    return BulkDeleteResult(deleted=deleted)
+
+
 @router.get("/{obj_id}", response_model=UserMembershipOut)
 async def get_user_membership(
     obj_id: UUID,
@@ -59,6 +142,8 @@ async def list_user_membership_paginated(
     page_size: int = Query(20, ge=1, le=200),
     q: Optional[str] = Query(None, description="Search (icontains)"),
     order_by: Optional[Sequence[str]] = Query(None, description='Order fields, e.g: ["name","-created_at"]'),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page (keyset pagination)"),
+    count: Optional[CountMode] = Query(None, description="Total: exact|estimated|none (default exact, none with cursor)"),
     svc: GenericService[UserMembership] = Depends(get_user_membership_service),
 ):
     filters: dict = {}
@@ -69,11 +154,20 @@ async def list_user_membership_paginated(
         page=page,
         page_size=page_size,
         order_by=order_by,
+        cursor=cursor,
+        count=count,
         **filters,
     )
     return UserMembershipPage(
         items=[UserMembershipOut.model_validate(x) for x in result.items],
-        meta=PageMeta(total=result.total, page=result.page, page_size=result.page_size, pages=result.pages),
+        meta=PageMeta(
+            total=result.total,
+            page=result.page,
+            page_size=result.page_size,
+            pages=result.pages,
+            has_next=result.has_next,
+            next_cursor=result.next_cursor,
+        ),
     )
 
 
@@ -84,9 +178,15 @@ async def update_user_membership(
     svc: GenericService[UserMembership] = Depends(get_user_membership_service),
 ):
     try:
+        current = await svc.get(obj_id, use_primary=True)
+        if not current:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="UserMembership not found")
         updated = await svc.update(obj_id, **payload.model_dump(exclude_unset=True))
         if not updated:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="UserMembership not found")
+        # role or user/tenant may have changed: cached principals of both users are stale
+        invalidate_user(current.user_id)
+        invalidate_user(updated.user_id)
         return UserMembershipOut.model_validate(updated)
     except IntegrityError:
         raise HTTPException(
@@ -100,7 +200,9 @@ async def delete_user_membership(
     obj_id: UUID,
     svc: GenericService[UserMembership] = Depends(get_user_membership_service),
 ):
+    current = await svc.get(obj_id, use_primary=True)
     deleted = await svc.delete(obj_id)
     if deleted == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="UserMembership not found")
+    invalidate_user(current.user_id)
     return {"deleted": deleted}
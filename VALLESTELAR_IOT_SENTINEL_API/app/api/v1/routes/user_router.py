@@ -1,16 +1,19 @@
 # app/api/v1/user_router.py
 from __future__ import annotations
+import asyncio
 from typing import Optional, Sequence
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from tortoise.exceptions import IntegrityError
 
 from app.models.entities import User
 from app.services.generic_service import GenericService
+from app.dbs.postgres.generic_repository import CountMode
 from app.services.service_factory import service_factory
 
-from app.core.security.passwords import hash_password
+from app.core.config import settings
+from app.core.security.passwords import hash_password_async
 from tortoise.transactions import in_transaction
 from app.models.entities import UserMembership
 from app.schemas.user_onboard_schema import UserOnboardCreate
@@ -22,10 +25,24 @@ from app.schemas.user_schema import (
     UserPage,
     PageMeta,
 )
+from app.schemas.bulk_schema import (
+    BulkDeleteResult,
+    BulkIds,
+    BulkUpdate,
+    BulkUpdateResult,
+    bulk_changes,
+)
 
 from app.core.auth.dependencies import require_access_token
+from app.core.auth.principal_cache import invalidate_user
 router = APIRouter(prefix="/api/v1/users", tags=["Users"])
 
+# changes of PATCH /bulk: every field optional, unique-key columns rejected
+UserBulkChanges = bulk_changes(UserUpdate, User)
+
+# every user of a bulk create goes through bcrypt (~250ms each)
+MAX_BULK_USERS = 100
+
 
 async def get_user_service() -> GenericService[User]:
     return service_factory.get(User)
@@ -37,12 +54,14 @@ async def onboard_user(payload: UserOnboardCreate):
     - Crea User con password hasheada (password_hash)
     - Crea UserMembership con tenant_id + role
     """
+    # hash fuera de la transacción: no retener una conexión mientras corre bcrypt
+    password_hash = await hash_password_async(payload.password)
     try:
         async with in_transaction():
             # 1) Crear User
             user = await User.create(
                 email=payload.email,
-                password_hash=hash_password(payload.password),
+                password_hash=password_hash,
                 full_name=payload.full_name,
                 status=payload.status,
                 metadata=payload.user_metadata or {},
@@ -89,7 +108,7 @@ async def create_user(
             )
 
         # ✅ su entidad usa password_hash
-        data["password_hash"] = hash_password(password)
+        data["password_hash"] = await hash_password_async(password)
 
         obj = await svc.create(**data)
         return UserOut.model_validate(obj)
@@ -101,6 +120,69 @@ async def create_user(
         )
 
 
+@router.post("/bulk", response_model=list[UserOut], status_code=status.HTTP_201_CREATED)
+async def create_user_bulk(
+    payload: list[UserCreate] = Body(..., min_length=1, max_length=MAX_BULK_USERS),
+    svc: GenericService[User] = Depends(get_user_service),
+):
+    """Creates every user in one transaction: all or none"""
+    rows = [x.model_dump() for x in payload]
+    # bcrypt a few at a time (PASSWORD_HASH_WORKERS): a big batch must not fill the hasher queue
+    step = settings.password_hash_workers
+    for i in range(0, len(rows), step):
+        chunk = rows[i:i + step]
+        hashes = await asyncio.gather(*(hash_password_async(r.pop("password")) for r in chunk))
+        for r, h in zip(chunk, hashes):
+            r["password_hash"] = h
+    try:
+        objs = await svc.bulk_create(rows)
+        return [UserOut.model_validate(x) for x in objs]
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User batch contains an existing unique key",
+        )
+
+
+@router.patch("/bulk", response_model=BulkUpdateResult)
+async def update_user_bulk(
+    payload: BulkUpdate[UserBulkChanges],
+    svc: GenericService[User] = Depends(get_user_service),
+):
+    """Applies the same changes to every id with a single UPDATE"""
+    try:
+        data = payload.changes.model_dump(exclude_unset=True)
+        if "password" in data:
+            new_password = data.pop("password")
+            if not new_password:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="password no puede ser vacía",
+                )
+            data["password_hash"] = await hash_password_async(new_password)
+
+        updated = await svc.bulk_update(payload.ids, **data)
+        for user_id in payload.ids:
+            invalidate_user(user_id)
+        return BulkUpdateResult(updated=updated)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User with same unique key already exists",
+        )
+
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_user_bulk(
+    payload: BulkIds,
+    svc: GenericService[User] = Depends(get_user_service),
+):
+    deleted = await svc.bulk_delete(payload.ids)
+    for user_id in payload.ids:
+        invalidate_user(user_id)
+    return BulkDeleteResult(deleted=deleted)
+
+
 @router.get("/{obj_id}", response_model=UserOut)
 async def get_user(
     obj_id: UUID,
@@ -118,6 +200,8 @@ async def list_user_paginated(
     page_size: int = Query(20, ge=1, le=200),
     q: Optional[str] = Query(None, description="Search (icontains)"),
     order_by: Optional[Sequence[str]] = Query(None, description='Order fields, e.g: ["name","-created_at"]'),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page (keyset pagination)"),
+    count: Optional[CountMode] = Query(None, description="Total: exact|estimated|none (default exact, none with cursor)"),
     svc: GenericService[User] = Depends(get_user_service),
 ):
     filters: dict = {}
@@ -128,11 +212,20 @@ async def list_user_paginated(
         page=page,
         page_size=page_size,
         order_by=order_by,
+        cursor=cursor,
+        count=count,
         **filters,
     )
     return UserPage(
         items=[UserOut.model_validate(x) for x in result.items],
-        meta=PageMeta(total=result.total, page=result.page, page_size=result.page_size, pages=result.pages),
+        meta=PageMeta(
+            total=result.total,
+            page=result.page,
+            page_size=result.page_size,
+            pages=result.pages,
+            has_next=result.has_next,
+            next_cursor=result.next_cursor,
+        ),
     )
 
 
@@ -152,11 +245,12 @@ async def update_user(
                     status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                     detail="password no puede ser vacía",
                 )
-            data["password_hash"] = hash_password(new_password)
+            data["password_hash"] = await hash_password_async(new_password)
 
         updated = await svc.update(obj_id, **data)
         if not updated:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        invalidate_user(obj_id)
         return UserOut.model_validate(updated)
 
     except IntegrityError:
@@ -174,4 +268,5 @@ async def delete_user(
     deleted = await svc.delete(obj_id)
     if deleted == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    invalidate_user(obj_id)
     return {"deleted": deleted}
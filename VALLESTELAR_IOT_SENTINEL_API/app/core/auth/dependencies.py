@@ -6,11 +6,38 @@ from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from app.services.auth_service import AuthService
-from app.repositories.user_repository import get_user_by_id, user_has_membership
+from app.repositories.user_repository import get_membership, get_user_by_id
+from app.core.auth.principal_cache import Principal, get_principal, set_principal
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
 
+async def _load_principal(user_id: str, tenant_id: str) -> Principal:
+    """User + membership from the DB; failures are not cached"""
+    user = await get_user_by_id(user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario no válido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if hasattr(user, "is_active") and not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Usuario inactivo",
+        )
+
+    membership = await get_membership(user_id=str(user.id), tenant_id=tenant_id)
+    if membership is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Usuario no pertenece a este tenant",
+        )
+
+    return Principal(user_id=str(user.id), tenant_id=tenant_id, role=membership.role, user=user)
+
+
 def require_access_token() -> Callable:
     async def _dependency(
         request: Request,
@@ -55,29 +82,16 @@ def require_access_token() -> Callable:
                 detail="Tenant no coincide con el token",
             )
 
-        user = await get_user_by_id(str(user_id))
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Usuario no válido",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        if hasattr(user, "is_active") and not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Usuario inactivo",
-            )
-
-        if not await user_has_membership(user_id=str(user.id), tenant_id=str(tenant_in_token)):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Usuario no pertenece a este tenant",
-            )
+        principal = get_principal(str(user_id), str(tenant_in_token))
+        if principal is None:
+            principal = await _load_principal(str(user_id), str(tenant_in_token))
+            set_principal(principal)
+        user = principal.user
 
         request.state.user_id = str(user.id)
         request.state.tenant = str(tenant_in_token)
         request.state.token_payload = payload
         request.state.user = user
+        request.state.role = principal.role
 
     return _dependency
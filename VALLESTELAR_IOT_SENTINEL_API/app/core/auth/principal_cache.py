@@ -0,0 +1,44 @@
+# app/core/auth/principal_cache.py
+"""
+Cache of authenticated principals for require_access_token: (user_id, tenant) -> user and
+membership role, so a protected request does not query users and user_memberships every time.
+
+Entries are dropped when the user or its memberships change through the API
+(invalidate_user) and expire after PRINCIPAL_CACHE_TTL_SECONDS, which bounds how long
+another worker process can keep a stale entry.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.entities import User
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: str
+    tenant_id: str
+    role: str
+    user: User  # snapshot loaded from the DB, shared between requests: read only
+
+
+principal_cache: TTLCache[tuple[str, str], Principal] = TTLCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl_seconds,
+)
+
+
+def get_principal(user_id: str, tenant_id: str) -> Optional[Principal]:
+    return principal_cache.get((user_id, tenant_id))
+
+
+def set_principal(principal: Principal) -> None:
+    principal_cache.set((principal.user_id, principal.tenant_id), principal)
+
+
+def invalidate_user(user_id: Any) -> None:
+    """Drops every cached principal of the user (all tenants)"""
+    user_id = str(user_id)
+    principal_cache.pop_where(lambda key: key[0] == user_id)
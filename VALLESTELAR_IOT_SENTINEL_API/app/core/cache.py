@@ -0,0 +1,70 @@
+# app/core/cache.py
+"""
+In-process LRU cache with expiry, for hot lookups on the request path (auth).
+
+Each worker process has its own copy: invalidations only reach the process where they
+happen, so entries must also carry a TTL that bounds how stale another worker can be.
+"""
+from __future__ import annotations
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> Optional[V]:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """ttl overrides the default one for this entry (seconds)"""
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def pop_where(self, predicate: Callable[[K], bool]) -> int:
+        keys = [k for k in self._data if predicate(k)]
+        for k in keys:
+            del self._data[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -8,4 +8,85 @@ class Settings:
     jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+    # Authenticated principals cached per process (user + membership), see core/auth/principal_cache.py
+    principal_cache_ttl_seconds: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    principal_cache_size: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    # Verified JWT claims cached by token digest until the token expires
+    token_cache_size: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+    # bcrypt runs in a thread pool: at most PASSWORD_HASH_WORKERS at once, and at most
+    # PASSWORD_HASH_MAX_QUEUE calls waiting (beyond that the request gets a 503)
+    password_hash_workers: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    password_hash_max_queue: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+    # Access log: one "request" record per request (core/middleware.py). Path prefixes in
+    # ACCESS_LOG_EXCLUDE_PATHS are never logged; the rest is sampled (ACCESS_LOG_SAMPLE_RATE,
+    # or <path prefix>:<rate>,... in ACCESS_LOG_SAMPLE_RATES). 5xx and requests slower than
+    # ACCESS_LOG_SLOW_MS are always logged.
+    access_log_exclude_paths: str = os.getenv("ACCESS_LOG_EXCLUDE_PATHS", "/health,/metrics,/static")
+    access_log_sample_rate: float = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+    access_log_sample_rates: str = os.getenv("ACCESS_LOG_SAMPLE_RATES", "")
+    access_log_slow_ms: float = float(os.getenv("ACCESS_LOG_SLOW_MS", "1000"))
+
+    # asyncpg pool of each process (API and workers), see dbs/postgres/context.py
+    db_pool_min_size: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    db_pool_max_size: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    # idle connections are closed after this many seconds (0 = never)
+    db_pool_max_inactive_connection_lifetime: float = float(os.getenv("DB_POOL_MAX_INACTIVE_CONNECTION_LIFETIME", "300"))
+    # prepared statements cached per connection (0 disables it, needed behind pgbouncer in transaction mode)
+    db_statement_cache_size: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+    # seconds before a query is cancelled (0 = no timeout)
+    db_command_timeout: float = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+
+    # MQTT broker (ingestion worker)
+    mqtt_host: str = os.getenv("MQTT_HOST", "localhost")
+    mqtt_port: int = int(os.getenv("MQTT_PORT", "1883"))
+    mqtt_username: str | None = os.getenv("MQTT_USERNAME") or None
+    mqtt_password: str | None = os.getenv("MQTT_PASSWORD") or None
+    mqtt_topic_prefix: str = os.getenv("MQTT_TOPIC_PREFIX", "sentinel")
+
+    # Micro-batching of readings before they are written to Postgres
+    ingest_batch_size: int = int(os.getenv("INGEST_BATCH_SIZE", "2000"))
+    ingest_flush_seconds: float = float(os.getenv("INGEST_FLUSH_SECONDS", "1.0"))
+    ingest_queue_size: int = int(os.getenv("INGEST_QUEUE_SIZE", "20000"))
+    # MQTT 5 Receive Maximum: messages the broker sends before waiting for their acks, which
+    # are sent once the readings are stored (at most 65535)
+    ingest_max_unacked: int = int(os.getenv("INGEST_MAX_UNACKED", "10000"))
+    # shared subscription group of the ingestion workers ($share/<group>/...), so several of
+    # them split the readings instead of each getting all of them (empty = plain subscription)
+    ingest_shared_group: str = os.getenv("INGEST_SHARED_GROUP", "sentinel-ingestion")
+
+    # Rule engine (services/rule_engine.py), run by the rule evaluator worker only: every
+    # RULE_POLL_SECONDS it evaluates the readings stored since the previous poll
+    rule_engine_enabled: bool = os.getenv("RULE_ENGINE_ENABLED", "true").lower() in ("1", "true", "yes")
+    rule_poll_seconds: float = float(os.getenv("RULE_POLL_SECONDS", "1.0"))
+    # readings kept in memory per sensor for windowed conditions (beyond it the oldest go first)
+    rule_window_max_samples: int = int(os.getenv("RULE_WINDOW_MAX_SAMPLES", "10000"))
+
+    # Events (services/event_service.py): occurrences of an open (site, event_type, source_id)
+    # seen in the last EVENT_DEDUP_WINDOW_SECONDS are counted on it instead of inserted (0 = off),
+    # and each site gets at most EVENT_RATE_LIMIT_PER_MINUTE new events (0 = no limit)
+    event_dedup_window_seconds: float = float(os.getenv("EVENT_DEDUP_WINDOW_SECONDS", "900"))
+    event_rate_limit_per_minute: int = int(os.getenv("EVENT_RATE_LIMIT_PER_MINUTE", "60"))
+
+    # Command dispatcher worker: actuators claimed per transaction, poll interval when no NOTIFY
+    # arrives, and seconds a sent command waits for its ack before it is marked failed
+    command_batch_size: int = int(os.getenv("COMMAND_BATCH_SIZE", "100"))
+    command_poll_seconds: float = float(os.getenv("COMMAND_POLL_SECONDS", "5"))
+    command_ack_timeout_seconds: float = float(os.getenv("COMMAND_ACK_TIMEOUT_SECONDS", "60"))
+    # shared subscription group of the dispatchers for the device acks ($share/<group>/...), so
+    # each ack is written by one dispatcher (empty = plain subscription)
+    command_shared_group: str = os.getenv("COMMAND_SHARED_GROUP", "sentinel-dispatcher")
+
+    # Rollup worker (daily_metrics from sensor_readings_5m)
+    rollup_interval_seconds: float = float(os.getenv("ROLLUP_INTERVAL_SECONDS", "300"))
+    # readings created in the last seconds are left for the next run (transactions still in flight)
+    rollup_lag_seconds: float = float(os.getenv("ROLLUP_LAG_SECONDS", "60"))
+
+    # Partition maintenance worker (sensor_readings_5m)
+    partition_months_ahead: int = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+    partition_maintenance_interval_seconds: float = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL_SECONDS", "3600"))
+    # <plan>:<days>,... plans not listed keep their readings forever
+    retention_days_by_plan: str = os.getenv("RETENTION_DAYS_BY_PLAN", "agua:365,terreno:365,total:730,enterprise:1825")
+
 settings = Settings()
@@ -0,0 +1,10 @@
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from .domain_exceptions import ServiceBusyError
+
+async def service_busy_handler(_: Request, exc: ServiceBusyError):
+    content = {
+        "error": "service_busy",
+        "detail": exc.detail,
+    }
+    return JSONResponse(status_code=503, content=content, headers={"Retry-After": str(exc.retry_after)})
@@ -3,4 +3,15 @@ class ConflictError(Exception):
     def __init__(self, detail: str, code: str | None = None, meta: dict | None = None):
         self.detail = detail
         self.code = code
-        self.meta = meta or {}
\ No newline at end of file
+        self.meta = meta or {}
+
+
+class InvalidCursorError(Exception):
+    def __init__(self, detail: str):
+        self.detail = detail
+
+
+class ServiceBusyError(Exception):
+    def __init__(self, detail: str, retry_after: int = 1):
+        self.detail = detail
+        self.retry_after = retry_after
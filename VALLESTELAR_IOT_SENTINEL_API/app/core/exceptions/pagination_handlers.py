@@ -0,0 +1,10 @@
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from .domain_exceptions import InvalidCursorError
+
+async def invalid_cursor_handler(_: Request, exc: InvalidCursorError):
+    content = {
+        "error": "invalid_cursor",
+        "detail": exc.detail,
+    }
+    return JSONResponse(status_code=400, content=content)
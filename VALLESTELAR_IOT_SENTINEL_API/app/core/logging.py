@@ -1,24 +1,64 @@
+import atexit
 import logging
 import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
 from pythonjsonlogger import jsonlogger
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
+_listener: Optional[QueueListener] = None
+
+
+class _ThreadQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread, which formats (JSON) and writes them.
+    The record is passed as is (same process, no pickling): only the message is resolved
+    here, so later changes to the args cannot alter it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
 def configure_logging():
+    global _listener
+
     root = logging.getLogger()
     root.setLevel(LOG_LEVEL)
 
     # Clear existing handlers in case of re-execution (tests / reload)
     for h in list(root.handlers):
         root.removeHandler(h)
+    _stop_listener()
 
     handler = logging.StreamHandler(sys.stdout)
     fmt = jsonlogger.JsonFormatter(
         "%(asctime)s %(levelname)s %(name)s %(message)s %(pathname)s %(lineno)s %(process)d %(threadName)s"
     )
     handler.setFormatter(fmt)
-    root.addHandler(handler)
+
+    # Formatting and the write to stdout happen in a background thread: logging never
+    # blocks the event loop. Records still queued are flushed at exit.
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root.addHandler(_ThreadQueueHandler(log_queue))
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
 
     # Adjust log levels to reduce noise from common libraries
     logging.getLogger("uvicorn").setLevel(LOG_LEVEL)
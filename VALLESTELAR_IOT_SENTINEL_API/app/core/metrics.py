@@ -0,0 +1,119 @@
+# app/core/metrics.py
+"""
+Prometheus metrics of the API process, served at /metrics.
+
+- http_*: per request, labelled by route template (/api/v1/sensors/{obj_id}, never the raw
+  path), status and tenant
+- http_request_db_*: queries run by one request and their time, taken from the asyncpg
+  query logger installed on every pool connection (instrumented_pool.py)
+- db_pool_* / cache_* / password_hash_*: read from the existing stats when scraped
+
+Metrics are per process: with several uvicorn workers, scrape each one.
+"""
+from __future__ import annotations
+
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import REGISTRY, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status", "tenant"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status", "tenant"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being served", ["method"]
+)
+HTTP_DB_QUERIES = Histogram(
+    "http_request_db_queries", "DB queries run by one request", ["method", "route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+HTTP_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent in DB queries by one request", ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Counter("db_queries_total", "DB queries", ["connection"])
+DB_QUERY_SECONDS = Counter("db_query_seconds_total", "Time spent in DB queries", ["connection"])
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+
+
+# DB work of the request being served (None outside a request: workers, startup)
+_request_queries: ContextVar[Optional[QueryStats]] = ContextVar("request_queries", default=None)
+
+
+def start_request_queries() -> QueryStats:
+    stats = QueryStats()
+    _request_queries.set(stats)
+    return stats
+
+
+def record_query(connection: str, elapsed: float) -> None:
+    """Called for every query run on a pool connection"""
+    DB_QUERIES.labels(connection).inc()
+    DB_QUERY_SECONDS.labels(connection).inc(elapsed)
+    stats = _request_queries.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+
+def _add_stats(family: GaugeMetricFamily, labels: list[str], stats: dict) -> None:
+    for stat, value in stats.items():
+        if value is not None:  # e.g. hit_rate before the first lookup
+            family.add_metric([*labels, stat], value)
+
+
+class _StatsCollector(Collector):
+    """Pool, cache and password hasher stats, read at scrape time"""
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        # lets the registry check names without calling collect() at import time
+        yield GaugeMetricFamily("db_pool", "asyncpg pool utilization", labels=["connection", "stat"])
+        yield GaugeMetricFamily("cache", "In-process caches", labels=["cache", "stat"])
+        yield GaugeMetricFamily("password_hash", "bcrypt thread pool", labels=["stat"])
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        # imported here: the DB layer imports this module (record_query)
+        from app.core.auth.principal_cache import principal_cache
+        from app.core.security.passwords import hasher_stats
+        from app.dbs.postgres.instrumented_pool import pool_stats
+        from app.services.auth_service import AuthService
+
+        pool = GaugeMetricFamily("db_pool", "asyncpg pool utilization", labels=["connection", "stat"])
+        try:
+            pools = pool_stats()
+        except Exception:  # Tortoise not initialized yet
+            pools = {}
+        for name, stats in pools.items():
+            _add_stats(pool, [name], stats)
+        yield pool
+
+        cache = GaugeMetricFamily("cache", "In-process caches", labels=["cache", "stat"])
+        _add_stats(cache, ["principal"], principal_cache.stats())
+        _add_stats(cache, ["token"], AuthService.token_cache_stats())
+        yield cache
+
+        hasher = GaugeMetricFamily("password_hash", "bcrypt thread pool", labels=["stat"])
+        _add_stats(hasher, [], hasher_stats.as_dict())
+        yield hasher
+
+
+REGISTRY.register(_StatsCollector())
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
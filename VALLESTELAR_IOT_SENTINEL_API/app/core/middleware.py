@@ -1,10 +1,48 @@
+import random
+import time
 import uuid
 import logging
 from fastapi import Request
 
+from app.core.config import settings
+
+from app.core.metrics import (
+    HTTP_DB_QUERIES,
+    HTTP_DB_SECONDS,
+    HTTP_IN_PROGRESS,
+    HTTP_LATENCY,
+    HTTP_REQUESTS,
+    start_request_queries,
+)
+
 log = logging.getLogger("app")
 
-# Middleware for request correlation and trace logging
+
+def _parse_sample_rates(spec: str) -> list[tuple[str, float]]:
+    """'/api/v1/sensor-readings:0.1,/api/v1/events:0.5' -> longest prefix first"""
+    out: list[tuple[str, float]] = []
+    for item in spec.split(","):
+        if ":" in item:
+            prefix, rate = item.rsplit(":", 1)
+            out.append((prefix.strip(), float(rate)))
+    return sorted(out, key=lambda x: len(x[0]), reverse=True)
+
+
+_EXCLUDED_PATHS = tuple(p.strip() for p in settings.access_log_exclude_paths.split(",") if p.strip())
+_SAMPLE_RATES = _parse_sample_rates(settings.access_log_sample_rates)
+
+
+def _sample_rate(path: str) -> float:
+    if path.startswith(_EXCLUDED_PATHS):
+        return 0.0
+    for prefix, rate in _SAMPLE_RATES:
+        if path.startswith(prefix):
+            return rate
+    return settings.access_log_sample_rate
+
+
+# Middleware for request correlation and access logging: one "request" record per request,
+# written after the response with its duration
 async def log_requests(request: Request, call_next):
     # Reuse existing IDs if provided by ALB/ECS/X-Ray; otherwise generate a new one
     req_id = request.headers.get("X-Request-Id") \
@@ -14,23 +52,65 @@ async def log_requests(request: Request, call_next):
     # Store the request ID in the request state so it can be accessed later
     request.state.request_id = req_id
 
-    # Log the start of the request
-    log.info("request.start",
-             extra={"path": request.url.path, "method": request.method, "request_id": req_id})
+    started_at = time.perf_counter()
     try:
         # Process the request and get the response
         response = await call_next(request)
     except Exception as ex:
-        # Log the error if an exception occurs during request handling
+        # Errors are always logged, whatever the sampling
         log.exception("request.error",
-                      extra={"request_id": req_id, "path": request.url.path, "method": request.method})
+                      extra={"request_id": req_id, "path": request.url.path, "method": request.method,
+                             "duration_ms": round((time.perf_counter() - started_at) * 1000, 2)})
         raise
 
     # Include the request ID in the response headers to propagate downstream
     response.headers["X-Request-Id"] = req_id
 
-    # Log the end of the request including the status code
-    log.info("request.end",
-             extra={"path": request.url.path, "method": request.method,
-                    "status_code": response.status_code, "request_id": req_id})
+    # 5xx and slow requests are always logged; the rest per path (excluded / sampled)
+    duration_ms = (time.perf_counter() - started_at) * 1000
+    if response.status_code < 500 and duration_ms < settings.access_log_slow_ms:
+        rate = _sample_rate(request.url.path)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return response
+
+    if log.isEnabledFor(logging.INFO):
+        log.info("request",
+                 extra={"path": request.url.path, "method": request.method,
+                        "status_code": response.status_code, "duration_ms": round(duration_ms, 2),
+                        "request_id": req_id, "tenant": getattr(request.state, "tenant", None)})
     return response
+
+
+def _route_template(request: Request) -> str:
+    """
+    Path template of the route that served the request (labels must not contain raw ids).
+    Read after call_next: the router stores the route it matched in the scope (also when
+    only the path matched, a 405), so no route is matched twice.
+    """
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+# Middleware for Prometheus metrics (see core/metrics.py)
+async def track_metrics(request: Request, call_next):
+    method = request.method
+    queries = start_request_queries()
+    # by method only: the route is known once the request has been routed
+    in_progress = HTTP_IN_PROGRESS.labels(method)
+    in_progress.inc()
+    started_at = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        elapsed = time.perf_counter() - started_at
+        in_progress.dec()
+        route = _route_template(request)
+        # set by require_access_token on authenticated routes
+        tenant = getattr(request.state, "tenant", None) or "none"
+        HTTP_REQUESTS.labels(method, route, status, tenant).inc()
+        HTTP_LATENCY.labels(method, route, status, tenant).observe(elapsed)
+        HTTP_DB_QUERIES.labels(method, route).observe(queries.count)
+        HTTP_DB_SECONDS.labels(method, route).observe(queries.seconds)
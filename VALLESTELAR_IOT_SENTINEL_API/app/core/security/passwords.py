@@ -1,7 +1,17 @@
 # app/core/security/passwords.py
+import asyncio
 import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
 from passlib.context import CryptContext
 
+from app.core.config import settings
+from app.core.exceptions.domain_exceptions import ServiceBusyError
+
+T = TypeVar("T")
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -27,3 +37,73 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     normalized = _normalize_password(plain_password)
     return pwd_context.verify(normalized, hashed_password)
+
+
+# ---------- async API (bcrypt off the event loop) ----------
+# bcrypt takes ~250ms of CPU per call and releases the GIL, so it runs in a small thread
+# pool. The semaphore caps the calls in the pool; callers beyond PASSWORD_HASH_MAX_QUEUE
+# waiting are rejected instead of piling up.
+
+_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt")
+_slots = asyncio.Semaphore(settings.password_hash_workers)
+
+
+class _HasherStats:
+    def __init__(self) -> None:
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "workers": settings.password_hash_workers,
+            "max_queue": settings.password_hash_max_queue,
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            "wait_seconds_max": round(self.wait_seconds_max, 3),
+            "run_seconds_total": round(self.run_seconds_total, 3),
+        }
+
+
+hasher_stats = _HasherStats()
+
+
+async def _run_in_pool(fn: Callable[..., T], *args: Any) -> T:
+    if hasher_stats.waiting >= settings.password_hash_max_queue:
+        hasher_stats.rejected += 1
+        raise ServiceBusyError("Demasiadas operaciones de contraseña en curso, reintente", retry_after=1)
+
+    queued_at = time.perf_counter()
+    hasher_stats.waiting += 1
+    try:
+        await _slots.acquire()
+    finally:
+        hasher_stats.waiting -= 1
+
+    started_at = time.perf_counter()
+    wait = started_at - queued_at
+    hasher_stats.wait_seconds_total += wait
+    hasher_stats.wait_seconds_max = max(hasher_stats.wait_seconds_max, wait)
+    hasher_stats.running += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        hasher_stats.running -= 1
+        hasher_stats.completed += 1
+        hasher_stats.run_seconds_total += time.perf_counter() - started_at
+        _slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_pool(verify_password, plain_password, hashed_password)
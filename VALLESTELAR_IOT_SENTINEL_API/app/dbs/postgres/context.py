@@ -3,28 +3,68 @@ import os
 from dotenv import load_dotenv
 from tortoise import Tortoise
 
+from app.dbs.postgres.instrumented_pool import pool_stats
+
 load_dotenv()  # Carga las variables del .env
 
+from app.core.config import settings
+
+MODELS = ["app.models.entities", "aerich.models"]
+
+# Read-only connection to a streaming replica (only when POSTGRES_REPLICA_HOST is set),
+# see GenericRepository / read_db()
+REPLICA_CONNECTION = "replica"
+
+
+def connection_config(
+    host: str | None = None,
+    port: str | None = None,
+    *,
+    default_password: str = "",
+    default_database: str = "postgres",
+) -> dict:
+    """
+    Credentials of a connection (the primary by default), pool settings included.
+    default_password / default_database apply when POSTGRES_PASSWORD / POSTGRES_DB are unset.
+    """
+    return {
+        "engine": "app.dbs.postgres.instrumented_pool",
+        "credentials": {
+            "host": host or os.getenv("POSTGRES_HOST", "localhost"),
+            "port": int(port or os.getenv("POSTGRES_PORT", "5432")),
+            "user": os.getenv("POSTGRES_USER", "postgres"),
+            "password": os.getenv("POSTGRES_PASSWORD", default_password),
+            "database": os.getenv("POSTGRES_DB", default_database),
+            "minsize": settings.db_pool_min_size,
+            "maxsize": settings.db_pool_max_size,
+            "max_inactive_connection_lifetime": settings.db_pool_max_inactive_connection_lifetime,
+            "statement_cache_size": settings.db_statement_cache_size,
+            "command_timeout": settings.db_command_timeout or None,
+        },
+    }
+
+
+def build_tortoise_config(**defaults: str) -> dict:
+    """Tortoise config of the app; `defaults` are passed to connection_config()"""
+    connections = {"default": connection_config(**defaults)}
+    replica_host = os.getenv("POSTGRES_REPLICA_HOST")
+    if replica_host:
+        connections[REPLICA_CONNECTION] = connection_config(replica_host, os.getenv("POSTGRES_REPLICA_PORT"), **defaults)
+    return {
+        "connections": connections,
+        "apps": {
+            "models": {
+                # Importa todos los modelos desde tu carpeta
+                "models": MODELS,
+                "default_connection": "default",
+            }
+        },
+    }
+
+
 class DbContext:
     def __init__(self):
-        user = os.getenv("POSTGRES_USER", "postgres")
-        password = os.getenv("POSTGRES_PASSWORD", "")
-        host = os.getenv("POSTGRES_HOST", "localhost")
-        port = os.getenv("POSTGRES_PORT", "5432")
-        db_name = os.getenv("POSTGRES_DB", "postgres")
-
-        self.db_url = f"postgres://{user}:{password}@{host}:{port}/{db_name}"
-
-        self.tortoise_config = {
-            "connections": {"default": self.db_url},
-            "apps": {
-                "models": {
-                    # Importa todos los modelos desde tu carpeta
-                    "models": ["app.models.entities", "aerich.models"],
-                    "default_connection": "default",
-                }
-            },
-        }
+        self.tortoise_config = build_tortoise_config()
 
     async def init(self, generate_schemas: bool = False):
         """Initialize the database connection."""
@@ -50,4 +90,8 @@ class DbContext:
             return {"success": True}
         except Exception as e:
             return {"success": False, "error": f"Database connection failed: {e}"}
+
+    def pool_stats(self) -> dict:
+        """In-use / idle connections, waiters and acquire latency of each pool"""
+        return pool_stats()
         
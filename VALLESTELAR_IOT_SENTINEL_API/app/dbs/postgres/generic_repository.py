@@ -1,23 +1,63 @@
 from __future__ import annotations
-from typing import Any, Generic, Iterable, List, Optional, Sequence, Type, TypeVar, Union
+import base64
+import json
+from typing import Any, Generic, Iterable, List, Literal, Optional, Sequence, Type, TypeVar, Union
 from dataclasses import dataclass
 from tortoise.queryset import QuerySet
 from tortoise.models import Model
 from tortoise.queryset import QuerySet
 from tortoise.expressions import Q
+from tortoise.exceptions import IntegrityError
+from tortoise.fields import JSONField
+from tortoise.transactions import in_transaction
+from tortoise import BaseDBAsyncClient, connections
+from tortoise.backends.base.client import BaseTransactionWrapper
+import asyncpg
 
 from uuid6 import uuid7
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
+from uuid import UUID
+
+from app.core.exceptions.domain_exceptions import InvalidCursorError
+from app.dbs.postgres.context import REPLICA_CONNECTION
 
 T = TypeVar("T", bound=Model)
 
+# What to do when a row hits the model's unique key:
+# error -> raise IntegrityError, ignore -> keep the stored row, update -> overwrite it
+ConflictPolicy = Literal["error", "ignore", "update"]
+
+# How list_paginated computes `total`
+CountMode = Literal["exact", "estimated", "none"]
+
+# asyncpg accepts at most 32767 bind parameters per statement
+MAX_QUERY_PARAMS = 32767
+
+def read_db(model: Type[Model], use_primary: bool = False) -> BaseDBAsyncClient:
+    """
+    Connection for reads: the replica when one is configured. The primary is used when the
+    caller must see its own writes (use_primary) or a transaction is open on the primary.
+    """
+    primary = model._meta.db
+    if use_primary or isinstance(primary, BaseTransactionWrapper) or REPLICA_CONNECTION not in connections.db_config:
+        return primary
+    return connections.get(REPLICA_CONNECTION)
+
 @dataclass
 class PageResult(Generic[T]):
     items: List[T]
-    total: int
+    total: Optional[int]
     page: int
     page_size: int
-    pages: int
+    pages: Optional[int]
+    has_next: bool = False
+    next_cursor: Optional[str] = None
+
+@dataclass
+class UpsertResult:
+    inserted: int
+    updated: int
+    skipped: int
 
 class GenericRepository(Generic[T]):
     """
@@ -26,6 +66,8 @@ class GenericRepository(Generic[T]):
     - Q objects: filter complex OR/AND (e.g. Q(name__icontains="a") | Q(email__icontains="a"))
     - Ordering: ["-created_at", "name"]
     - Relationships: select_related/prefetch_related passing names in `related`
+    - Replica: get/list/list_paginated/count/exists read from the replica connection when
+      there is one; use_primary=True for read-your-writes (replication lag)
     """
 
     def __init__(self, model: Type[T], *, default_filters: Optional[dict[str, Any]] = None):
@@ -40,6 +82,9 @@ class GenericRepository(Generic[T]):
     def _base_qs(self) -> QuerySet[T]:
         return self.model.all()
 
+    def _read_qs(self, use_primary: bool = False) -> QuerySet[T]:
+        return self._base_qs().using_db(read_db(self.model, use_primary))
+
     def _apply_related(
         self,
         qs: QuerySet[T],
@@ -55,9 +100,175 @@ class GenericRepository(Generic[T]):
     def _apply_ordering(self, qs: QuerySet[T], order_by: Optional[Sequence[str]]) -> QuerySet[T]:
         return qs.order_by(*order_by) if order_by else qs
 
+    # ------- keyset pagination -------
+    def _keyset_order(self, order_by: Optional[Sequence[str]]) -> List[str]:
+        """
+        Ordering usable as a keyset: the requested fields plus the pk as tie-breaker
+        (ids are uuid7, so with no order_by rows come in insertion order).
+        """
+        keys = list(order_by or [])
+        if self.pk_name not in [k.lstrip("-") for k in keys]:
+            descending = bool(keys) and keys[-1].startswith("-")
+            keys.append(f"-{self.pk_name}" if descending else self.pk_name)
+        return keys
+
+    def _keyset_supported(self, keys: Sequence[str]) -> bool:
+        fields_map = self.model._meta.fields_map
+        return all(k.lstrip("-") in fields_map for k in keys)
+
+    @staticmethod
+    def _cursor_value(value: Any) -> Any:
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, UUID):
+            return str(value)
+        return value
+
+    def _encode_cursor(self, keys: Sequence[str], item: Any) -> str:
+        get = item.get if isinstance(item, dict) else lambda name: getattr(item, name)
+        payload = [list(keys), [self._cursor_value(get(k.lstrip("-"))) for k in keys]]
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _decode_cursor(self, keys: Sequence[str], cursor: str) -> List[Any]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            cursor_keys, values = json.loads(raw)
+        except (ValueError, TypeError):
+            raise InvalidCursorError("Malformed cursor")
+        if cursor_keys != list(keys) or len(values) != len(keys):
+            raise InvalidCursorError("Cursor does not match the requested order_by")
+
+        fields_map = self.model._meta.fields_map
+        out = []
+        for key, value in zip(keys, values):
+            field = fields_map.get(key.lstrip("-"))
+            if field is None or (value is None and not field.null):
+                raise InvalidCursorError(f"Cannot paginate by cursor on '{key}'")
+            out.append(None if value is None else field.to_python_value(value))
+        return out
+
+    def _keyset_filter(self, keys: Sequence[str], values: Sequence[Any]) -> Q:
+        """
+        Rows strictly after `values` in the `keys` ordering:
+            k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...
+        plus a redundant k1 >= v1 so Postgres can range-scan the index on the leading key.
+
+        NULLs of nullable keys sort as Postgres does by default (last ascending, first
+        descending): "after" and "equal" follow that order instead of comparing with NULL.
+        """
+        fields_map = self.model._meta.fields_map
+
+        def equal(name: str, value: Any) -> Q:
+            return Q(**{f"{name}__isnull": True}) if value is None else Q(**{name: value})
+
+        def after(key: str, value: Any) -> Optional[Q]:
+            name, descending = key.lstrip("-"), key.startswith("-")
+            nullable = fields_map[name].null
+            if value is None:
+                # nothing sorts after NULL ascending; every value does descending
+                return Q(**{f"{name}__isnull": False}) if descending else None
+            q = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            return q | Q(**{f"{name}__isnull": True}) if nullable and not descending else q
+
+        clauses = []
+        for i, key in enumerate(keys):
+            tail = after(key, values[i])
+            if tail is not None:
+                clauses.append(Q(*(equal(k.lstrip("-"), v) for k, v in zip(keys[:i], values[:i])), tail))
+
+        first, descending = keys[0].lstrip("-"), keys[0].startswith("-")
+        if values[0] is None:
+            bound = Q() if descending else Q(**{f"{first}__isnull": True})
+        else:
+            bound = Q(**{f"{first}__{'lte' if descending else 'gte'}": values[0]})
+            if fields_map[first].null and not descending:
+                bound |= Q(**{f"{first}__isnull": True})
+        return bound & Q(*clauses, join_type="OR")
+
     def _apply_filters(self, qs: QuerySet[T], *q: Q, **filters: Any) -> QuerySet[T]:
         merged = {**self.default_filters, **filters}
         return qs.filter(*q, **merged) if (q or merged) else qs
+
+    def _db_columns(self) -> List[tuple[str, str, Any]]:
+        """(field name, db column, field) for every column of the table, FK ids included."""
+        meta = self.model._meta
+        return [(name, column, meta.fields_map[name]) for name, column in meta.fields_db_projection.items()]
+
+    def _to_db_row(self, data: dict[str, Any], columns: Sequence[tuple[str, str, Any]], now: datetime) -> tuple:
+        """
+        Builds a raw row for statements that bypass the ORM (COPY, multi-row INSERT).
+        Fills what Model.create() would fill: uuid7 pk, auto_now dates and field defaults.
+        """
+        row = []
+        for name, _, field in columns:
+            value = data.get(name)
+            if value is None:
+                if name == self.pk_name:
+                    value = uuid7()
+                elif getattr(field, "auto_now_add", False):
+                    value = now
+                elif not field.null and field.default is not None:
+                    value = field.default() if callable(field.default) else field.default
+            if value is not None and isinstance(field, JSONField):
+                value = field.to_db_value(value, self.model)
+            row.append(value)
+        return tuple(row)
+
+    def _conflict_fields(self, conflict_fields: Optional[Sequence[str]]) -> tuple[str, ...]:
+        if conflict_fields:
+            return tuple(conflict_fields)
+        unique_together = self.model._meta.unique_together
+        if not unique_together:
+            raise ValueError(f"{self.model.__name__} has no unique key to upsert on")
+        return tuple(unique_together[0])
+
+    def _upsert_sql(
+        self,
+        columns: Sequence[str],
+        n_rows: int,
+        conflict_columns: Sequence[str],
+        update_columns: Sequence[str],
+        on_conflict: ConflictPolicy,
+        returning: str,
+    ) -> str:
+        width = len(columns)
+        values = ", ".join(
+            "(" + ", ".join(f"${r * width + c + 1}" for c in range(width)) + ")"
+            for r in range(n_rows)
+        )
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        if on_conflict == "error":
+            # plain INSERT: a duplicate key raises IntegrityError
+            conflict = ""
+        else:
+            target = ", ".join(f'"{c}"' for c in conflict_columns)
+            if on_conflict == "update" and update_columns:
+                action = "DO UPDATE SET " + ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in update_columns)
+            else:
+                action = "DO NOTHING"
+            conflict = f" ON CONFLICT ({target}) {action}"
+        return (
+            f'INSERT INTO "{self.model._meta.db_table}" ({column_list}) '
+            f"VALUES {values}{conflict} RETURNING {returning}"
+        )
+
+    def _update_columns(
+        self,
+        columns: Sequence[tuple[str, str, Any]],
+        provided: Iterable[str],
+        conflict_fields: Sequence[str],
+        update_fields: Optional[Sequence[str]],
+    ) -> List[str]:
+        """Columns overwritten on conflict: the ones the caller sent (or asked for) plus auto_now ones."""
+        wanted = set(update_fields) if update_fields else set(provided)
+        out = []
+        for name, column, field in columns:
+            if name == self.pk_name or name in conflict_fields or name.startswith("created_"):
+                continue
+            if name in wanted or getattr(field, "auto_now", False):
+                out.append(column)
+        return out
     
     # ------- CRUD -------
     async def create(self, **data: Any) -> T:
@@ -65,8 +276,156 @@ class GenericRepository(Generic[T]):
             data["id"] = uuid7()
         return await self.model.create(**data)
 
-    async def get(self, pk: Any, *, related: Optional[Sequence[str]] = None) -> Optional[T]:
-        qs = self._apply_related(self._base_qs(), related)
+    async def copy_insert(self, rows: Sequence[dict[str, Any]]) -> int:
+        """
+        Inserts many rows with a single PostgreSQL COPY (no per-row INSERT nor model instances).
+        The whole batch fails on any constraint violation; returns the number of rows written.
+        """
+        if not rows:
+            return 0
+        columns = self._db_columns()
+        now = datetime.now(timezone.utc)
+        records = [self._to_db_row(r, columns, now) for r in rows]
+
+        async with self.model._meta.db.acquire_connection() as conn:
+            try:
+                await conn.copy_records_to_table(
+                    self.model._meta.db_table,
+                    records=records,
+                    columns=[column for _, column, _ in columns],
+                )
+            except asyncpg.IntegrityConstraintViolationError as exc:
+                raise IntegrityError(exc) from exc
+        return len(records)
+
+    async def bulk_create(self, rows: Sequence[dict[str, Any]]) -> List[T]:
+        """
+        Inserts many rows with multi-row INSERT ... RETURNING * (one statement per
+        MAX_QUERY_PARAMS chunk, all in one transaction) and returns them as model instances,
+        in the order given. Any constraint violation rejects the whole batch (IntegrityError).
+        """
+        if not rows:
+            return []
+        columns = self._db_columns()
+        db_columns = [column for _, column, _ in columns]
+        now = datetime.now(timezone.utc)
+        records = [self._to_db_row(r, columns, now) for r in rows]
+        chunk = max(1, MAX_QUERY_PARAMS // len(db_columns))
+
+        out: List[T] = []
+        async with in_transaction(self.model._meta.default_connection) as conn:
+            for start in range(0, len(records), chunk):
+                part = records[start:start + chunk]
+                sql = self._upsert_sql(db_columns, len(part), (), (), "error", returning="*")
+                result = await conn.execute_query_dict(sql, [v for record in part for v in record])
+                out.extend(self.model._init_from_db(**r) for r in result)
+        return out
+
+    async def bulk_update(self, pks: Sequence[Any], **changes: Any) -> int:
+        """
+        Applies the same changes to many rows with one UPDATE ... WHERE pk IN (...).
+        auto_now fields (updated_at) are set too. Returns the number of updated rows.
+        """
+        if not pks or not changes:
+            return 0
+        now = datetime.now(timezone.utc)
+        for name, field in self.model._meta.fields_map.items():
+            if getattr(field, "auto_now", False) and name not in changes:
+                changes[name] = now
+        return await self.model.filter(**{f"{self.pk_name}__in": list(pks)}, **self.default_filters).update(**changes)
+
+    async def bulk_delete(self, pks: Sequence[Any]) -> int:
+        # one DELETE ... WHERE pk IN (...); returns the number of deleted rows
+        if not pks:
+            return 0
+        return await self.model.filter(**{f"{self.pk_name}__in": list(pks)}, **self.default_filters).delete()
+
+    async def bulk_upsert(
+        self,
+        rows: Sequence[dict[str, Any]],
+        *,
+        conflict_fields: Optional[Sequence[str]] = None,
+        on_conflict: ConflictPolicy = "update",
+        update_fields: Optional[Sequence[str]] = None,
+    ) -> UpsertResult:
+        """
+        INSERT ... ON CONFLICT (<unique key>) DO UPDATE / DO NOTHING for many rows.
+        - conflict_fields: defaults to the model's first unique_together
+        - update_fields: columns overwritten on conflict (default: the keys present in the rows)
+        Rows repeating a key inside the batch are collapsed (last one wins), so a retried
+        batch never fails; one statement per MAX_QUERY_PARAMS chunk, all in one transaction.
+        """
+        if not rows:
+            return UpsertResult(inserted=0, updated=0, skipped=0)
+        if on_conflict == "error":
+            inserted = await self.copy_insert(rows)
+            return UpsertResult(inserted=inserted, updated=0, skipped=0)
+
+        key = self._conflict_fields(conflict_fields)
+        unique_rows = list({tuple(r.get(k) for k in key): r for r in rows}.values())
+
+        columns = self._db_columns()
+        db_columns = [column for _, column, _ in columns]
+        projection = self.model._meta.fields_db_projection
+        conflict_columns = [projection[k] for k in key]
+        update_columns = self._update_columns(columns, rows[0].keys(), key, update_fields)
+
+        now = datetime.now(timezone.utc)
+        records = [self._to_db_row(r, columns, now) for r in unique_rows]
+        chunk = max(1, MAX_QUERY_PARAMS // len(db_columns))
+
+        # a returned pk equal to the one we generated means the row was inserted (this also
+        # works on partitioned tables, where xmax cannot be returned)
+        pk_column = self.model._meta.db_pk_column
+        pk_index = db_columns.index(pk_column)
+
+        inserted = updated = 0
+        async with in_transaction(self.model._meta.default_connection) as conn:
+            for start in range(0, len(records), chunk):
+                part = records[start:start + chunk]
+                sql = self._upsert_sql(
+                    db_columns, len(part), conflict_columns, update_columns, on_conflict,
+                    returning=f'"{pk_column}"',
+                )
+                _, result = await conn.execute_query(sql, [v for record in part for v in record])
+                new_pks = {record[pk_index] for record in part}
+                created = sum(1 for r in result if r[pk_column] in new_pks)
+                inserted += created
+                updated += len(result) - created
+
+        return UpsertResult(inserted=inserted, updated=updated, skipped=len(rows) - inserted - updated)
+
+    async def upsert(
+        self,
+        *,
+        conflict_fields: Optional[Sequence[str]] = None,
+        on_conflict: ConflictPolicy = "update",
+        update_fields: Optional[Sequence[str]] = None,
+        **data: Any,
+    ) -> Optional[T]:
+        """Single-row upsert; returns the stored row (the existing one when the conflict is ignored)."""
+        if on_conflict == "error":
+            return await self.create(**data)
+
+        key = self._conflict_fields(conflict_fields)
+        columns = self._db_columns()
+        projection = self.model._meta.fields_db_projection
+        sql = self._upsert_sql(
+            [column for _, column, _ in columns],
+            1,
+            [projection[k] for k in key],
+            self._update_columns(columns, data.keys(), key, update_fields),
+            on_conflict,
+            returning="*",
+        )
+        record = self._to_db_row(data, columns, datetime.now(timezone.utc))
+        rows = await self.model._meta.db.execute_query_dict(sql, list(record))
+        if rows:
+            return self.model._init_from_db(**rows[0])
+        return await self.model.get_or_none(**{k: data.get(k) for k in key})
+
+    async def get(self, pk: Any, *, related: Optional[Sequence[str]] = None, use_primary: bool = False) -> Optional[T]:
+        qs = self._apply_related(self._read_qs(use_primary), related)
         return await qs.get_or_none(**{self.pk_name: pk}, **self.default_filters)
     
     async def get_by(self, *q: Q, related: Optional[Sequence[str]] = None, **filters: Any) -> Optional[T]:
@@ -75,13 +434,42 @@ class GenericRepository(Generic[T]):
         return await qs.first()
     
     async def update(self, pk: Any, **data: Any) -> Optional[T]:
-        obj = await self.get(pk)
-        if not obj:
-            return None
-        for k, v in data.items():
-            setattr(obj, k, v)
-        await obj.save()
-        return obj
+        """
+        Partial update in one round trip: UPDATE ... SET <columns in data> ... RETURNING *.
+        Columns not in `data` (e.g. large JSON fields) are not rewritten; auto_now fields
+        (updated_at) are set. Returns None when no row matches.
+        """
+        if not data:
+            return await self.get(pk, use_primary=True)
+
+        meta = self.model._meta
+        projection = meta.fields_db_projection
+        changes = dict(data)
+        now = datetime.now(timezone.utc)
+        for name, field in meta.fields_map.items():
+            if getattr(field, "auto_now", False) and name not in changes:
+                changes[name] = now
+
+        args: list[Any] = []
+        sets = []
+        for name, value in changes.items():
+            if name not in projection:
+                raise ValueError(f"{self.model.__name__} has no column '{name}'")
+            field = meta.fields_map[name]
+            args.append(None if value is None else field.to_db_value(value, self.model))
+            sets.append(f'"{projection[name]}" = ${len(args)}')
+
+        where = []
+        for name, value in {self.pk_name: pk, **self.default_filters}.items():
+            args.append(meta.fields_map[name].to_db_value(value, self.model))
+            where.append(f'"{projection[name]}" = ${len(args)}')
+
+        sql = (
+            f'UPDATE "{meta.db_table}" SET {", ".join(sets)} '
+            f'WHERE {" AND ".join(where)} RETURNING *'
+        )
+        rows = await meta.db.execute_query_dict(sql, args)
+        return self.model._init_from_db(**rows[0]) if rows else None
 
     async def delete(self, pk: Any) -> int:
         # returns the number of deleted rows
@@ -133,9 +521,10 @@ class GenericRepository(Generic[T]):
         order_by: Optional[Sequence[str]] = None,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
+        use_primary: bool = False,
         **filters: Any,
     ) -> List[T]:
-        qs = self._apply_related(self._base_qs(), related)
+        qs = self._apply_related(self._read_qs(use_primary), related)
         qs = self._apply_filters(qs, *q, **filters)
         qs = self._apply_ordering(qs, order_by)
         if offset:
@@ -151,30 +540,90 @@ class GenericRepository(Generic[T]):
         *q: Q,
         related: Optional[Sequence[str]] = None,
         order_by: Optional[Sequence[str]] = None,
+        cursor: Optional[str] = None,
+        count: Optional[CountMode] = None,
+        values: Optional[Sequence[str]] = None,
+        use_primary: bool = False,
         **filters: Any,
     ) -> PageResult[T]:
+        """
+        Two modes:
+        - page/page_size: OFFSET pagination
+        - cursor (meta.next_cursor of the previous page): keyset pagination, constant cost
+          on deep pages
+        Both return next_cursor, so a client can switch to cursors after the first page.
+
+        count: exact (COUNT(*)), estimated (planner row estimate) or none (no total).
+        Defaults to exact with page/page_size and none with a cursor. has_next never
+        depends on the total: page_size + 1 rows are fetched.
+
+        values: return plain dicts with these fields (plus the keyset keys) instead of
+        model instances, for responses that do not need the full object.
+        """
         if page < 1:
             page = 1
         if page_size < 1:
             page_size = 1
+        if count is None:
+            count = "none" if cursor else "exact"
 
-        qs = self._apply_related(self._base_qs(), related)
+        keys = self._keyset_order(order_by)
+        qs = self._apply_related(self._read_qs(use_primary), related)
         qs = self._apply_filters(qs, *q, **filters)
-        qs = self._apply_ordering(qs, order_by)
 
-        total = await qs.count()
-        offset = (page - 1) * page_size
-        items = await qs.offset(offset).limit(page_size)
-        pages = (total + page_size - 1) // page_size
+        total = await self._total(qs, count)
+
+        page_qs = self._apply_ordering(qs, keys)
+        if cursor:
+            page_qs = page_qs.filter(self._keyset_filter(keys, self._decode_cursor(keys, cursor)))
+        else:
+            page_qs = page_qs.offset((page - 1) * page_size)
+        page_qs = page_qs.limit(page_size + 1)
+        if values:
+            fields = list(dict.fromkeys([*values, *(k.lstrip("-") for k in keys)]))
+            rows = await page_qs.values(*fields)
+        else:
+            rows = await page_qs
+
+        items = rows[:page_size]
+        has_next = len(rows) > page_size
+        pages = (total + page_size - 1) // page_size if total is not None else None
+        next_cursor = self._encode_cursor(keys, items[-1]) if has_next and self._keyset_supported(keys) else None
 
-        return PageResult(items=items, total=total, page=page, page_size=page_size, pages=pages)
+        return PageResult(
+            items=items,
+            total=total,
+            page=page,
+            page_size=page_size,
+            pages=pages,
+            has_next=has_next,
+            next_cursor=next_cursor,
+        )
+
+    async def _total(self, qs: QuerySet[T], mode: CountMode) -> Optional[int]:
+        if mode == "none":
+            return None
+        if mode == "exact":
+            return await qs.count()
+        return await self._estimate_count(qs)
+
+    async def _estimate_count(self, qs: QuerySet[T]) -> int:
+        """
+        Row estimate from the planner (EXPLAIN), no table scan. It comes from
+        pg_class.reltuples and column statistics, so it is as fresh as the last ANALYZE.
+        """
+        _, rows = await qs._choose_db().execute_query("EXPLAIN (FORMAT JSON) " + qs.sql())
+        plan = rows[0]["QUERY PLAN"]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
 
-    async def count(self, *q: Q, **filters: Any) -> int:
-        qs = self._apply_filters(self._base_qs(), *q, **filters)
+    async def count(self, *q: Q, use_primary: bool = False, **filters: Any) -> int:
+        qs = self._apply_filters(self._read_qs(use_primary), *q, **filters)
         return await qs.count()
 
-    async def exists(self, *q: Q, **filters: Any) -> bool:
-        return await self.count(*q, **filters) > 0
+    async def exists(self, *q: Q, use_primary: bool = False, **filters: Any) -> bool:
+        return await self.count(*q, use_primary=use_primary, **filters) > 0
 
     # ------- M2M utilities -------
     async def add_m2m(self, instance: T, relation: str, targets: Iterable[Model]) -> None:
@@ -0,0 +1,100 @@
+# app/dbs/postgres/instrumented_pool.py
+"""
+Tortoise engine: the asyncpg backend with a measured connection pool.
+
+Every acquire goes through InstrumentedPool (plain queries and transactions alike), which
+keeps the number of waiters and the acquire latency. pool_stats() adds the size / idle
+numbers asyncpg already knows.
+
+Every pool connection also gets an asyncpg query logger feeding app.core.metrics (query
+count and time, per connection and per request).
+
+Used through the "engine" of the connection in DbContext.tortoise_config.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import asyncpg
+from tortoise import connections
+from tortoise.backends.asyncpg import AsyncpgDBClient
+
+from app.core.metrics import record_query
+
+
+class InstrumentedPool:
+    """Wraps an asyncpg.Pool; everything but acquire/release is delegated"""
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self._pool = pool
+        self.waiters = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.acquire_seconds_total = 0.0
+        self.acquire_seconds_max = 0.0
+
+    async def acquire(self, *, timeout: float | None = None) -> asyncpg.Connection:
+        self.waiters += 1
+        started_at = time.perf_counter()
+        try:
+            conn = await self._pool.acquire(timeout=timeout)
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiters -= 1
+        wait = time.perf_counter() - started_at
+        self.acquired += 1
+        self.acquire_seconds_total += wait
+        self.acquire_seconds_max = max(self.acquire_seconds_max, wait)
+        return conn
+
+    async def release(self, connection: asyncpg.Connection, *, timeout: float | None = None) -> None:
+        await self._pool.release(connection, timeout=timeout)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pool, name)
+
+    def stats(self) -> dict[str, Any]:
+        size = self._pool.get_size()
+        idle = self._pool.get_idle_size()
+        return {
+            "min_size": self._pool.get_min_size(),
+            "max_size": self._pool.get_max_size(),
+            "size": size,
+            "in_use": size - idle,
+            "idle": idle,
+            "waiters": self.waiters,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "acquire_ms_avg": round(self.acquire_seconds_total / self.acquired * 1000, 3) if self.acquired else 0.0,
+            "acquire_ms_max": round(self.acquire_seconds_max * 1000, 3),
+        }
+
+
+class InstrumentedAsyncpgDBClient(AsyncpgDBClient):
+    async def create_pool(self, **kwargs) -> InstrumentedPool:
+        name = self.connection_name
+        user_init = kwargs.pop("init", None)
+
+        async def init(conn: asyncpg.Connection) -> None:
+            conn.add_query_logger(lambda q: record_query(name, q.elapsed))
+            if user_init:
+                await user_init(conn)
+
+        return InstrumentedPool(await super().create_pool(init=init, **kwargs))
+
+
+client_class = InstrumentedAsyncpgDBClient
+
+
+def pool_stats() -> dict[str, Any]:
+    """Pool utilization per Tortoise connection (connections not opened yet are skipped)"""
+    out: dict[str, Any] = {}
+    for conn in connections.all():
+        # inside a transaction the connection is a TransactionWrapper: the pool is its parent's
+        pool = getattr(getattr(conn, "_parent", conn), "_pool", None)
+        if isinstance(pool, InstrumentedPool):
+            out[conn.connection_name] = pool.stats()
+    return out
@@ -0,0 +1,83 @@
+# app/dbs/postgres/listener.py
+"""
+Postgres LISTEN/NOTIFY between processes (API workers, MQTT ingestion, ...).
+
+LISTEN needs a connection of its own for as long as it listens, so PgListener opens one
+outside the Tortoise pool and reconnects when it is lost. Notifications sent while it was
+disconnected are gone: on_connect runs after every (re)connection so the caller can reload
+whatever it keeps in memory.
+
+notify() goes through the Tortoise connection: inside a transaction it is delivered on commit.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+import asyncpg
+from tortoise import connections
+
+log = logging.getLogger("app.pg_listener")
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+
+
+async def notify(channel: str, payload: str = "") -> None:
+    await connections.get("default").execute_query("SELECT pg_notify($1, $2)", [channel, payload])
+
+
+async def dedicated_connection() -> asyncpg.Connection:
+    """Connection outside the Tortoise pool, for state bound to a session (LISTEN, session locks)"""
+    # imported here: context.py imports the engine module of this package
+    from app.dbs.postgres.context import connection_config
+
+    creds = connection_config()["credentials"]
+    return await asyncpg.connect(
+        host=creds["host"],
+        port=creds["port"],
+        user=creds["user"],
+        password=creds["password"],
+        database=creds["database"],
+    )
+
+
+class PgListener:
+    def __init__(
+        self,
+        handlers: dict[str, Callable[[str], None]],
+        *,
+        on_connect: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> None:
+        self.handlers = handlers
+        self.on_connect = on_connect
+
+    async def _connect(self) -> asyncpg.Connection:
+        return await dedicated_connection()
+
+    async def run(self) -> None:
+        delay = 1.0
+        while True:
+            conn: Optional[asyncpg.Connection] = None
+            try:
+                conn = await self._connect()
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                for channel, handler in self.handlers.items():
+                    await conn.add_listener(channel, lambda _c, _pid, _ch, payload, h=handler: h(payload))
+                log.info("pg.listening", extra={"channels": list(self.handlers)})
+                delay = 1.0
+                if self.on_connect:
+                    await self.on_connect()
+                await lost.wait()
+                log.warning("pg.listener_lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("pg.listener_failed", extra={"error": str(e), "retry_in": delay})
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
@@ -0,0 +1,338 @@
+# app/dbs/postgres/partitions.py
+"""
+Monthly range partitioning of sensor_readings_5m on ts.
+
+Tortoise cannot declare partitioned tables, so the conversion is plain SQL. The aerich
+migrations folder is created per database by `aerich init-db` (and not versioned), so the
+migration is written into it, as its next version, by:
+
+    python -m app.dbs.postgres.partitions
+
+and then applied with `aerich upgrade` (`aerich downgrade` reverts it).
+
+Partitions are named sensor_readings_5m_pYYYYMM and cover one UTC month. A DEFAULT
+partition catches rows outside the created months; the maintenance worker
+(app.workers.partition_maintenance) creates the next months ahead of time and applies the
+retention policy (old partitions detached then dropped, batched DELETEs for the rest).
+
+Partitioned tables need the partition key in every unique constraint: the primary key
+becomes (id, ts). The unique (sensor_id, ts) used by the upserts already includes it.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import tomllib
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+import asyncpg
+from tortoise import BaseDBAsyncClient
+from tortoise.transactions import in_transaction
+
+from app.dbs.postgres.queries.sensor_readings.sensor_reading_queries import SensorReadingQuerys
+
+log = logging.getLogger("app.partitions")
+
+TABLE = "sensor_readings_5m"
+PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+
+UPGRADE_SQL = f"""
+ALTER TABLE "{TABLE}" RENAME TO "{TABLE}_old";
+CREATE TABLE "{TABLE}" (LIKE "{TABLE}_old" INCLUDING DEFAULTS) PARTITION BY RANGE ("ts");
+CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT;
+DO $$
+DECLARE m timestamptz;
+BEGIN
+    FOR m IN
+        SELECT generate_series(
+            date_trunc('month', coalesce(min("ts"), now()), 'UTC'),
+            date_trunc('month', now(), 'UTC') + interval '3 months',
+            interval '1 month'
+        ) FROM "{TABLE}_old"
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF "{TABLE}" FOR VALUES FROM (%L) TO (%L)',
+            '{TABLE}_p' || to_char(m AT TIME ZONE 'UTC', 'YYYYMM'), m, m + interval '1 month'
+        );
+    END LOOP;
+END $$;
+INSERT INTO "{TABLE}" SELECT * FROM "{TABLE}_old";
+DROP TABLE "{TABLE}_old";
+ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY ("id", "ts");
+ALTER TABLE "{TABLE}" ADD CONSTRAINT "uid_sensor_read_sensor__b742b6" UNIQUE ("sensor_id", "ts");
+ALTER TABLE "{TABLE}" ADD FOREIGN KEY ("sensor_id") REFERENCES "sensors" ("id") ON DELETE CASCADE;
+ALTER TABLE "{TABLE}" ADD FOREIGN KEY ("site_id") REFERENCES "sites" ("id") ON DELETE CASCADE;
+ALTER TABLE "{TABLE}" ADD FOREIGN KEY ("tenant_id") REFERENCES "tenants" ("id") ON DELETE CASCADE;
+CREATE INDEX "idx_sensor_read_tenant__b20b23" ON "{TABLE}" ("tenant_id", "ts");
+CREATE INDEX "idx_sensor_read_site_id_9c359b" ON "{TABLE}" ("site_id", "ts");
+CREATE INDEX "idx_sensor_read_sensor__b742b6" ON "{TABLE}" ("sensor_id", "ts");
+CREATE INDEX "idx_sensor_read_updated_2576c2" ON "{TABLE}" ("updated_at");
+"""
+
+DOWNGRADE_SQL = f"""
+ALTER TABLE "{TABLE}" RENAME TO "{TABLE}_partitioned";
+CREATE TABLE "{TABLE}" (LIKE "{TABLE}_partitioned" INCLUDING DEFAULTS);
+INSERT INTO "{TABLE}" SELECT * FROM "{TABLE}_partitioned";
+DROP TABLE "{TABLE}_partitioned" CASCADE;
+ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY ("id");
+ALTER TABLE "{TABLE}" ADD CONSTRAINT "uid_sensor_read_sensor__b742b6" UNIQUE ("sensor_id", "ts");
+ALTER TABLE "{TABLE}" ADD FOREIGN KEY ("sensor_id") REFERENCES "sensors" ("id") ON DELETE CASCADE;
+ALTER TABLE "{TABLE}" ADD FOREIGN KEY ("site_id") REFERENCES "sites" ("id") ON DELETE CASCADE;
+ALTER TABLE "{TABLE}" ADD FOREIGN KEY ("tenant_id") REFERENCES "tenants" ("id") ON DELETE CASCADE;
+CREATE INDEX "idx_sensor_read_tenant__b20b23" ON "{TABLE}" ("tenant_id", "ts");
+CREATE INDEX "idx_sensor_read_site_id_9c359b" ON "{TABLE}" ("site_id", "ts");
+CREATE INDEX "idx_sensor_read_sensor__b742b6" ON "{TABLE}" ("sensor_id", "ts");
+CREATE INDEX "idx_sensor_read_updated_2576c2" ON "{TABLE}" ("updated_at");
+"""
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return UPGRADE_SQL
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return DOWNGRADE_SQL
+
+
+# ---------- aerich migration ----------
+
+MIGRATION_NAME = "partition_sensor_readings"
+
+# same layout as the files aerich generates; the SQL is copied so the migration does not
+# change if this module does
+MIGRATION_TEMPLATE = '''from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """{upgrade_sql}"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """{downgrade_sql}"""
+'''
+
+
+def aerich_location(pyproject: str = "pyproject.toml") -> Path:
+    """Migrations folder of the models app, from [tool.aerich] location"""
+    with open(pyproject, "rb") as f:
+        location = tomllib.load(f)["tool"]["aerich"].get("location", "./migrations")
+    return Path(location, "models")
+
+
+def write_migration(dirname: Path, now: Optional[datetime] = None) -> Path:
+    """
+    Writes the partitioning migration as the next aerich version in `dirname` and returns
+    its path (the existing one if it was already written).
+    """
+    versions = [p for p in dirname.glob("*.py") if p.name.split("_", 1)[0].isdigit()]
+    if not versions:
+        raise FileNotFoundError(f"no aerich migrations in {dirname}: run `aerich init-db` first")
+    for p in versions:
+        if p.stem.endswith(f"_{MIGRATION_NAME}"):
+            return p
+    version = max(int(p.name.split("_", 1)[0]) for p in versions) + 1
+    now = now or datetime.now()
+    path = dirname / f"{version}_{now:%Y%m%d%H%M%S}_{MIGRATION_NAME}.py"
+    path.write_text(MIGRATION_TEMPLATE.format(upgrade_sql=UPGRADE_SQL, downgrade_sql=DOWNGRADE_SQL), encoding="utf-8")
+    return path
+
+
+# ---------- maintenance ----------
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def _utc(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+
+
+async def is_partitioned(db: BaseDBAsyncClient) -> bool:
+    rows = await db.execute_query_dict(
+        "SELECT c.relkind::text AS relkind FROM pg_class c WHERE c.oid = to_regclass($1)", [TABLE]
+    )
+    return bool(rows) and rows[0]["relkind"] == "p"
+
+
+async def list_partitions(db: BaseDBAsyncClient) -> dict[date, str]:
+    """Monthly partitions by first day of month (the DEFAULT partition is not included)"""
+    rows = await db.execute_query_dict(
+        """
+        SELECT c.relname AS name
+        FROM pg_inherits i
+        INNER JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass($1)
+        """,
+        [TABLE],
+    )
+    out: dict[date, str] = {}
+    for r in rows:
+        m = PARTITION_NAME.match(r["name"])
+        if m:
+            out[date(int(m.group(1)), int(m.group(2)), 1)] = r["name"]
+    return out
+
+
+async def ensure_partitions(db: BaseDBAsyncClient, months_ahead: int, today: Optional[date] = None) -> list[str]:
+    """Creates the partitions of the current month and the next `months_ahead` ones"""
+    today = today or datetime.now(timezone.utc).date()
+    existing = await list_partitions(db)
+    created: list[str] = []
+    for n in range(months_ahead + 1):
+        month = add_months(month_start(today), n)
+        if month in existing:
+            continue
+        name = partition_name(month)
+        # rows already in the DEFAULT partition for this month would make CREATE fail:
+        # they are moved into the new partition in the same transaction
+        async with in_transaction(db.connection_name) as conn:
+            await conn.execute_script(f'''
+                CREATE TEMP TABLE "_{name}" ON COMMIT DROP AS
+                    SELECT * FROM "{TABLE}_default" WHERE "ts" >= '{_utc(month).isoformat()}' AND "ts" < '{_utc(add_months(month, 1)).isoformat()}';
+                DELETE FROM "{TABLE}_default" WHERE "ts" >= '{_utc(month).isoformat()}' AND "ts" < '{_utc(add_months(month, 1)).isoformat()}';
+                CREATE TABLE "{name}" PARTITION OF "{TABLE}"
+                    FOR VALUES FROM ('{_utc(month).isoformat()}') TO ('{_utc(add_months(month, 1)).isoformat()}');
+                INSERT INTO "{TABLE}" SELECT * FROM "_{name}";
+            ''')
+        created.append(name)
+        log.info("partition.created", extra={"partition": name})
+    return created
+
+
+def parse_retention(spec: str) -> dict[str, int]:
+    """'agua:90,terreno:365' -> {"agua": 90, "terreno": 365}"""
+    out: dict[str, int] = {}
+    for item in spec.split(","):
+        if ":" in item:
+            plan, days = item.split(":", 1)
+            out[plan.strip()] = int(days)
+    return out
+
+
+# Rows deleted per statement by the retention DELETEs
+DELETE_BATCH = 5000
+# Longest wait for the lock on the parent table when detaching a partition
+DETACH_LOCK_TIMEOUT = "5s"
+
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+async def has_default_partition(db: BaseDBAsyncClient) -> bool:
+    rows = await db.execute_query_dict(
+        "SELECT p.partdefid <> 0 AS has_default FROM pg_partitioned_table p WHERE p.partrelid = to_regclass($1)",
+        [TABLE],
+    )
+    return bool(rows) and rows[0]["has_default"]
+
+
+async def detach_and_drop(db: BaseDBAsyncClient, name: str) -> None:
+    """
+    Detaches the partition, then drops it, so the parent table is only locked for the
+    detach. DETACH ... CONCURRENTLY is not allowed while a DEFAULT partition exists: the
+    plain DETACH then gives up after DETACH_LOCK_TIMEOUT instead of queueing every reader
+    and writer behind it (the partition is dropped on a later run).
+    """
+    pending = await db.execute_query_dict(
+        "SELECT i.inhdetachpending AS pending FROM pg_inherits i "
+        "WHERE i.inhparent = to_regclass($1) AND i.inhrelid = to_regclass($2)",
+        [TABLE, name],
+    )
+    if pending and pending[0]["pending"]:
+        # an earlier concurrent detach was interrupted
+        await db.execute_script(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}" FINALIZE')
+    elif pending and not await has_default_partition(db):
+        # runs outside a transaction: the pool connection is in autocommit
+        await db.execute_script(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}" CONCURRENTLY')
+    elif pending:
+        async with in_transaction(db.connection_name) as conn:
+            await conn.execute_script(f"""
+                SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}';
+                ALTER TABLE "{TABLE}" DETACH PARTITION "{name}";
+            """)
+    await db.execute_script(f'DROP TABLE IF EXISTS "{name}"')
+
+
+async def delete_before(db: BaseDBAsyncClient, name: str, cutoff: datetime, tenant_ids: Optional[list] = None) -> int:
+    """
+    Deletes the rows of partition `name` older than `cutoff` (of `tenant_ids` only, if
+    given), DELETE_BATCH rows per statement so no statement holds locks or WAL for the
+    whole partition. Their hours are recorded for the rollup worker.
+    """
+    where = '"ts" < $1' + (' AND "tenant_id" = ANY($3::uuid[])' if tenant_ids is not None else "")
+    params: list = [cutoff, DELETE_BATCH] + ([tenant_ids] if tenant_ids is not None else [])
+    deleted = 0
+    while True:
+        rows = await db.execute_query_dict(
+            f'WITH deleted AS (DELETE FROM "{name}" WHERE "ctid" = ANY(ARRAY('
+            f'SELECT "ctid" FROM "{name}" WHERE {where} LIMIT $2)) '
+            'RETURNING "tenant_id", "site_id", "sensor_id", "ts"), '
+            f"{SensorReadingQuerys.RECORD_DELETIONS} SELECT count(*) AS n FROM deleted",
+            params,
+        )
+        deleted += rows[0]["n"]
+        if rows[0]["n"] < DELETE_BATCH:
+            return deleted
+
+
+async def apply_retention(db: BaseDBAsyncClient, retention_days: dict[str, int], now: Optional[datetime] = None) -> dict[str, int]:
+    """
+    Retention per tenant plan. Plans missing from `retention_days` get the longest
+    retention configured; nothing is deleted while `retention_days` is empty.
+
+    Partitions are shared by all tenants, so a whole partition is detached and dropped only
+    when it is past the longest retention among the plans in use; the rows of the DEFAULT
+    partition past it are deleted. Tenants on shorter plans get their rows deleted from the
+    remaining old partitions (DEFAULT included), in batches, with the (tenant_id, ts) index.
+    """
+    now = now or datetime.now(timezone.utc)
+    result = {"dropped_partitions": 0, "deleted_rows": 0}
+    if not retention_days:
+        return result
+
+    tenants = await db.execute_query_dict('SELECT "id", "plan" FROM "tenants"')
+    if not tenants:
+        return result
+    longest = max(retention_days.values())
+    days_by_plan = {t["plan"]: retention_days.get(t["plan"], longest) for t in tenants}
+    partitions = await list_partitions(db)
+    has_default = await has_default_partition(db)
+
+    # 1) whole partitions past every plan's retention
+    keep_from = now - timedelta(days=max(days_by_plan.values()))
+    for month, name in sorted(partitions.items()):
+        if _utc(add_months(month, 1)) <= keep_from:
+            try:
+                await detach_and_drop(db, name)
+            except asyncpg.exceptions.LockNotAvailableError:
+                log.warning("partition.detach_timeout", extra={"partition": name})
+                continue
+            partitions.pop(month)
+            result["dropped_partitions"] += 1
+            log.info("partition.dropped", extra={"partition": name})
+    if has_default:
+        result["deleted_rows"] += await delete_before(db, DEFAULT_PARTITION, keep_from)
+
+    # 2) tenants with a shorter retention than the partitions still kept
+    for plan, days in days_by_plan.items():
+        tenant_ids = [t["id"] for t in tenants if t["plan"] == plan]
+        cutoff = now - timedelta(days=days)
+        names = [name for month, name in sorted(partitions.items()) if _utc(month) < cutoff]
+        for name in names + ([DEFAULT_PARTITION] if has_default else []):
+            result["deleted_rows"] += await delete_before(db, name, cutoff, tenant_ids)
+
+    return result
+
+
+if __name__ == "__main__":
+    print(write_migration(aerich_location()))
@@ -0,0 +1,126 @@
+# app.dbs.postgres.queries.commands.command_queries.py
+from typing import Final
+
+class CommandQuerys:
+
+    # Up to $1 actuators with queued commands (oldest first) not being dispatched by another
+    # dispatcher. Each one is taken with a transaction-level advisory lock that serializes the
+    # dispatch per actuator without locking any row: the actuators stay writable and the
+    # commands can still be superseded while the dispatcher waits for the broker.
+    LOCK_ACTUATORS: Final[str] = """
+        WITH q AS MATERIALIZED (
+            SELECT actuator_id, min(created_at) AS first_at
+            FROM public.commands
+            WHERE status = 'queued'
+            GROUP BY actuator_id
+            ORDER BY first_at
+        )
+        SELECT actuator_id AS id
+        FROM q
+        WHERE pg_try_advisory_xact_lock(hashtextextended('command-actuator:' || actuator_id::text, 0))
+        LIMIT $1
+    """
+
+    # Queued set_state commands of the actuators in $1 followed by a newer set_state, with no
+    # other command type between them, are superseded by the newest one of the run: only the
+    # latest desired state is sent. Returns the superseded commands.
+    SUPERSEDE_QUEUED: Final[str] = """
+        WITH q AS (
+            SELECT id, actuator_id, command_type, created_at,
+                   count(*) FILTER (WHERE command_type <> 'set_state') OVER w AS run
+            FROM public.commands
+            WHERE actuator_id = ANY($1::uuid[])
+              AND status = 'queued'
+            WINDOW w AS (PARTITION BY actuator_id ORDER BY created_at, id)
+        ), s AS (
+            SELECT id,
+                   first_value(id) OVER (PARTITION BY actuator_id, run ORDER BY created_at DESC, id DESC) AS latest_id
+            FROM q
+            WHERE command_type = 'set_state'
+        )
+        UPDATE public.commands AS c
+        SET status = 'superseded',
+            metadata = c.metadata || jsonb_build_object('superseded_by', s.latest_id),
+            updated_at = now(),
+            updated_by = 'coalescing'
+        FROM s
+        WHERE c.id = s.id
+          AND s.id <> s.latest_id
+          AND c.status = 'queued'
+        RETURNING c.id, c.actuator_id
+    """
+
+    # Queued commands of the actuators locked by LOCK_ACTUATORS, in the order they must be
+    # sent, with the MQTT address of their actuator. No row locks: the advisory lock of the
+    # actuator already keeps other dispatchers away.
+    CLAIM_QUEUED: Final[str] = """
+        SELECT c.id, c.command_type, c.payload, c.actuator_id,
+               a.channel, a.name AS actuator_name, d.serial
+        FROM public.commands AS c
+        INNER JOIN public.actuators AS a ON a.id = c.actuator_id
+        INNER JOIN public.devices AS d ON d.id = a.device_id
+        WHERE c.actuator_id = ANY($1::uuid[])
+          AND c.status = 'queued'
+        ORDER BY c.created_at, c.id
+    """
+
+    # Published commands. A command superseded at enqueue while it was being published was
+    # sent anyway, so it is marked sent too; one already acked (the ack won) is left alone.
+    MARK_SENT: Final[str] = """
+        UPDATE public.commands
+        SET status = 'sent',
+            sent_at = now(),
+            metadata = metadata - 'superseded_by',
+            updated_at = now(),
+            updated_by = 'dispatcher'
+        WHERE id = ANY($1::uuid[])
+          AND status IN ('queued', 'superseded')
+    """
+
+    # Commands that cannot be sent (an actuator channel or device serial that is not a valid
+    # topic level, a payload the broker client rejects). $1 ids, $2 errors: parallel arrays.
+    MARK_FAILED: Final[str] = """
+        UPDATE public.commands AS c
+        SET status = 'failed',
+            metadata = c.metadata || jsonb_build_object('error', f.error),
+            updated_at = now(),
+            updated_by = 'dispatcher'
+        FROM unnest($1::uuid[], $2::text[]) AS f(id, error)
+        WHERE c.id = f.id
+          AND c.status IN ('queued', 'superseded')
+    """
+
+    # $1 ids, $2 statuses (acked|failed), $3 errors (null when acked), $4 serial of the device
+    # that sent the ack: parallel arrays. Only commands of that device still waiting for their
+    # ack change (acks may arrive twice). 'queued' and 'superseded' are accepted too: an ack
+    # can arrive before MARK_SENT, which then leaves the acked command alone.
+    APPLY_ACKS: Final[str] = """
+        UPDATE public.commands AS c
+        SET status = a.status,
+            acked_at = now(),
+            metadata = CASE WHEN a.error IS NULL THEN c.metadata
+                            ELSE c.metadata || jsonb_build_object('error', a.error) END,
+            updated_at = now(),
+            updated_by = 'dispatcher'
+        FROM unnest($1::uuid[], $2::text[], $3::text[], $4::text[]) AS a(id, status, error, serial),
+             public.actuators AS act,
+             public.devices AS d
+        WHERE c.id = a.id
+          AND act.id = c.actuator_id
+          AND d.id = act.device_id
+          AND d.serial = a.serial
+          AND c.status IN ('queued', 'superseded', 'sent')
+    """
+
+    # Sent commands without an ack after $1 are given up. RETURNING gives the count: Tortoise
+    # only returns the affected rows of statements that start with UPDATE, not with a newline.
+    EXPIRE_UNACKED: Final[str] = """
+        UPDATE public.commands
+        SET status = 'failed',
+            metadata = metadata || '{"error": "ack_timeout"}'::jsonb,
+            updated_at = now(),
+            updated_by = 'dispatcher'
+        WHERE status = 'sent'
+          AND sent_at < now() - $1::interval
+        RETURNING id
+    """
@@ -0,0 +1,13 @@
+# app.dbs.postgres.queries.daily_metrics.daily_metric_queries.py
+from typing import Final
+
+class DailyMetricQuerys:
+
+    # {where} is built from the export filters ($n placeholders)
+    EXPORT: Final[str] = """
+        SELECT m.tenant_id::text AS tenant_id, m.site_id::text AS site_id,
+               m.metric_date, m.metric_key, m.value
+        FROM public.daily_metrics AS m
+        WHERE {where}
+        ORDER BY m.site_id, m.metric_date, m.metric_key
+    """
@@ -0,0 +1,53 @@
+# app.dbs.postgres.queries.events.event_queries.py
+from typing import Final
+
+class EventQuerys:
+
+    # Serializes the writers of the same keys (one transaction-level advisory lock each),
+    # always in the same order so two batches cannot deadlock
+    LOCK_KEYS: Final[str] = """
+        SELECT pg_advisory_xact_lock(h)
+        FROM (SELECT DISTINCT hashtextextended(k, 0) AS h FROM unnest($1::text[]) AS k) AS keys
+        ORDER BY h
+    """
+
+    # Coalesces occurrences into the open event of the same (site, event_type, source_id)
+    # seen in the last $6: meta.count grows by the occurrences and meta.last_ts moves forward.
+    # $1..$5 are parallel arrays, one item per key. Returns the updated events.
+    COALESCE_OPEN: Final[str] = """
+        WITH k AS (
+            SELECT *
+            FROM unnest($1::uuid[], $2::text[], $3::uuid[], $4::int[], $5::timestamptz[])
+                AS k(site_id, event_type, source_id, occurrences, last_ts)
+        ), open_event AS (
+            SELECT DISTINCT ON (k.site_id, k.event_type, k.source_id)
+                   e.id, k.occurrences, k.last_ts
+            FROM k
+            INNER JOIN public.events AS e
+                    ON e.site_id = k.site_id
+                   AND e.event_type = k.event_type
+                   AND e.source_id IS NOT DISTINCT FROM k.source_id
+            WHERE e.ack_status <> 'closed'
+              AND e.updated_at >= now() - $6::interval
+            ORDER BY k.site_id, k.event_type, k.source_id, e.updated_at DESC
+        )
+        UPDATE public.events AS e
+        SET meta = e.meta || jsonb_build_object(
+                'count', coalesce((e.meta->>'count')::int, 1) + o.occurrences,
+                'last_ts', greatest(o.last_ts, (e.meta->>'last_ts')::timestamptz)
+            ),
+            updated_at = now(),
+            updated_by = 'dedup'
+        FROM open_event AS o
+        WHERE e.id = o.id
+        RETURNING e.*
+    """
+
+    # Events created per site in the last minute (bounded by the rate limit itself)
+    CREATED_LAST_MINUTE: Final[str] = """
+        SELECT site_id, count(*) AS created
+        FROM public.events
+        WHERE site_id = ANY($1::uuid[])
+          AND created_at >= now() - interval '1 minute'
+        GROUP BY site_id
+    """
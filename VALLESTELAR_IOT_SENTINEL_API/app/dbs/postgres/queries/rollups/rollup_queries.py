@@ -0,0 +1,163 @@
+# app.dbs.postgres.queries.rollups.rollup_queries.py
+from typing import Final
+
+class RollupQuerys:
+
+    # (site, local day) touched by the readings written (inserted or corrected) or deleted
+    # in ($1, $2]; a deleted hour touches the local days of its first and last instant
+    AFFECTED_SITE_DAYS: Final[str] = """
+        SELECT r.site_id, (r.ts AT TIME ZONE s.timezone)::date AS metric_date
+        FROM public.sensor_readings_5m AS r
+        INNER JOIN public.sites AS s ON s.id = r.site_id
+        WHERE r.updated_at > $1
+          AND r.updated_at <= $2
+        UNION
+        SELECT d.site_id, (x.ts AT TIME ZONE s.timezone)::date AS metric_date
+        FROM public.sensor_reading_deletions AS d
+        INNER JOIN public.sites AS s ON s.id = d.site_id
+        CROSS JOIN LATERAL (VALUES (d.bucket_ts), (d.bucket_ts + interval '1 hour' - interval '1 microsecond')) AS x(ts)
+        WHERE d.deleted_at > $1
+          AND d.deleted_at <= $2
+    """
+
+    # Per sensor and local day, between $2 and $3:
+    #   total_drop:     sum of the decreases between consecutive readings (tank level)
+    #   value_hours:    trapezoidal integral of the value over time (W -> Wh)
+    #   active_minutes: time with value > 0 (flow)
+    # Gaps between readings count at most $5, so an offline sensor does not inflate the totals.
+    DAILY_SENSOR_STATS: Final[str] = """
+        WITH r AS (
+            SELECT sensor_id, value,
+                   (ts AT TIME ZONE $4)::date AS metric_date,
+                   lag(value) OVER w AS prev_value,
+                   extract(epoch FROM least(ts - lag(ts) OVER w, $5::interval)) AS gap_seconds
+            FROM public.sensor_readings_5m
+            WHERE sensor_id = ANY($1::uuid[])
+              AND ts >= $2
+              AND ts < $3
+              AND quality <> 'invalid'
+            WINDOW w AS (PARTITION BY sensor_id, (ts AT TIME ZONE $4)::date ORDER BY ts)
+        )
+        SELECT sensor_id, metric_date,
+               count(*) AS samples,
+               min(value) AS min_value,
+               max(value) AS max_value,
+               coalesce(sum(greatest(prev_value - value, 0)), 0) AS total_drop,
+               coalesce(sum((value + prev_value) / 2 * gap_seconds), 0) / 3600 AS value_hours,
+               coalesce(sum(gap_seconds) FILTER (WHERE prev_value > 0), 0) / 60 AS active_minutes
+        FROM r
+        GROUP BY sensor_id, metric_date
+    """
+
+    # Recomputes from the raw readings every (sensor, hour) touched by the readings written
+    # or deleted in ($1, $2]: updated_at moves on inserts and on corrections (upserts, PATCH),
+    # sensor_reading_deletions records the deletions, and whole hours are recomputed, so late,
+    # corrected and deleted readings are handled. Touched hours left without valid readings
+    # lose their row.
+    UPSERT_HOURLY: Final[str] = """
+        WITH touched AS (
+            SELECT sensor_id, date_bin('1 hour', ts, TIMESTAMPTZ '2000-01-01 00:00:00+00') AS bucket_ts
+            FROM public.sensor_readings_5m
+            WHERE updated_at > $1
+              AND updated_at <= $2
+            UNION
+            SELECT sensor_id, bucket_ts
+            FROM public.sensor_reading_deletions
+            WHERE deleted_at > $1
+              AND deleted_at <= $2
+        ),
+        emptied AS (
+            DELETE FROM public.sensor_readings_1h AS h
+            USING touched AS t
+            WHERE h.sensor_id = t.sensor_id
+              AND h.bucket_ts = t.bucket_ts
+              AND NOT EXISTS (
+                  SELECT 1 FROM public.sensor_readings_5m AS r
+                  WHERE r.sensor_id = t.sensor_id
+                    AND r.ts >= t.bucket_ts
+                    AND r.ts < t.bucket_ts + interval '1 hour'
+                    AND r.quality <> 'invalid'
+              )
+        )
+        INSERT INTO public.sensor_readings_1h (
+            id, tenant_id, site_id, sensor_id, bucket_ts, samples, sum_value, min_value, max_value,
+            avg_value, last_value, last_ts, created_at, created_by, updated_at, updated_by
+        )
+        SELECT gen_random_uuid(), r.tenant_id, r.site_id, r.sensor_id, t.bucket_ts,
+               count(*), sum(r.value), min(r.value), max(r.value), avg(r.value),
+               (array_agg(r.value ORDER BY r.ts DESC))[1], max(r.ts),
+               now(), 'system', now(), 'system'
+        FROM touched AS t
+        INNER JOIN public.sensor_readings_5m AS r
+            ON r.sensor_id = t.sensor_id
+           AND r.ts >= t.bucket_ts
+           AND r.ts < t.bucket_ts + interval '1 hour'
+           AND r.quality <> 'invalid'
+        GROUP BY r.tenant_id, r.site_id, r.sensor_id, t.bucket_ts
+        ON CONFLICT (sensor_id, bucket_ts) DO UPDATE SET
+            samples = EXCLUDED.samples,
+            sum_value = EXCLUDED.sum_value,
+            min_value = EXCLUDED.min_value,
+            max_value = EXCLUDED.max_value,
+            avg_value = EXCLUDED.avg_value,
+            last_value = EXCLUDED.last_value,
+            last_ts = EXCLUDED.last_ts,
+            updated_at = EXCLUDED.updated_at
+    """
+
+    # Same for the UTC days, built from the hourly rows (at most 24 rows per sensor and day)
+    UPSERT_DAILY: Final[str] = """
+        WITH touched AS (
+            SELECT sensor_id, date_bin('1 day', ts, TIMESTAMPTZ '2000-01-01 00:00:00+00') AS bucket_ts
+            FROM public.sensor_readings_5m
+            WHERE updated_at > $1
+              AND updated_at <= $2
+            UNION
+            SELECT sensor_id, date_bin('1 day', bucket_ts, TIMESTAMPTZ '2000-01-01 00:00:00+00') AS bucket_ts
+            FROM public.sensor_reading_deletions
+            WHERE deleted_at > $1
+              AND deleted_at <= $2
+        ),
+        emptied AS (
+            DELETE FROM public.sensor_readings_1d AS d
+            USING touched AS t
+            WHERE d.sensor_id = t.sensor_id
+              AND d.bucket_ts = t.bucket_ts
+              AND NOT EXISTS (
+                  SELECT 1 FROM public.sensor_readings_1h AS h
+                  WHERE h.sensor_id = t.sensor_id
+                    AND h.bucket_ts >= t.bucket_ts
+                    AND h.bucket_ts < t.bucket_ts + interval '1 day'
+              )
+        )
+        INSERT INTO public.sensor_readings_1d (
+            id, tenant_id, site_id, sensor_id, bucket_ts, samples, sum_value, min_value, max_value,
+            avg_value, last_value, last_ts, created_at, created_by, updated_at, updated_by
+        )
+        SELECT gen_random_uuid(), h.tenant_id, h.site_id, h.sensor_id, t.bucket_ts,
+               sum(h.samples), sum(h.sum_value), min(h.min_value), max(h.max_value),
+               sum(h.sum_value) / sum(h.samples),
+               (array_agg(h.last_value ORDER BY h.last_ts DESC))[1], max(h.last_ts),
+               now(), 'system', now(), 'system'
+        FROM touched AS t
+        INNER JOIN public.sensor_readings_1h AS h
+            ON h.sensor_id = t.sensor_id
+           AND h.bucket_ts >= t.bucket_ts
+           AND h.bucket_ts < t.bucket_ts + interval '1 day'
+        GROUP BY h.tenant_id, h.site_id, h.sensor_id, t.bucket_ts
+        ON CONFLICT (sensor_id, bucket_ts) DO UPDATE SET
+            samples = EXCLUDED.samples,
+            sum_value = EXCLUDED.sum_value,
+            min_value = EXCLUDED.min_value,
+            max_value = EXCLUDED.max_value,
+            avg_value = EXCLUDED.avg_value,
+            last_value = EXCLUDED.last_value,
+            last_ts = EXCLUDED.last_ts,
+            updated_at = EXCLUDED.updated_at
+    """
+
+    # Deletions already rolled up by every job (deleted_at <= $1)
+    PURGE_DELETIONS: Final[str] = """
+        DELETE FROM public.sensor_reading_deletions
+        WHERE deleted_at <= $1
+    """
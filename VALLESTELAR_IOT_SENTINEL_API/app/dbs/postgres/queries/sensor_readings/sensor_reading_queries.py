@@ -0,0 +1,120 @@
+# app.dbs.postgres.queries.sensor_readings.sensor_reading_queries.py
+from typing import Final
+
+class SensorReadingQuerys:
+
+    # Readings of the rule engine (workers/rule_evaluator.py): the ones of sensors $3 written
+    # after the keyset ($1 updated_at, $2 id) and at least $4 ago, in write order, $5 at most.
+    # updated_at >= $1 lets the index on updated_at bound the scan.
+    WRITTEN_SINCE: Final[str] = """
+        SELECT id, tenant_id, site_id, sensor_id, ts, value, quality, updated_at
+        FROM public.sensor_readings_5m
+        WHERE updated_at >= $1
+          AND (updated_at, id) > ($1, $2)
+          AND updated_at <= now() - $4::interval
+          AND sensor_id = ANY($3::uuid[])
+        ORDER BY updated_at, id
+        LIMIT $5
+    """
+
+    # CTE recording the hours of the rows returned by a "deleted" CTE (tenant_id, site_id,
+    # sensor_id, ts) in sensor_reading_deletions, for the rollup worker to recompute them
+    RECORD_DELETIONS: Final[str] = """
+        recorded AS (
+            INSERT INTO public.sensor_reading_deletions (id, tenant_id, site_id, sensor_id, bucket_ts, deleted_at)
+            SELECT gen_random_uuid(), b.tenant_id, b.site_id, b.sensor_id, b.bucket_ts, now()
+            FROM (
+                SELECT DISTINCT tenant_id, site_id, sensor_id,
+                       date_bin('1 hour', ts, TIMESTAMPTZ '2000-01-01 00:00:00+00') AS bucket_ts
+                FROM deleted
+            ) AS b
+        )
+    """
+
+    # Deletes the readings $1 and records their hours; returns the number of deleted rows
+    DELETE_BY_IDS: Final[str] = """
+        WITH deleted AS (
+            DELETE FROM public.sensor_readings_5m
+            WHERE id = ANY($1::uuid[])
+            RETURNING tenant_id, site_id, sensor_id, ts
+        ),
+    """ + RECORD_DELETIONS + """
+        SELECT count(*) AS n FROM deleted
+    """
+
+    # Aggregations available in /sensors/{id}/series (name -> SQL over the bucket)
+    SERIES_AGGREGATES: Final[dict[str, str]] = {
+        "avg": "avg(r.value)",
+        "min": "min(r.value)",
+        "max": "max(r.value)",
+        "sum": "sum(r.value)",
+        "count": "count(*)",
+        "last": "(array_agg(r.value ORDER BY r.ts DESC))[1]",
+    }
+
+    # $1 sensor_id, $2 bucket interval, $3 from (inclusive), $4 to (exclusive)
+    # The WHERE clause is a range on (sensor_id, ts), so the existing index is used
+    SERIES: Final[str] = """
+        SELECT date_bin($2::interval, r.ts, TIMESTAMPTZ '2000-01-01 00:00:00+00') AS bucket_ts,
+               {aggregates}
+        FROM public.sensor_readings_5m AS r
+        WHERE r.sensor_id = $1
+          AND r.ts >= $3
+          AND r.ts < $4
+          AND r.quality <> 'invalid'
+        GROUP BY bucket_ts
+        ORDER BY bucket_ts
+    """
+
+    # {where} is built from the export filters ($n placeholders); ids as text so the
+    # encoders do not convert UUIDs row by row
+    EXPORT: Final[str] = """
+        SELECT r.tenant_id::text AS tenant_id, r.site_id::text AS site_id, r.sensor_id::text AS sensor_id,
+               r.ts, r.value, r.quality
+        FROM public.sensor_readings_5m AS r
+        WHERE {where}
+        ORDER BY r.sensor_id, r.ts
+    """
+
+    # Same aggregations over partial aggregates (rollup rows and raw readings as 1-sample rows)
+    SERIES_ROLLUP_AGGREGATES: Final[dict[str, str]] = {
+        "avg": "sum(p.sum_value) / sum(p.samples)",
+        "min": "min(p.min_value)",
+        "max": "max(p.max_value)",
+        "sum": "sum(p.sum_value)",
+        "count": "sum(p.samples)::int",
+        "last": "(array_agg(p.last_value ORDER BY p.last_ts DESC))[1]",
+    }
+
+    # {table}: sensor_readings_1h | sensor_readings_1d
+    # $1 sensor_id, $2 bucket interval, $3 from, $4 to, [$5, $6): whole table buckets already
+    # maintained by the rollup worker, read from the rollup table; the raw readings cover the
+    # rest of the range, [$3, $5) and [$6, $4)
+    SERIES_FROM_ROLLUP: Final[str] = """
+        WITH p AS (
+            SELECT h.bucket_ts AS ts, h.samples, h.sum_value, h.min_value, h.max_value, h.last_value, h.last_ts
+            FROM public.{table} AS h
+            WHERE h.sensor_id = $1
+              AND h.bucket_ts >= $5
+              AND h.bucket_ts < $6
+            UNION ALL
+            SELECT r.ts, 1, r.value, r.value, r.value, r.value, r.ts
+            FROM public.sensor_readings_5m AS r
+            WHERE r.sensor_id = $1
+              AND r.ts >= $3
+              AND r.ts < $5
+              AND r.quality <> 'invalid'
+            UNION ALL
+            SELECT r.ts, 1, r.value, r.value, r.value, r.value, r.ts
+            FROM public.sensor_readings_5m AS r
+            WHERE r.sensor_id = $1
+              AND r.ts >= $6
+              AND r.ts < $4
+              AND r.quality <> 'invalid'
+        )
+        SELECT date_bin($2::interval, p.ts, TIMESTAMPTZ '2000-01-01 00:00:00+00') AS bucket_ts,
+               {aggregates}
+        FROM p
+        GROUP BY bucket_ts
+        ORDER BY bucket_ts
+    """
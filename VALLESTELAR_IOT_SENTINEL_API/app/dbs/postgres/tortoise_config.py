@@ -1,27 +1,7 @@
-# app/db/context.py
-import os
-from dotenv import load_dotenv
-from tortoise import Tortoise
+# app/dbs/postgres/tortoise_config.py
+# Config de aerich (pyproject.toml): la misma conexión que usa la API, ver context.py
+from app.dbs.postgres.context import build_tortoise_config
 
-
-load_dotenv()  # Carga las variables del .env
-
-user = os.getenv("POSTGRES_USER", "postgres")
-password = os.getenv("POSTGRES_PASSWORD", "postgres")
-host = os.getenv("POSTGRES_HOST", "localhost")
-port = os.getenv("POSTGRES_PORT", "5432")
-db_name = os.getenv("POSTGRES_DB", "iot_sentinel_db")
-
-db_url = f"postgres://{user}:{password}@{host}:{port}/{db_name}"
-
-MODELS = ["app.models.entities", "aerich.models"] 
-
-TORTOISE_ORM = {
-    "connections": {"default": db_url},
-    "apps": {
-        "models": {
-            "models": MODELS,
-            "default_connection": "default",
-        }
-    },
-}
+# aerich keeps its former defaults (password "postgres", database "iot_sentinel_db") when
+# POSTGRES_PASSWORD / POSTGRES_DB are not set, so it still migrates the same database
+TORTOISE_ORM = build_tortoise_config(default_password="postgres", default_database="iot_sentinel_db")
@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import RedirectResponse, HTMLResponse
+from fastapi.responses import RedirectResponse, HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
@@ -11,10 +11,13 @@ import logging
 from contextlib import asynccontextmanager
 
 from app.core.logging import configure_logging
-from app.core.middleware import log_requests
+from app.core.metrics import render as render_metrics
+from app.core.middleware import log_requests, track_metrics
 from app.api.v1 import routes
 from app.core.exceptions.conflict_handlers import conflict_handler
-from app.core.exceptions.domain_exceptions import ConflictError
+from app.core.exceptions.pagination_handlers import invalid_cursor_handler
+from app.core.exceptions.busy_handlers import service_busy_handler
+from app.core.exceptions.domain_exceptions import ConflictError, InvalidCursorError, ServiceBusyError
 from app.dbs.postgres.context import DbContext
 
 configure_logging()
@@ -57,7 +60,10 @@ async def backoffice_redirect():
     return RedirectResponse(url="/backoffice", status_code=302)
 
 app.middleware("http")(log_requests)
+app.middleware("http")(track_metrics)
 app.add_exception_handler(ConflictError, conflict_handler)
+app.add_exception_handler(InvalidCursorError, invalid_cursor_handler)
+app.add_exception_handler(ServiceBusyError, service_busy_handler)
 
 for r in routes.all_routers:
     app.include_router(r)
@@ -65,3 +71,8 @@ for r in routes.all_routers:
 @app.get("/health")
 async def health_check():
     return await db.check_connection()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
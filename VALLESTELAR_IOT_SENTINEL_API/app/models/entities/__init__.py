@@ -20,3 +20,7 @@ from .sensor_reading import SensorReading
 from .daily_metric import DailyMetric
 from .security_mode import SecurityMode
 from .energy_system import EnergySystem
+from .job_watermark import JobWatermark
+from .sensor_reading_1h import SensorReadingHourly
+from .sensor_reading_1d import SensorReadingDaily
+from .sensor_reading_deletion import SensorReadingDeletion
@@ -12,7 +12,7 @@ class Command(Model):
     command_type = fields.CharField(max_length=30)  # set_state|pulse|open|close
     payload = fields.JSONField(default=dict)
 
-    status = fields.CharField(max_length=30, default="queued")  # queued|sent|acked|failed
+    status = fields.CharField(max_length=30, default="queued")  # queued|sent|acked|failed|superseded
     requested_by = fields.ForeignKeyField("models.User", related_name="commands", null=True, on_delete=fields.SET_NULL)
 
     sent_at = fields.DatetimeField(null=True)
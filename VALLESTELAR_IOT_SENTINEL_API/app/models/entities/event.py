@@ -31,4 +31,10 @@ class Event(Model):
 
     class Meta:
         table = "events"
-        indexes = (("tenant_id",), ("site_id",), ("ts",), ("event_type",), ("severity",), ("ack_status",))
+        # (site_id, event_type, source_id): lookup of the open event to coalesce into (event_service.py)
+        # (site_id, created_at): events created in the last minute per site (rate limit), also
+        # serves the filters on site_id alone
+        indexes = (
+            ("tenant_id",), ("site_id", "created_at"), ("ts",), ("event_type",), ("severity",), ("ack_status",),
+            ("site_id", "event_type", "source_id"),
+        )
@@ -0,0 +1,19 @@
+from __future__ import annotations
+from tortoise import fields
+from tortoise.models import Model
+
+
+class JobWatermark(Model):
+    id = fields.UUIDField(pk=True)
+
+    job_name = fields.CharField(max_length=100, unique=True)  # daily_metrics_rollup...
+    watermark = fields.DatetimeField()  # rows created up to this instant are already processed
+
+    metadata = fields.JSONField(default=dict)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    created_by = fields.CharField(max_length=100, default="system")
+    updated_at = fields.DatetimeField(auto_now=True)
+    updated_by = fields.CharField(max_length=100, default="system")
+
+    class Meta:
+        table = "job_watermarks"
@@ -22,4 +22,5 @@ class SensorReading(Model):
     class Meta:
         table = "sensor_readings_5m"
         unique_together = (("sensor_id", "ts"),)
-        indexes = (("tenant_id", "ts"), ("site_id", "ts"), ("sensor_id", "ts"))
+        # updated_at drives the rollup watermarks: inserts and corrections (upserts, PATCH) alike
+        indexes = (("tenant_id", "ts"), ("site_id", "ts"), ("sensor_id", "ts"), ("updated_at",))
@@ -0,0 +1,30 @@
+from __future__ import annotations
+from tortoise import fields
+from tortoise.models import Model
+
+
+class SensorReadingHourly(Model):
+    # Rollup of sensor_readings_5m, one row per sensor and hour. Maintained by app.workers.rollups
+    id = fields.UUIDField(pk=True)
+    tenant = fields.ForeignKeyField("models.Tenant", related_name="sensor_readings_1h", on_delete=fields.CASCADE)
+    site = fields.ForeignKeyField("models.Site", related_name="sensor_readings_1h", on_delete=fields.CASCADE)
+    sensor = fields.ForeignKeyField("models.Sensor", related_name="readings_1h", on_delete=fields.CASCADE)
+
+    bucket_ts = fields.DatetimeField()  # start of the bucket
+    samples = fields.IntField()
+    sum_value = fields.FloatField()
+    min_value = fields.FloatField()
+    max_value = fields.FloatField()
+    avg_value = fields.FloatField()
+    last_value = fields.FloatField()
+    last_ts = fields.DatetimeField()
+
+    created_at = fields.DatetimeField(auto_now_add=True)
+    created_by = fields.CharField(max_length=100, default="system")
+    updated_at = fields.DatetimeField(auto_now=True)
+    updated_by = fields.CharField(max_length=100, default="system")
+
+    class Meta:
+        table = "sensor_readings_1h"
+        unique_together = (("sensor_id", "bucket_ts"),)
+        indexes = (("site_id", "bucket_ts"),)
@@ -0,0 +1,19 @@
+from __future__ import annotations
+from tortoise import fields
+from tortoise.models import Model
+
+
+class SensorReadingDeletion(Model):
+    # Hours of a sensor that lost readings (DELETE endpoints, retention), so app.workers.rollups
+    # recomputes them: a deleted row leaves no updated_at behind. Purged once rolled up
+    id = fields.UUIDField(pk=True)
+    tenant = fields.ForeignKeyField("models.Tenant", related_name="sensor_reading_deletions", on_delete=fields.CASCADE)
+    site = fields.ForeignKeyField("models.Site", related_name="sensor_reading_deletions", on_delete=fields.CASCADE)
+    sensor = fields.ForeignKeyField("models.Sensor", related_name="reading_deletions", on_delete=fields.CASCADE)
+
+    bucket_ts = fields.DatetimeField()  # start of the hour
+    deleted_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "sensor_reading_deletions"
+        indexes = (("deleted_at",),)
@@ -0,0 +1,78 @@
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
+
+from tortoise.models import Model
+
+from app.dbs.postgres.generic_repository import read_db
+from app.dbs.postgres.queries.daily_metrics.daily_metric_queries import DailyMetricQuerys
+from app.dbs.postgres.queries.sensor_readings.sensor_reading_queries import SensorReadingQuerys
+from app.models.entities import DailyMetric, SensorReading
+
+EXPORT_BATCH_SIZE = 10_000
+
+
+def _where(conditions: list[tuple[str, Any]]) -> tuple[str, list[Any]]:
+    """[("r.site_id =", id), ...] -> ("r.site_id = $1 AND ...", [id, ...]), skipping None values"""
+    parts: list[str] = []
+    args: list[Any] = []
+    for expr, value in conditions:
+        if value is None:
+            continue
+        args.append(value)
+        parts.append(f"{expr} ${len(args)}")
+    return (" AND ".join(parts) or "TRUE"), args
+
+
+async def _stream(model: type[Model], sql: str, args: list[Any], batch_size: int) -> AsyncIterator[list]:
+    """
+    Server-side cursor: rows come from Postgres `batch_size` at a time, so an export
+    never holds the whole result in memory. The connection is kept for the whole stream
+    (on the replica when there is one).
+    """
+    async with read_db(model).acquire_connection() as conn:
+        async with conn.transaction(readonly=True):
+            cursor = await conn.cursor(sql, *args)
+            while True:
+                rows = await cursor.fetch(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+
+def stream_sensor_readings(
+    *,
+    tenant_id: Optional[UUID] = None,
+    site_id: Optional[UUID] = None,
+    sensor_id: Optional[UUID] = None,
+    ts_from: Optional[datetime] = None,
+    ts_to: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[list]:
+    where, args = _where([
+        ("r.tenant_id =", tenant_id),
+        ("r.site_id =", site_id),
+        ("r.sensor_id =", sensor_id),
+        ("r.ts >=", ts_from),
+        ("r.ts <", ts_to),
+    ])
+    return _stream(SensorReading, SensorReadingQuerys.EXPORT.format(where=where), args, batch_size)
+
+
+def stream_daily_metrics(
+    *,
+    tenant_id: Optional[UUID] = None,
+    site_id: Optional[UUID] = None,
+    metric_key: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[list]:
+    where, args = _where([
+        ("m.tenant_id =", tenant_id),
+        ("m.site_id =", site_id),
+        ("m.metric_key =", metric_key),
+        ("m.metric_date >=", date_from),
+        ("m.metric_date <=", date_to),
+    ])
+    return _stream(DailyMetric, DailyMetricQuerys.EXPORT.format(where=where), args, batch_size)
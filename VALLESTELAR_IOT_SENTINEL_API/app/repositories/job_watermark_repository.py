@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.dbs.postgres.generic_repository import read_db
+from app.models.entities import JobWatermark
+from app.services.service_factory import service_factory
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Job names (job_watermarks.job_name)
+DAILY_METRICS_ROLLUP_JOB = "daily_metrics_rollup"
+SENSOR_READINGS_ROLLUP_JOB = "sensor_readings_rollup"
+
+
+async def get_watermark(job_name: str, *, use_primary: bool = True) -> Optional[datetime]:
+    # the jobs read their own watermark from the primary; API reads pass use_primary=False
+    row = await JobWatermark.filter(job_name=job_name).using_db(read_db(JobWatermark, use_primary)).first()
+    return row.watermark if row else None
+
+
+async def set_watermark(job_name: str, watermark: datetime) -> None:
+    await service_factory.get(JobWatermark).upsert(
+        conflict_fields=("job_name",),
+        job_name=job_name,
+        watermark=watermark,
+    )
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Sequence
+from uuid import UUID
+
+from tortoise import connections
+
+from app.dbs.postgres.generic_repository import read_db
+from app.dbs.postgres.queries.sensor_readings.sensor_reading_queries import SensorReadingQuerys
+from app.models.entities import SensorReading
+from app.repositories.job_watermark_repository import SENSOR_READINGS_ROLLUP_JOB, get_watermark
+
+# Origin of every bucket (date_bin in the queries uses the same one)
+BUCKET_ORIGIN = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+# Rollup tables, coarsest first
+ROLLUP_TABLES: tuple[tuple[str, timedelta], ...] = (
+    ("sensor_readings_1d", timedelta(days=1)),
+    ("sensor_readings_1h", timedelta(hours=1)),
+)
+
+
+def _floor(value: datetime, step: timedelta) -> datetime:
+    return BUCKET_ORIGIN + (value - BUCKET_ORIGIN) // step * step
+
+
+def _ceil(value: datetime, step: timedelta) -> datetime:
+    floor = _floor(value, step)
+    return floor if floor == value else floor + step
+
+
+def pick_rollup_table(start: datetime, end: datetime, bucket: timedelta) -> Optional[tuple[str, timedelta]]:
+    """
+    Coarsest rollup table able to answer the query exactly: the bucket is a multiple of the
+    table bucket and at least one whole table bucket fits in the range (the partial table
+    buckets at the edges are read from the raw readings).
+    """
+    for table, step in ROLLUP_TABLES:
+        if bucket % step == timedelta(0) and _ceil(start, step) + step <= end:
+            return table, step
+    return None
+
+
+async def get_sensor_series(
+    sensor_id: UUID,
+    start: datetime,
+    end: datetime,
+    bucket: timedelta,
+    aggs: Sequence[str],
+) -> dict[str, list[Any]]:
+    """
+    Downsampled series of one sensor, aggregated in Postgres.
+    Reads the rollup tables when possible and the raw readings for the part the rollup
+    worker has not processed yet.
+    Returns columnar arrays: {"ts": [...], "<agg>": [...]} (one entry per bucket with data).
+    """
+    rollup = pick_rollup_table(start, end, bucket)
+    # read from the replica like the rollup rows, so replica lag cannot open a gap between them
+    watermark = await get_watermark(SENSOR_READINGS_ROLLUP_JOB, use_primary=False) if rollup else None
+
+    if rollup and watermark:
+        table, step = rollup
+        # whole table buckets already maintained by the worker come from the rollup table,
+        # the partial ones at the edges and everything past the watermark from the raw readings
+        middle_start = _ceil(start, step)
+        middle_end = max(middle_start, min(_floor(end, step), _floor(watermark, step)))
+        aggregates = ", ".join(f"{SensorReadingQuerys.SERIES_ROLLUP_AGGREGATES[a]} AS {a}" for a in aggs)
+        sql = SensorReadingQuerys.SERIES_FROM_ROLLUP.format(table=table, aggregates=aggregates)
+        args = [sensor_id, bucket, start, end, middle_start, middle_end]
+    else:
+        aggregates = ", ".join(f"{SensorReadingQuerys.SERIES_AGGREGATES[a]} AS {a}" for a in aggs)
+        sql = SensorReadingQuerys.SERIES.format(aggregates=aggregates)
+        args = [sensor_id, bucket, start, end]
+
+    async with read_db(SensorReading).acquire_connection() as raw:
+        rows = await raw.fetch(sql, *args)
+
+    columns: dict[str, list[Any]] = {"ts": [r["bucket_ts"] for r in rows]}
+    for a in aggs:
+        columns[a] = [r[a] for r in rows]
+    return columns
+
+
+async def delete_readings(ids: Sequence[UUID]) -> int:
+    """
+    Deletes the readings and records their hours in sensor_reading_deletions (same
+    statement), so the rollup worker recomputes them. Returns the number of deleted rows.
+    """
+    if not ids:
+        return 0
+    db = connections.get(SensorReading._meta.default_connection)
+    rows = await db.execute_query_dict(SensorReadingQuerys.DELETE_BY_IDS, [list(ids)])
+    return rows[0]["n"]
@@ -23,3 +23,9 @@ async def user_has_membership(user_id: str, tenant_id: str) -> bool:
     )
     return membership is not None
 
+
+async def get_membership(user_id: str, tenant_id: str) -> Optional[UserMembership]:
+    return await UserMembership.get_or_none(
+        user_id=user_id,
+        tenant_id=tenant_id,
+    )
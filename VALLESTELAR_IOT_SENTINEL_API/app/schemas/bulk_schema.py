@@ -0,0 +1,63 @@
+from __future__ import annotations
+from typing import Any, Generic, Literal, Optional, TypeVar
+from uuid import UUID
+from pydantic import BaseModel, ConfigDict, Field, create_model
+from pydantic.fields import FieldInfo
+from tortoise.models import Model
+
+# Largest batch accepted by the /bulk routes (create, update and delete)
+MAX_BULK_ITEMS = 1000
+
+U = TypeVar("U", bound=BaseModel)
+
+# What PUT /bulk does with rows whose unique key already exists
+BulkConflict = Literal["update", "ignore"]
+
+
+def unique_fields(entity: type[Model]) -> set[str]:
+    """Columns of the unique keys of an entity (unique fields and unique_together)"""
+    meta = entity._meta
+    fields = {name for key in meta.unique_together for name in key}
+    fields |= {name for name, f in meta.fields_map.items() if f.unique and not f.pk}
+    return fields
+
+
+def bulk_changes(update_model: type[BaseModel], entity: type[Model]) -> type[BaseModel]:
+    """
+    Model of the `changes` of a PATCH /bulk: the fields of `update_model`, all optional,
+    without the unique-key columns of `entity` (one value written to several rows would
+    collide). Sending one of those, or any unknown field, is a 422.
+    """
+    excluded = unique_fields(entity)
+    fields: dict[str, Any] = {
+        name: (Optional[info.annotation], FieldInfo.merge_field_infos(info, default=None))
+        for name, info in update_model.model_fields.items()
+        if name not in excluded
+    }
+    name = update_model.__name__.removesuffix("Update") + "BulkChanges"
+    return create_model(name, __config__=ConfigDict(extra="forbid"), **fields)
+
+
+class BulkIds(BaseModel):
+    """Rows targeted by a bulk delete"""
+    ids: list[UUID] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class BulkUpdate(BulkIds, Generic[U]):
+    """Same changes applied to every id (only the fields sent are written)"""
+    changes: U
+
+
+class BulkUpdateResult(BaseModel):
+    updated: int
+
+
+class BulkUpsertResult(BaseModel):
+    """Rows of a PUT /bulk: inserted, updated (same unique key) or skipped (on_conflict=ignore)"""
+    inserted: int
+    updated: int
+    skipped: int
+
+
+class BulkDeleteResult(BaseModel):
+    deleted: int
@@ -0,0 +1,67 @@
+# app/schemas/columnar.py
+"""
+Columnar ("arrays, not objects") representation for time series lists:
+
+    {"items": {"ts": [...], "value": [...], "quality": [...]}, "meta": {...}}
+
+Built straight from the rows returned by .values(), without a pydantic model per row.
+"""
+from __future__ import annotations
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Literal, Optional, Sequence
+from uuid import UUID
+
+from fastapi import Request
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.sentinel.columnar+json"
+
+ResponseFormat = Literal["json", "columnar"]
+TsFormat = Literal["iso", "epoch_ms"]
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MS = timedelta(milliseconds=1)
+
+
+def wants_columnar(request: Request, fmt: Optional[ResponseFormat]) -> bool:
+    """format= wins over the Accept header"""
+    if fmt is not None:
+        return fmt == "columnar"
+    return COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _datetime_epoch_ms(v: datetime) -> int:
+    if v.tzinfo is None:
+        v = v.replace(tzinfo=timezone.utc)
+    return (v - _EPOCH) // _MS
+
+
+def _date_epoch_ms(v: date) -> int:
+    return (v - _EPOCH.date()).days * 86_400_000
+
+
+
+def _converter(sample: Any, ts_format: TsFormat) -> Optional[Callable[[Any], Any]]:
+    # Chosen once per column from the first non-null value
+    if isinstance(sample, datetime):
+        return _datetime_epoch_ms if ts_format == "epoch_ms" else datetime.isoformat
+    if isinstance(sample, date):
+        return _date_epoch_ms if ts_format == "epoch_ms" else date.isoformat
+    if isinstance(sample, UUID):
+        return str
+    return None
+
+
+def to_columns(
+    rows: Sequence[dict[str, Any]],
+    fields: Sequence[str],
+    ts_format: TsFormat = "iso",
+) -> dict[str, list[Any]]:
+    columns: dict[str, list[Any]] = {}
+    for name in fields:
+        col = [row[name] for row in rows]
+        sample = next((v for v in col if v is not None), None)
+        convert = _converter(sample, ts_format)
+        if convert is not None:
+            col = [convert(v) if v is not None else None for v in col]
+        columns[name] = col
+    return columns
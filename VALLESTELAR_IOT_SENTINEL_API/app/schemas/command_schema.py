@@ -63,10 +63,12 @@ class CommandMinimalOut(BaseModel):
 
 class PageMeta(BaseModel):
     """Metadata for pagination"""
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    pages: int
+    pages: Optional[int] = None
+    has_next: bool = False
+    next_cursor: Optional[str] = None
 
 
 class CommandPage(BaseModel):
@@ -60,10 +60,12 @@ class DeviceMinimalOut(BaseModel):
 
 class PageMeta(BaseModel):
     """Metadata for pagination"""
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    pages: int
+    pages: Optional[int] = None
+    has_next: bool = False
+    next_cursor: Optional[str] = None
 
 
 class DevicePage(BaseModel):
@@ -15,6 +15,14 @@ class SensorReadingCreate(BaseModel):
     meta: Optional[dict] = None
 
 
+class SensorReadingBulkResult(BaseModel):
+    """Result of a bulk ingestion call"""
+    received: int
+    inserted: int
+    updated: int = 0
+    skipped: int = 0
+
+
 class SensorReadingUpdate(BaseModel):
     """DTO for updating a SensorReading (optional fields)"""
     tenant_id: UUID
@@ -54,10 +62,12 @@ class SensorReadingMinimalOut(BaseModel):
 
 class PageMeta(BaseModel):
     """Metadata for pagination"""
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    pages: int
+    pages: Optional[int] = None
+    has_next: bool = False
+    next_cursor: Optional[str] = None
 
 
 class SensorReadingPage(BaseModel):
@@ -60,13 +60,30 @@ class SensorMinimalOut(BaseModel):
 
 class PageMeta(BaseModel):
     """Metadata for pagination"""
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    pages: int
+    pages: Optional[int] = None
+    has_next: bool = False
+    next_cursor: Optional[str] = None
 
 
 class SensorPage(BaseModel):
     """Paginated response for Sensors"""
     items: list[SensorOut]
     meta: PageMeta
+
+
+class SensorSeriesOut(BaseModel):
+    """Downsampled series of a sensor, in columnar form (one position per bucket)"""
+    sensor_id: UUID
+    bucket: str
+    start: datetime = Field(..., serialization_alias="from")
+    end: datetime = Field(..., serialization_alias="to")
+    ts: list[datetime]
+    avg: Optional[list[Optional[float]]] = None
+    min: Optional[list[Optional[float]]] = None
+    max: Optional[list[Optional[float]]] = None
+    sum: Optional[list[Optional[float]]] = None
+    count: Optional[list[int]] = None
+    last: Optional[list[Optional[float]]] = None
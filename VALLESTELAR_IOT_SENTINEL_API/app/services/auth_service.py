@@ -1,9 +1,20 @@
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, Optional
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core.security.jwt import encode_jwt, decode_jwt
 
+# Verified claims by sha256 of the token, kept until the token's exp. A polling dashboard
+# sends the same token many times a minute: only the first call verifies the signature.
+# Tokens without exp are kept for the access token lifetime.
+token_cache: TTLCache[bytes, Dict[str, Any]] = TTLCache(
+    maxsize=settings.token_cache_size,
+    ttl=settings.access_token_expire_minutes * 60,
+)
+
 
 class AuthService:
 
@@ -39,8 +50,21 @@ class AuthService:
 
     @staticmethod
     def decode_token(token: str) -> Dict[str, Any]:
-        return decode_jwt(
-            token,
-            settings.jwt_secret,
-            [settings.jwt_algorithm],
-        )
+        key = hashlib.sha256(token.encode()).digest()
+        claims = token_cache.get(key)
+        if claims is None:
+            claims = decode_jwt(
+                token,
+                settings.jwt_secret,
+                [settings.jwt_algorithm],
+            )
+            exp = claims.get("exp")
+            ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+            if ttl is None or ttl > 0:
+                token_cache.set(key, claims, ttl=ttl)
+        # callers get their own copy: the cached claims are shared
+        return dict(claims)
+
+    @staticmethod
+    def token_cache_stats() -> Dict[str, Any]:
+        return token_cache.stats()
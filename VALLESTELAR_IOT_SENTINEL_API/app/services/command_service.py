@@ -0,0 +1,54 @@
+# app/services/command_service.py
+"""
+Command writes. Every command created through the service (POST /commands, the rule engine)
+sends a NOTIFY on COMMANDS_CHANNEL after the insert, which wakes the command dispatcher
+(app/workers/command_dispatcher.py) right away instead of at its next poll.
+
+A new set_state also supersedes the queued set_state commands of its actuator (only the
+latest desired state is sent), which keeps the queue short during rule storms.
+"""
+from __future__ import annotations
+
+from typing import Any, Sequence
+from uuid import UUID
+
+from tortoise import connections
+
+from app.dbs.postgres.listener import notify
+from app.dbs.postgres.queries.commands.command_queries import CommandQuerys
+from app.models.entities import Command
+from app.services.generic_service import GenericService
+from app.services.service_factory import service_factory
+
+COMMANDS_CHANNEL = "commands_queued"
+
+
+class CommandService(GenericService[Command]):
+
+    async def _queued(self, objs: Sequence[Command]) -> None:
+        queued = [x for x in objs if x.status == "queued"]
+        if not queued:
+            return
+        actuator_ids = list({x.actuator_id for x in queued if x.command_type == "set_state"})
+        if actuator_ids:
+            await self.supersede_queued(actuator_ids)
+        await notify(COMMANDS_CHANNEL)
+
+    async def supersede_queued(self, actuator_ids: Sequence[UUID]) -> int:
+        """Marks superseded the queued set_state commands a newer set_state replaces"""
+        db = connections.get(self.model._meta.default_connection)
+        superseded, _ = await db.execute_query(CommandQuerys.SUPERSEDE_QUEUED, [list(actuator_ids)])
+        return superseded
+
+    async def create(self, **data: Any) -> Command:
+        obj = await super().create(**data)
+        await self._queued([obj])
+        return obj
+
+    async def bulk_create(self, rows: Sequence[dict[str, Any]]) -> list[Command]:
+        objs = await super().bulk_create(rows)
+        await self._queued(objs)
+        return objs
+
+
+service_factory.register_override(Command, CommandService)
@@ -0,0 +1,140 @@
+# app/services/event_service.py
+"""
+Event writes with deduplication and storm suppression, used by POST /events and the rule
+engine (the generic CRUD is unchanged).
+
+- Occurrences of the same (site, event_type, source_id) while an event with that key is
+  open (not closed) and was seen in the last EVENT_DEDUP_WINDOW_SECONDS do not insert a
+  row: meta.count of the open event grows and meta.last_ts moves forward
+- At most EVENT_RATE_LIMIT_PER_MINUTE new events per site and minute; the rest are dropped
+  (and logged)
+
+Keys and sites are locked with transaction-level advisory locks, so API workers and the
+ingestion worker writing the same events do not insert duplicates.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Sequence
+from uuid import UUID
+
+from tortoise.transactions import in_transaction
+
+from app.core.config import settings
+from app.dbs.postgres.queries.events.event_queries import EventQuerys
+from app.models.entities import Event
+from app.services.generic_service import GenericService
+from app.services.service_factory import service_factory
+
+log = logging.getLogger("app.events")
+
+EventKey = tuple[UUID, str, UUID | None]
+
+
+@dataclass
+class EventRecordResult:
+    events: list[Event] = field(default_factory=list)  # one per key: created or coalesced
+    created: int = 0
+    coalesced: int = 0
+    suppressed: int = 0
+
+
+def _key(row: dict[str, Any]) -> EventKey:
+    return row["site_id"], row["event_type"], row.get("source_id")
+
+
+def _as_utc(ts: datetime) -> datetime:
+    """Naive timestamps are UTC (as in the rule engine): naive and aware ones can be compared"""
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+
+def _lock_name(key: EventKey) -> str:
+    site_id, event_type, source_id = key
+    return f"event:{site_id}:{event_type}:{source_id or ''}"
+
+
+class EventService(GenericService[Event]):
+
+    async def record(self, rows: Sequence[dict[str, Any]]) -> EventRecordResult:
+        """
+        Writes event occurrences (EventCreate fields), coalescing and rate limiting them.
+        Occurrences of the same key in `rows` count as one event with meta.count > 1.
+        """
+        result = EventRecordResult()
+        if not rows:
+            return result
+
+        rows = [{**row, "ts": _as_utc(row["ts"])} for row in rows]
+        window = settings.event_dedup_window_seconds
+        rate_limit = settings.event_rate_limit_per_minute
+
+        # occurrences per key, in arrival order; without dedup every row is its own group
+        groups: dict[Any, list[dict[str, Any]]] = {}
+        for i, row in enumerate(rows):
+            groups.setdefault(_key(row) if window > 0 else i, []).append(row)
+
+        async with in_transaction(self.model._meta.default_connection) as conn:
+            locks = [f"event-site:{site_id}" for site_id in {r["site_id"] for r in rows}] if rate_limit > 0 else []
+            if window > 0:
+                locks += [_lock_name(k) for k in groups]
+            if locks:
+                await conn.execute_query(EventQuerys.LOCK_KEYS, [locks])
+
+            if window > 0:
+                keys = list(groups)
+                updated = await conn.execute_query_dict(
+                    EventQuerys.COALESCE_OPEN,
+                    [
+                        [k[0] for k in keys],
+                        [k[1] for k in keys],
+                        [k[2] for k in keys],
+                        [len(groups[k]) for k in keys],
+                        [max(r["ts"] for r in groups[k]) for k in keys],
+                        timedelta(seconds=window),
+                    ],
+                )
+                for r in updated:
+                    event = self.model._init_from_db(**r)
+                    groups.pop((event.site_id, event.event_type, event.source_id), None)
+                    result.events.append(event)
+                    result.coalesced += 1
+
+            pending = list(groups.values())
+            if rate_limit > 0 and pending:
+                sites = list({g[0]["site_id"] for g in pending})
+                created = await conn.execute_query_dict(EventQuerys.CREATED_LAST_MINUTE, [sites])
+                budget = {site_id: rate_limit for site_id in sites}
+                for r in created:
+                    budget[r["site_id"]] -= r["created"]
+                allowed = []
+                for group in pending:
+                    site_id = group[0]["site_id"]
+                    if budget[site_id] > 0:
+                        budget[site_id] -= 1
+                        allowed.append(group)
+                    else:
+                        result.suppressed += len(group)
+                pending = allowed
+
+            new_rows = []
+            for group in pending:
+                first = group[0]
+                meta = dict(first.get("meta") or {})
+                meta["count"] = len(group)
+                meta["last_ts"] = max(r["ts"] for r in group).isoformat()
+                new_rows.append({**first, "meta": meta})
+            created_events = await self.repo.bulk_create(new_rows)
+            result.events.extend(created_events)
+            result.created = len(created_events)
+
+        if result.suppressed:
+            log.warning(
+                "events.rate_limited",
+                extra={"suppressed": result.suppressed, "limit_per_minute": rate_limit},
+            )
+        return result
+
+
+service_factory.register_override(Event, EventService)
@@ -0,0 +1,131 @@
+# app/services/export_service.py
+"""
+Encoders for the streaming exports (/sensor-readings/export, /daily-metrics/export).
+
+Each one turns the record batches read from a server-side cursor into bytes as they
+arrive: CSV lines, an Arrow IPC stream (one record batch per DB batch) or a Parquet
+file (one row group per DB batch, footer at the end).
+"""
+from __future__ import annotations
+import csv
+import io
+from typing import Any, AsyncIterator, Literal, Sequence
+
+try:  # optional: only needed for format=arrow|parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+ExportFormat = Literal["csv", "arrow", "parquet"]
+
+# column kind -> arrow type
+ColumnKind = Literal["string", "float", "timestamp", "date"]
+
+EXPORT_MEDIA_TYPES: dict[str, str] = {
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_EXTENSIONS: dict[str, str] = {"csv": "csv", "arrow": "arrows", "parquet": "parquet"}
+
+READING_EXPORT_COLUMNS: list[tuple[str, ColumnKind]] = [
+    ("tenant_id", "string"),
+    ("site_id", "string"),
+    ("sensor_id", "string"),
+    ("ts", "timestamp"),
+    ("value", "float"),
+    ("quality", "string"),
+]
+DAILY_METRIC_EXPORT_COLUMNS: list[tuple[str, ColumnKind]] = [
+    ("tenant_id", "string"),
+    ("site_id", "string"),
+    ("metric_date", "date"),
+    ("metric_key", "string"),
+    ("value", "float"),
+]
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+class _ChunkSink(io.RawIOBase):
+    """File-like sink for the pyarrow writers; the written bytes are taken out after each batch"""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: Any) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _arrow_schema(columns: Sequence[tuple[str, ColumnKind]]) -> "pa.Schema":
+    types = {
+        "string": pa.string(),
+        "float": pa.float64(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "date": pa.date32(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def _record_batch(rows: list, schema: "pa.Schema") -> "pa.RecordBatch":
+    arrays = [pa.array([r[i] for r in rows], type=field.type) for i, field in enumerate(schema)]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+async def _encode_csv(batches: AsyncIterator[list], columns: Sequence[tuple[str, ColumnKind]]) -> AsyncIterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([name for name, _ in columns])
+    async for rows in batches:
+        writer.writerows(rows)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+async def _encode_arrow(batches: AsyncIterator[list], columns: Sequence[tuple[str, ColumnKind]]) -> AsyncIterator[bytes]:
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        async for rows in batches:
+            writer.write_batch(_record_batch(rows, schema))
+            yield sink.take()
+    yield sink.take()
+
+
+async def _encode_parquet(batches: AsyncIterator[list], columns: Sequence[tuple[str, ColumnKind]]) -> AsyncIterator[bytes]:
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        async for rows in batches:
+            writer.write_batch(_record_batch(rows, schema))
+            yield sink.take()
+    yield sink.take()
+
+
+def encode_export(
+    batches: AsyncIterator[list],
+    columns: Sequence[tuple[str, ColumnKind]],
+    fmt: ExportFormat,
+) -> AsyncIterator[bytes]:
+    if fmt == "csv":
+        return _encode_csv(batches, columns)
+    if not arrow_available():
+        raise RuntimeError("pyarrow is not installed")
+    if fmt == "arrow":
+        return _encode_arrow(batches, columns)
+    return _encode_parquet(batches, columns)
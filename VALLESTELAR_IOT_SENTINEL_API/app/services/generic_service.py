@@ -3,7 +3,7 @@ from typing import Any, Generic, Optional, Sequence, Type, TypeVar
 from tortoise.models import Model
 from tortoise.expressions import Q
 
-from app.dbs.postgres.generic_repository import GenericRepository as Repository
+from app.dbs.postgres.generic_repository import ConflictPolicy, CountMode, UpsertResult, GenericRepository as Repository
 
 T = TypeVar("T", bound=Model)
 
@@ -28,8 +28,50 @@ class GenericService(Generic[T]):
     async def create(self, **data: Any) -> T:
         return await self.repo.create(**data)
 
-    async def get(self, pk: Any, *, related: Optional[Sequence[str]] = None) -> T | None:
-        return await self.repo.get(pk, related=related)
+    async def copy_insert(self, rows: Sequence[dict[str, Any]]) -> int:
+        return await self.repo.copy_insert(rows)
+
+    async def bulk_create(self, rows: Sequence[dict[str, Any]]) -> list[T]:
+        return await self.repo.bulk_create(rows)
+
+    async def bulk_update(self, pks: Sequence[Any], **changes: Any) -> int:
+        return await self.repo.bulk_update(pks, **changes)
+
+    async def bulk_delete(self, pks: Sequence[Any]) -> int:
+        return await self.repo.bulk_delete(pks)
+
+    async def bulk_upsert(
+        self,
+        rows: Sequence[dict[str, Any]],
+        *,
+        conflict_fields: Optional[Sequence[str]] = None,
+        on_conflict: ConflictPolicy = "update",
+        update_fields: Optional[Sequence[str]] = None,
+    ) -> UpsertResult:
+        return await self.repo.bulk_upsert(
+            rows,
+            conflict_fields=conflict_fields,
+            on_conflict=on_conflict,
+            update_fields=update_fields,
+        )
+
+    async def upsert(
+        self,
+        *,
+        conflict_fields: Optional[Sequence[str]] = None,
+        on_conflict: ConflictPolicy = "update",
+        update_fields: Optional[Sequence[str]] = None,
+        **data: Any,
+    ) -> T | None:
+        return await self.repo.upsert(
+            conflict_fields=conflict_fields,
+            on_conflict=on_conflict,
+            update_fields=update_fields,
+            **data,
+        )
+
+    async def get(self, pk: Any, *, related: Optional[Sequence[str]] = None, use_primary: bool = False) -> T | None:
+        return await self.repo.get(pk, related=related, use_primary=use_primary)
 
     async def update(self, pk: Any, **changes: Any) -> T | None:
         return await self.repo.update(pk, **changes)
@@ -59,11 +101,11 @@ class GenericService(Generic[T]):
     async def first(self, *q: Q, related: Optional[Sequence[str]] = None, **filters: Any) -> T | None:
         return await self.repo.first(*q, related=related, **filters)
 
-    async def exists(self, *q: Q, **filters: Any) -> bool:
-        return await self.repo.exists(*q, **filters)
+    async def exists(self, *q: Q, use_primary: bool = False, **filters: Any) -> bool:
+        return await self.repo.exists(*q, use_primary=use_primary, **filters)
 
-    async def count(self, *q: Q, **filters: Any) -> int:
-        return await self.repo.count(*q, **filters)
+    async def count(self, *q: Q, use_primary: bool = False, **filters: Any) -> int:
+        return await self.repo.count(*q, use_primary=use_primary, **filters)
 
     async def list(
         self,
@@ -72,6 +114,7 @@ class GenericService(Generic[T]):
         order_by: Optional[Sequence[str]] = None,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
+        use_primary: bool = False,
         **filters: Any,
     ) -> list[T]:
         return await self.repo.list(
@@ -80,6 +123,7 @@ class GenericService(Generic[T]):
             order_by=order_by,
             limit=limit,
             offset=offset,
+            use_primary=use_primary,
             **filters,
         )
 
@@ -90,15 +134,23 @@ class GenericService(Generic[T]):
         *q: Q,
         related: Optional[Sequence[str]] = None,
         order_by: Optional[Sequence[str]] = None,
+        cursor: Optional[str] = None,
+        count: Optional[CountMode] = None,
+        values: Optional[Sequence[str]] = None,
+        use_primary: bool = False,
         **filters: Any,
     ):
         # Returns the PageResult from your repo
         return await self.repo.list_paginated(
-            page=page,
-            page_size=page_size,
+            page,
+            page_size,
             *q,
             related=related,
             order_by=order_by,
+            cursor=cursor,
+            count=count,
+            values=values,
+            use_primary=use_primary,
             **filters,
         )
 
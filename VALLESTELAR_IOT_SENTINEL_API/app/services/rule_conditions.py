@@ -0,0 +1,303 @@
+# app/services/rule_conditions.py
+"""
+Compilation of Rule.condition_json for the rule engine (rule_engine.py).
+
+A condition is a tree of all/any/not over leaves on one sensor:
+    {"sensor_id": "<uuid>", "op": "<", "value": 25}
+optional keys of a leaf:
+    "metric": "value" (default) | "change" | "change_pct" | "avg", the last three over "window" seconds
+    "for": seconds the comparison must hold before the leaf is true (duration)
+    "clear": hysteresis, once true the leaf stays true until the comparison against "clear"
+             fails (e.g. op "<", value 25, clear 30: on below 25, off at 30 or above)
+    "max_age": seconds after which the last reading of the sensor no longer counts, for
+               conditions across sensors ("flow > 0 while pump power <= 0")
+
+Leaves keep their state and are updated once per reading of their sensor, in O(1): the
+recent readings of each sensor are in a SensorWindow, and the windowed metrics walk it with
+pointers that only move forward. Predicates then just read the leaves.
+"""
+from __future__ import annotations
+
+import operator
+from array import array
+from typing import Any, Callable, Optional
+from uuid import UUID
+
+OPS: dict[str, Callable[[float, float], bool]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+METRICS = ("value", "change", "change_pct", "avg")
+
+# Evaluated with the time (epoch seconds) of the reading being processed
+Predicate = Callable[[float], bool]
+
+
+class RuleCompileError(ValueError):
+    pass
+
+
+class SensorWindow:
+    """
+    Recent readings of one sensor: timestamps and values in two array('d') used as a ring
+    that doubles when full. Keeps every reading of the last `span` seconds plus the newest
+    one before them (the baseline of a change over the whole span), at most `max_samples`.
+    Readings are numbered with a sequence that never goes back, so leaves can keep their
+    position in the window.
+    """
+
+    __slots__ = ("span", "max_samples", "_ts", "_values", "_head", "_size", "first_seq")
+
+    def __init__(self, span: float, max_samples: int) -> None:
+        self.span = span
+        self.max_samples = max_samples
+        self._ts = array("d", bytes(8 * 4))
+        self._values = array("d", bytes(8 * 4))
+        self._head = 0
+        self._size = 0
+        self.first_seq = 0  # sequence of the oldest reading kept
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def end_seq(self) -> int:
+        """Sequence the next reading will get"""
+        return self.first_seq + self._size
+
+    def _index(self, seq: int) -> int:
+        return (self._head + seq - self.first_seq) % len(self._ts)
+
+    def ts(self, seq: int) -> float:
+        return self._ts[self._index(seq)]
+
+    def value(self, seq: int) -> float:
+        return self._values[self._index(seq)]
+
+    @property
+    def last_ts(self) -> Optional[float]:
+        return self.ts(self.end_seq - 1) if self._size else None
+
+    @property
+    def last_value(self) -> float:
+        return self.value(self.end_seq - 1)
+
+    def _grow(self) -> None:
+        cap = len(self._ts)
+        for name in ("_ts", "_values"):
+            old = getattr(self, name)
+            new = array("d", bytes(8 * cap * 2))
+            for i in range(self._size):
+                new[i] = old[(self._head + i) % cap]
+            setattr(self, name, new)
+        self._head = 0
+
+    def _drop_oldest(self) -> None:
+        self._head = (self._head + 1) % len(self._ts)
+        self._size -= 1
+        self.first_seq += 1
+
+    def append(self, ts: float, value: float) -> None:
+        if self._size == len(self._ts):
+            self._grow()
+        i = (self._head + self._size) % len(self._ts)
+        self._ts[i] = ts
+        self._values[i] = value
+        self._size += 1
+
+        cutoff = ts - self.span
+        while self._size > 1 and (self.ts(self.first_seq + 1) <= cutoff or self._size > self.max_samples):
+            self._drop_oldest()
+
+
+# ---------- windowed metrics ----------
+class _Metric:
+    """Number the leaf compares, recomputed on each reading of the sensor"""
+    window = 0.0
+
+    def __call__(self, w: SensorWindow) -> Optional[float]:
+        return w.last_value
+
+
+class _Change(_Metric):
+    """Last value minus the value `window` seconds before (or the oldest one kept)"""
+
+    def __init__(self, window: float, pct: bool) -> None:
+        self.window = window
+        self.pct = pct
+        self.base = 0  # sequence of the baseline reading
+
+    def __call__(self, w: SensorWindow) -> Optional[float]:
+        end = w.end_seq
+        cutoff = w.last_ts - self.window
+        seq = max(self.base, w.first_seq)
+        while seq + 1 < end and w.ts(seq + 1) <= cutoff:
+            seq += 1
+        self.base = seq
+        if seq == end - 1:
+            return None  # a single reading: no change yet
+        base, last = w.value(seq), w.last_value
+        if not self.pct:
+            return last - base
+        return (last - base) / abs(base) * 100 if base else None
+
+
+class _Average(_Metric):
+    """Mean of the readings of the last `window` seconds, as a running sum"""
+
+    def __init__(self, window: float) -> None:
+        self.window = window
+        self.start = -1  # sequence of the oldest reading in the sum
+        self.seen = 0  # sequence after the newest reading in the sum
+        self.total = 0.0
+
+    def __call__(self, w: SensorWindow) -> Optional[float]:
+        end = w.end_seq
+        if self.start < w.first_seq:  # first call, or history evicted below us
+            self.start, self.seen, self.total = w.first_seq, w.first_seq, 0.0
+        while self.seen < end:
+            self.total += w.value(self.seen)
+            self.seen += 1
+        cutoff = w.last_ts - self.window
+        while self.start < end - 1 and w.ts(self.start) <= cutoff:
+            self.total -= w.value(self.start)
+            self.start += 1
+        return self.total / (end - self.start)
+
+
+class Leaf:
+    """Comparison on one sensor, with optional duration, hysteresis and freshness"""
+
+    def __init__(
+        self,
+        sensor_id: UUID,
+        metric: _Metric,
+        cmp: Callable[[float, float], bool],
+        value: float,
+        *,
+        clear: Optional[float] = None,
+        hold: float = 0.0,
+        max_age: Optional[float] = None,
+    ) -> None:
+        self.sensor_id = sensor_id
+        self.metric = metric
+        self.cmp = cmp
+        self.value = value
+        self.clear = value if clear is None else clear
+        self.hold = hold
+        self.max_age = max_age
+        self.on = False
+        self.since = 0.0  # when `on` became true
+        self.last_ts: Optional[float] = None
+
+    @property
+    def span(self) -> float:
+        """Seconds of history the leaf needs in the window"""
+        return self.metric.window
+
+    def update(self, w: SensorWindow) -> None:
+        self.last_ts = w.last_ts
+        x = self.metric(w)
+        if x is None:
+            on = False
+        elif self.on:
+            on = self.cmp(x, self.clear)
+        else:
+            on = self.cmp(x, self.value)
+        if on and not self.on:
+            self.since = w.last_ts
+        self.on = on
+
+    def __call__(self, now: float) -> bool:
+        if not self.on:
+            return False
+        if self.hold and now - self.since < self.hold:
+            return False
+        if self.max_age is not None and now - self.last_ts > self.max_age:
+            return False
+        return True
+
+
+# ---------- compilation ----------
+def as_uuid(value: Any, what: str) -> UUID:
+    try:
+        return value if isinstance(value, UUID) else UUID(str(value))
+    except ValueError:
+        raise RuleCompileError(f"{what} must be a UUID")
+
+
+def _number(node: dict, key: str, *, required: bool = False, positive: bool = False) -> Optional[float]:
+    x = node.get(key)
+    if x is None:
+        if required:
+            raise RuleCompileError(f"{key} is required")
+        return None
+    if isinstance(x, bool) or not isinstance(x, (int, float)):
+        raise RuleCompileError(f"{key} must be a number")
+    if positive and x <= 0:
+        raise RuleCompileError(f"{key} must be greater than 0")
+    return float(x)
+
+
+def _compile_leaf(node: dict) -> Leaf:
+    sensor_id = as_uuid(node.get("sensor_id"), "sensor_id")
+    op = node.get("op")
+    cmp = OPS.get(op)
+    if cmp is None:
+        raise RuleCompileError(f"op must be one of {', '.join(OPS)}")
+    value = _number(node, "value", required=True)
+
+    metric_name = node.get("metric", "value")
+    if metric_name not in METRICS:
+        raise RuleCompileError(f"metric must be one of {', '.join(METRICS)}")
+    if metric_name == "value":
+        metric = _Metric()
+    else:
+        window = _number(node, "window", required=True, positive=True)
+        metric = _Average(window) if metric_name == "avg" else _Change(window, pct=metric_name == "change_pct")
+
+    clear = _number(node, "clear")
+    if clear is not None:
+        if op in ("==", "!="):
+            raise RuleCompileError("clear needs op < <= > or >=")
+        if (op in ("<", "<=") and clear < value) or (op in (">", ">=") and clear > value):
+            raise RuleCompileError("clear must be on the other side of value (hysteresis)")
+
+    return Leaf(
+        sensor_id,
+        metric,
+        cmp,
+        value,
+        clear=clear,
+        hold=_number(node, "for", positive=True) or 0.0,
+        max_age=_number(node, "max_age", positive=True),
+    )
+
+
+def compile_condition(node: Any) -> tuple[Predicate, list[Leaf]]:
+    """Returns the predicate of the condition and its leaves (to be fed the readings)"""
+    if not isinstance(node, dict) or not node:
+        raise RuleCompileError("condition must be a non-empty object")
+
+    if "all" in node or "any" in node:
+        key = "all" if "all" in node else "any"
+        items = node[key]
+        if not isinstance(items, list) or not items:
+            raise RuleCompileError(f"'{key}' must be a non-empty list")
+        compiled = [compile_condition(x) for x in items]
+        preds = tuple(p for p, _ in compiled)
+        leaves = [leaf for _, ls in compiled for leaf in ls]
+        if key == "all":
+            return (lambda now: all(p(now) for p in preds)), leaves
+        return (lambda now: any(p(now) for p in preds)), leaves
+
+    if "not" in node:
+        pred, leaves = compile_condition(node["not"])
+        return (lambda now: not pred(now)), leaves
+
+    leaf = _compile_leaf(node)
+    return leaf, [leaf]
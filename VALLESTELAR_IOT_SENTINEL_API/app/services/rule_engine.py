@@ -0,0 +1,404 @@
+# app/services/rule_engine.py
+"""
+In-process evaluation of Rule.condition_json against incoming readings.
+
+Enabled rules are compiled once into predicate closures and indexed by the sensors they
+reference: a reading is only checked against the rules of its sensor (and site). Rules are
+edge-triggered: the actions run when the condition goes from false to true, not on every
+reading while it stays true.
+
+condition_json (see rule_conditions.py for the windowed / stateful options):
+    {"sensor_id": "<uuid>", "op": "<", "value": 25, "for": 600}
+    {"all": [<condition>, ...]}   {"any": [<condition>, ...]}   {"not": <condition>}
+
+action_json:
+    {"event": {"event_type": "tank_low", "severity": "warning", "title": "...", "description": "..."},
+     "commands": [{"actuator_id": "<uuid>", "command_type": "set_state", "payload": {...}}]}
+
+Sensors and actuators referenced by a rule must belong to its site: the API rejects other
+ones and the engine does not load a rule that refers to them.
+
+Rule CRUD (rule_router) calls rules_changed(): a NOTIFY tells the process running the engine
+to reload them.
+
+State (recent readings per sensor, durations, which rules are active) lives in memory, so the
+engine runs in one process only, the rule evaluator worker (workers/rule_evaluator.py), which
+reads back every stored reading of the sensors it has rules on. Rules loaded at start-up
+(or after the listener reconnects) only observe until their windows and durations are filled
+again: a condition already true before a restart or deploy does not fire a second time.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Iterable, Mapping, Optional, Sequence
+from uuid import UUID
+
+from app.core.config import settings
+from app.dbs.postgres.listener import MAX_PAYLOAD_BYTES, PgListener, notify
+from app.models.entities import Actuator, Command, Event, Rule, Sensor
+from app.services.command_service import CommandService
+from app.services.event_service import EventService
+from app.services.rule_conditions import Leaf, Predicate, RuleCompileError, SensorWindow, as_uuid, compile_condition
+from app.services.service_factory import service_factory
+
+log = logging.getLogger("app.rule_engine")
+
+
+def event_service() -> EventService:
+    return service_factory.get(Event)  # type: ignore[return-value]
+
+
+def command_service() -> CommandService:
+    return service_factory.get(Command)  # type: ignore[return-value]
+
+RULES_CHANNEL = "rules_changed"
+
+SEVERITIES = ("info", "warning", "critical")
+COMMAND_TYPES = ("set_state", "pulse", "open", "close")
+
+_RULE_FIELDS = ("id", "tenant_id", "site_id", "name", "condition_json", "action_json")
+
+
+@dataclass
+class CompiledRule:
+    id: UUID
+    tenant_id: UUID
+    site_id: UUID
+    name: str
+    condition_json: dict
+    predicate: Predicate
+    leaves: list[Leaf]
+    event: Optional[dict[str, Any]] = None
+    commands: list[dict[str, Any]] = field(default_factory=list)
+    active: bool = False  # condition true on the last evaluation
+    primed: bool = True  # False: observing after a load, does not fire yet (see warmup())
+    warmup_until: Optional[float] = None
+
+    def references(self) -> tuple[set[UUID], set[UUID]]:
+        """Sensor and actuator ids of the rule"""
+        return {leaf.sensor_id for leaf in self.leaves}, {c["actuator_id"] for c in self.commands}
+
+    def warmup(self) -> float:
+        """Seconds of readings the leaves need before the condition means what it did before a restart"""
+        return max((leaf.hold + leaf.span for leaf in self.leaves), default=0.0)
+
+
+# ---------- compilation ----------
+def _compile_actions(action_json: Optional[dict], rule_name: str) -> tuple[Optional[dict], list[dict]]:
+    action_json = action_json or {}
+    if not isinstance(action_json, dict):
+        raise RuleCompileError("action_json must be an object")
+
+    event = action_json.get("event")
+    if event is not None:
+        if not isinstance(event, dict) or not event.get("event_type"):
+            raise RuleCompileError("event needs an event_type")
+        severity = event.get("severity", "warning")
+        if severity not in SEVERITIES:
+            raise RuleCompileError(f"event severity must be one of {', '.join(SEVERITIES)}")
+        event = {
+            "event_type": str(event["event_type"])[:50],
+            "severity": severity,
+            "title": str(event.get("title") or rule_name)[:200],
+            "description": event.get("description"),
+        }
+
+    raw_commands = action_json.get("commands", [])
+    if "command" in action_json:
+        raw_commands = [action_json["command"], *raw_commands]
+    if not isinstance(raw_commands, list):
+        raise RuleCompileError("commands must be a list")
+    commands = []
+    for c in raw_commands:
+        if not isinstance(c, dict):
+            raise RuleCompileError("command must be an object")
+        if c.get("command_type") not in COMMAND_TYPES:
+            raise RuleCompileError(f"command_type must be one of {', '.join(COMMAND_TYPES)}")
+        payload = c.get("payload") or {}
+        if not isinstance(payload, dict):
+            raise RuleCompileError("command payload must be an object")
+        commands.append({
+            "actuator_id": as_uuid(c.get("actuator_id"), "actuator_id"),
+            "command_type": c["command_type"],
+            "payload": payload,
+        })
+    return event, commands
+
+
+def rule_references(condition_json: Optional[dict], action_json: Optional[dict]) -> tuple[set[UUID], set[UUID]]:
+    """
+    Sensor and actuator ids of a rule. Raises RuleCompileError if the rule could not be
+    loaded by the engine.
+    """
+    sensor_ids: set[UUID] = set()
+    if condition_json:
+        sensor_ids = {leaf.sensor_id for leaf in compile_condition(condition_json)[1]}
+    _, commands = _compile_actions(action_json, "")
+    return sensor_ids, {c["actuator_id"] for c in commands}
+
+
+async def outside_site(rules: Sequence[tuple[UUID, set[UUID], set[UUID]]]) -> list[Optional[str]]:
+    """
+    For each (site_id, sensor ids, actuator ids): None when every sensor and actuator belongs
+    to the site, else the first one that does not (other site or tenant, or unknown).
+    """
+    sensor_ids = list({x for _, sensors, _ in rules for x in sensors})
+    actuator_ids = list({x for _, _, actuators in rules for x in actuators})
+    sensor_site = dict(await Sensor.filter(id__in=sensor_ids).values_list("id", "site_id")) if sensor_ids else {}
+    actuator_site = dict(await Actuator.filter(id__in=actuator_ids).values_list("id", "site_id")) if actuator_ids else {}
+
+    out: list[Optional[str]] = []
+    for site_id, sensors, actuators in rules:
+        foreign = [f"sensor {x}" for x in sorted(sensors, key=str) if sensor_site.get(x) != site_id]
+        foreign += [f"actuator {x}" for x in sorted(actuators, key=str) if actuator_site.get(x) != site_id]
+        out.append(f"{foreign[0]} is not in site {site_id}" if foreign else None)
+    return out
+
+
+def compile_rule(row: Mapping[str, Any]) -> Optional[CompiledRule]:
+    """None for a rule without condition (nothing to evaluate)"""
+    if not row.get("condition_json"):
+        return None
+    predicate, leaves = compile_condition(row["condition_json"])
+    event, commands = _compile_actions(row.get("action_json"), row["name"])
+    return CompiledRule(
+        id=row["id"],
+        tenant_id=row["tenant_id"],
+        site_id=row["site_id"],
+        name=row["name"],
+        condition_json=row["condition_json"],
+        predicate=predicate,
+        leaves=leaves,
+        event=event,
+        commands=commands,
+    )
+
+
+def _as_utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+# ---------- engine ----------
+class RuleEngine:
+    def __init__(self) -> None:
+        self._rules: dict[UUID, CompiledRule] = {}
+        self._by_sensor: dict[UUID, list[CompiledRule]] = {}
+        self._leaves: dict[UUID, list[Leaf]] = {}
+        self._windows: dict[UUID, SensorWindow] = {}
+        self._listener_task: Optional[asyncio.Task] = None
+        self._pending: set[asyncio.Task] = set()
+        self.started = False
+
+    # ----- lifecycle -----
+    async def start(self) -> None:
+        """Loads the enabled rules and follows changes made by other processes"""
+        await self.load()
+        listener = PgListener({RULES_CHANNEL: self._on_notify}, on_connect=self.load)
+        self._listener_task = asyncio.create_task(listener.run())
+        self.started = True
+
+    async def stop(self) -> None:
+        self.started = False
+        tasks = [t for t in (self._listener_task, *self._pending) if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._listener_task = None
+
+    # ----- loading -----
+    def _compile_rows(self, rows: Iterable[Mapping[str, Any]]) -> list[CompiledRule]:
+        out = []
+        for row in rows:
+            try:
+                compiled = compile_rule(row)
+            except RuleCompileError as e:
+                log.warning("rule.invalid", extra={"rule_id": str(row["id"]), "error": str(e)})
+                continue
+            if compiled is not None:
+                out.append(compiled)
+        return out
+
+    @staticmethod
+    async def _in_site(compiled: list[CompiledRule]) -> list[CompiledRule]:
+        """Drops rules referring to sensors or actuators of another site (written before the API checked it)"""
+        errors = await outside_site([(r.site_id, *r.references()) for r in compiled])
+        for rule, error in zip(compiled, errors):
+            if error is not None:
+                log.warning("rule.invalid", extra={"rule_id": str(rule.id), "error": error})
+        return [r for r, error in zip(compiled, errors) if error is None]
+
+    @staticmethod
+    def _keep_state(compiled: CompiledRule, old: Optional[CompiledRule]) -> CompiledRule:
+        if old is not None and old.condition_json == compiled.condition_json:
+            # e.g. a rename neither fires the rule again nor restarts its durations
+            compiled.predicate, compiled.leaves, compiled.active = old.predicate, old.leaves, old.active
+            compiled.primed, compiled.warmup_until = old.primed, old.warmup_until
+        return compiled
+
+    def _reindex(self) -> None:
+        by_sensor: dict[UUID, list[CompiledRule]] = {}
+        leaves: dict[UUID, list[Leaf]] = {}
+        for rule in self._rules.values():
+            for leaf in rule.leaves:
+                leaves.setdefault(leaf.sensor_id, []).append(leaf)
+                rules = by_sensor.setdefault(leaf.sensor_id, [])
+                if not rules or rules[-1] is not rule:
+                    rules.append(rule)
+        self._by_sensor = by_sensor
+        self._leaves = leaves
+
+        # each window keeps the longest history its leaves need; windows of sensors no rule
+        # references any more are dropped, the others keep their readings across reloads
+        windows: dict[UUID, SensorWindow] = {}
+        for sensor_id, sensor_leaves in leaves.items():
+            w = self._windows.get(sensor_id) or SensorWindow(0.0, settings.rule_window_max_samples)
+            w.span = max(leaf.span for leaf in sensor_leaves)
+            windows[sensor_id] = w
+        self._windows = windows
+
+    async def load(self) -> None:
+        rows = await Rule.filter(is_enabled=True).values(*_RULE_FIELDS)
+        compiled = await self._in_site(self._compile_rows(rows))
+        rules = {}
+        for rule in compiled:
+            kept = self._keep_state(rule, self._rules.get(rule.id))
+            if kept.predicate is rule.predicate:
+                # no state here: the condition may have been true before the (re)start,
+                # the first readings only set it
+                kept.primed = False
+            rules[rule.id] = kept
+        self._rules = rules
+        self._reindex()
+        log.info("rules.loaded", extra={"rules": len(self._rules), "sensors": len(self._by_sensor)})
+
+    async def reload(self, rule_ids: Sequence[UUID]) -> None:
+        """Picks up created, updated, disabled and deleted rules"""
+        rows = await Rule.filter(id__in=list(rule_ids), is_enabled=True).values(*_RULE_FIELDS)
+        previous = dict(self._rules)
+        for rule_id in rule_ids:
+            self._rules.pop(rule_id, None)
+        for rule in await self._in_site(self._compile_rows(rows)):
+            self._rules[rule.id] = self._keep_state(rule, previous.get(rule.id))
+        self._reindex()
+
+    async def rules_changed(self, rule_ids: Sequence[UUID]) -> None:
+        """Called after rule CRUD: reloads them here and in every other process"""
+        if self.started:
+            await self.reload(rule_ids)
+        payload = ",".join(str(x) for x in rule_ids)
+        await notify(RULES_CHANNEL, payload if len(payload) < MAX_PAYLOAD_BYTES else "*")
+
+    def _on_notify(self, payload: str) -> None:
+        if payload == "*":
+            coro = self.load()
+        else:
+            coro = self.reload([UUID(x) for x in payload.split(",") if x])
+        task = asyncio.get_running_loop().create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._reload_done)
+
+    def _reload_done(self, task: asyncio.Task) -> None:
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("rules.reload_failed", exc_info=task.exception())
+
+    # ----- evaluation -----
+    def sensor_ids(self) -> list[UUID]:
+        """Sensors referenced by the loaded rules"""
+        return list(self._by_sensor)
+
+    def evaluate(self, readings: Iterable[Mapping[str, Any]]) -> list[tuple[CompiledRule, Mapping[str, Any]]]:
+        """
+        Updates the state with the readings and returns the (rule, reading) pairs whose
+        condition became true. Readings older than the last one seen for their sensor
+        (late or redelivered) do not change anything. A rule that is not primed only records
+        its state until it has seen warmup() seconds of readings.
+        """
+        by_sensor = self._by_sensor
+        relevant = [
+            r for r in readings
+            if r["sensor_id"] in by_sensor and r.get("quality") != "invalid"
+        ]
+        if not relevant:
+            return []
+        relevant.sort(key=lambda r: _as_utc(r["ts"]))
+
+        fired: list[tuple[CompiledRule, Mapping[str, Any]]] = []
+        for reading in relevant:
+            sensor_id = reading["sensor_id"]
+            now = _as_utc(reading["ts"]).timestamp()
+            window = self._windows[sensor_id]
+            last = window.last_ts
+            if last is not None and now <= last:
+                continue
+            window.append(now, reading["value"])
+            for leaf in self._leaves[sensor_id]:
+                leaf.update(window)
+
+            for rule in by_sensor[sensor_id]:
+                if rule.site_id != reading["site_id"]:
+                    continue
+                matched = rule.predicate(now)
+                if not rule.primed:
+                    if rule.warmup_until is None:
+                        rule.warmup_until = now + rule.warmup()
+                    if now <= rule.warmup_until:
+                        rule.active = matched
+                        continue
+                    rule.primed = True
+                if matched and not rule.active:
+                    fired.append((rule, reading))
+                rule.active = matched
+        return fired
+
+    async def process(self, readings: Sequence[Mapping[str, Any]]) -> None:
+        """Evaluates stored readings and writes the actions of the rules that fired"""
+        if not self.started or not self._by_sensor:
+            return
+        try:
+            fired = self.evaluate(readings)
+            if fired:
+                await self._emit(fired)
+        except Exception:
+            # the readings are already stored: a failing action must not fail the ingestion
+            log.exception("rules.process_failed", extra={"readings": len(readings)})
+
+    async def _emit(self, fired: list[tuple[CompiledRule, Mapping[str, Any]]]) -> None:
+        events: list[dict[str, Any]] = []
+        commands: list[dict[str, Any]] = []
+        for rule, reading in fired:
+            log.info("rule.fired", extra={"rule_id": str(rule.id), "sensor_id": str(reading["sensor_id"]), "value": reading["value"]})
+            if rule.event is not None:
+                events.append({
+                    **rule.event,
+                    "tenant_id": rule.tenant_id,
+                    "site_id": rule.site_id,
+                    "source_type": "sensor",
+                    "source_id": reading["sensor_id"],
+                    "ts": _as_utc(reading["ts"]),
+                    "meta": {"rule_id": str(rule.id), "value": reading["value"]},
+                    "created_by": "rules",
+                    "updated_by": "rules",
+                })
+            for command in rule.commands:
+                commands.append({
+                    **command,
+                    "tenant_id": rule.tenant_id,
+                    "site_id": rule.site_id,
+                    "metadata": {"rule_id": str(rule.id)},
+                    "created_by": "rules",
+                    "updated_by": "rules",
+                })
+
+        if events:
+            # coalesced into the open event of the same key, see event_service.py
+            await event_service().record(events)
+        if commands:
+            # the insert wakes the command dispatcher
+            await command_service().bulk_create(commands)
+
+
+rule_engine = RuleEngine()
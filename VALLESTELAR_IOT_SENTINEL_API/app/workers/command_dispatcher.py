@@ -0,0 +1,334 @@
+# app/workers/command_dispatcher.py
+"""
+Command dispatcher: sends queued commands to the devices over MQTT and records their acks.
+
+Runs as its own process (python -m app.workers.command_dispatcher); several can run at once.
+Each one takes the actuators with the oldest queued commands with a transaction-level
+advisory lock (pg_try_advisory_xact_lock, skipping the ones another dispatcher holds),
+publishes their commands (QoS 1) and marks them sent before releasing the locks, so a
+command is never sent by two dispatchers and the commands of an actuator go out in order.
+No row is locked while waiting for the broker. Each actuator's sent commands are recorded
+as soon as it is done; if a publish fails the commands left stay queued: delivery is at
+least once, devices must ignore a command id they already ran. Commands that can never be
+sent (a channel or serial that is not a valid topic level) are marked failed with the
+error in metadata, so they do not hold up the queue.
+
+Queued set_state commands followed by a newer set_state of the same actuator are not sent:
+they become "superseded" (metadata.superseded_by = the command sent instead). This is done
+when commands are created (services/command_service.py) and again before each dispatch.
+
+Dispatchers wake up on NOTIFY commands_queued (sent when a command is created, see
+services/command_service.py) and poll every COMMAND_POLL_SECONDS anyway.
+
+Topics:
+    <MQTT_TOPIC_PREFIX>/<device serial>/cmd/<actuator channel, or name>    published
+        {"id": "<command id>", "command_type": "set_state", "payload": {...}}
+    <MQTT_TOPIC_PREFIX>/<device serial>/ack/<actuator channel, or name>    subscribed
+        {"id": "<command id>", "ok": true}    or    {"id": "...", "ok": false, "error": "..."}
+
+The dispatchers share the ack subscription ($share/<COMMAND_SHARED_GROUP>/...), so each ack
+is written by one of them. An ack message is acked to the broker once written, and the
+MQTT 5 Receive Maximum (ACK_QUEUE_SIZE) makes the broker wait while that many are pending,
+so a slow database cannot grow the ack queue.
+
+Sent commands without an ack after COMMAND_ACK_TIMEOUT_SECONDS are marked failed.
+"""
+from __future__ import annotations
+
+from dotenv import load_dotenv, find_dotenv
+load_dotenv(find_dotenv())
+
+import asyncio
+import functools
+import json
+import logging
+import signal
+import socket
+from datetime import timedelta
+from typing import Any, Callable, Optional
+from uuid import UUID
+
+import aiomqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+from tortoise import connections
+from tortoise.transactions import in_transaction
+
+from app.core.config import settings
+from app.core.logging import configure_logging
+from app.dbs.postgres.context import DbContext
+from app.dbs.postgres.listener import PgListener
+from app.dbs.postgres.queries.commands.command_queries import CommandQuerys
+from app.models.entities import Command
+from app.services.command_service import COMMANDS_CHANNEL
+
+log = logging.getLogger("app.command_dispatcher")
+
+# Longest wait for the broker to confirm a publish (PUBACK)
+PUBLISH_TIMEOUT_SECONDS = 5.0
+# Most acks written by a single UPDATE
+ACK_BATCH_SIZE = 500
+# Ack messages received and not written yet (also the MQTT Receive Maximum, at most 65535)
+ACK_QUEUE_SIZE = 2000
+# Seconds the broker keeps the session (and the acks) of a disconnected dispatcher
+SESSION_EXPIRY_SECONDS = 24 * 3600
+
+# (command id, acked|failed, error, device serial), None for an unreadable ack message,
+# and the callback acking the message to the broker
+QueuedAck = tuple[Optional[tuple[UUID, str, Optional[str], str]], Callable[[], Any]]
+
+
+def command_topic(prefix: str, row: dict[str, Any]) -> str:
+    return f"{prefix}/{row['serial']}/cmd/{row['channel'] or row['actuator_name']}"
+
+
+def command_message(row: dict[str, Any]) -> str:
+    payload = row["payload"]
+    if isinstance(payload, str):  # jsonb comes back as text from raw queries
+        payload = json.loads(payload)
+    return json.dumps({"id": str(row["id"]), "command_type": row["command_type"], "payload": payload})
+
+
+def command_publication(prefix: str, row: dict[str, Any]) -> tuple[str, str]:
+    """Topic and message of a command; ValueError when it cannot be sent"""
+    for part in (row["serial"], row["channel"] or row["actuator_name"]):
+        if not part or "/" in part:
+            raise ValueError(f"invalid topic level: {part!r}")
+    # rejects the MQTT wildcards (+ #) and over-long topics, as the publish would
+    topic = aiomqtt.Topic(command_topic(prefix, row)).value
+    return topic, command_message(row)
+
+
+def parse_ack(serial: str, raw: bytes) -> tuple[UUID, str, Optional[str], str]:
+    """(command id, acked|failed, error, device serial) from an ack payload"""
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("ack must be an object")
+    ok = data.get("ok", True) is not False
+    error = None if ok else str(data.get("error") or "device_error")[:200]
+    return UUID(str(data["id"])), "acked" if ok else "failed", error, serial
+
+
+class CommandDispatcher:
+    def __init__(self, *, batch_size: int) -> None:
+        self.batch_size = batch_size
+        self.prefix = settings.mqtt_topic_prefix.strip("/")
+        self.wake = asyncio.Event()
+        self.acks: asyncio.Queue[QueuedAck] = asyncio.Queue(maxsize=ACK_QUEUE_SIZE)
+
+    # ----- sending -----
+    async def _dispatch_actuator(self, client: aiomqtt.Client, rows: list[dict[str, Any]]) -> tuple[int, int]:
+        """
+        Publishes the commands of one actuator one after the other (each waits for its
+        PUBACK) and records them as soon as the actuator is done, whatever happens to the
+        other actuators of the batch. Commands that cannot be sent are marked failed; a
+        broker error stops the actuator, its remaining commands stay queued and in order.
+        Returns (sent, failed).
+        """
+        db = connections.get(Command._meta.default_connection)
+        sent: list[UUID] = []
+        failed: list[tuple[UUID, str]] = []
+        try:
+            for row in rows:
+                try:
+                    topic, message = command_publication(self.prefix, row)
+                    await client.publish(topic, message, qos=1, timeout=PUBLISH_TIMEOUT_SECONDS)
+                except (ValueError, TypeError) as e:  # rejected before reaching the broker
+                    failed.append((row["id"], str(e)[:200]))
+                    continue
+                sent.append(row["id"])
+        finally:
+            if sent:
+                await db.execute_query(CommandQuerys.MARK_SENT, [sent])
+            if failed:
+                await db.execute_query(CommandQuerys.MARK_FAILED, [list(x) for x in zip(*failed)])
+        return len(sent), len(failed)
+
+    async def dispatch_batch(self, client: aiomqtt.Client) -> int:
+        """
+        Locks up to batch_size actuators with queued commands, coalesces their set_state
+        commands and sends the rest. Returns the actuators locked.
+        """
+        db = connections.get(Command._meta.default_connection)
+        # the transaction only holds the advisory locks of the actuators: the commands are
+        # read and updated outside it, so no row stays locked while publishing
+        async with in_transaction(Command._meta.default_connection) as lock:
+            locked = await lock.execute_query_dict(CommandQuerys.LOCK_ACTUATORS, [self.batch_size])
+            if not locked:
+                return 0
+            actuator_ids = [r["id"] for r in locked]
+            superseded, _ = await db.execute_query(CommandQuerys.SUPERSEDE_QUEUED, [actuator_ids])
+            rows = await db.execute_query_dict(CommandQuerys.CLAIM_QUEUED, [actuator_ids])
+
+            by_actuator: dict[UUID, list[dict[str, Any]]] = {}
+            for row in rows:
+                by_actuator.setdefault(row["actuator_id"], []).append(row)
+            results = await asyncio.gather(
+                *(self._dispatch_actuator(client, x) for x in by_actuator.values()),
+                return_exceptions=True,
+            )
+
+        sent = failed = 0
+        errors = []
+        for r in results:
+            if isinstance(r, BaseException):
+                errors.append(r)
+            else:
+                sent += r[0]
+                failed += r[1]
+        log.info("commands.sent", extra={"commands": sent, "superseded": superseded, "actuators": len(locked)})
+        if failed:
+            log.warning("commands.unsendable", extra={"commands": failed})
+        if errors:
+            # a lost broker connection first, so run() reconnects
+            raise ([e for e in errors if isinstance(e, aiomqtt.MqttError)] or errors)[0]
+        return len(locked)
+
+    async def dispatch_loop(self, client: aiomqtt.Client) -> None:
+        while True:
+            # cleared before claiming: a NOTIFY arriving meanwhile triggers another round
+            self.wake.clear()
+            try:
+                if await self.dispatch_batch(client) == self.batch_size:
+                    continue
+            except aiomqtt.MqttError:
+                raise
+            except Exception:
+                # rolled back: the commands are still queued for the next round
+                log.exception("commands.dispatch_failed")
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=settings.command_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    # ----- acks -----
+    async def receive_acks(self, client: aiomqtt.Client) -> None:
+        paho_client = client._client
+        async for message in client.messages:
+            # unreadable messages are queued too, so the broker gets its acks in order
+            done = functools.partial(paho_client.ack, message.mid, message.qos)
+            ack = None
+            parts = message.topic.value[len(self.prefix) + 1:].split("/")
+            if len(parts) == 3 and parts[1] == "ack":
+                try:
+                    ack = parse_ack(parts[0], message.payload)
+                except (ValueError, TypeError, KeyError):
+                    log.warning("commands.bad_ack", extra={"topic": message.topic.value})
+            await self.acks.put((ack, done))
+
+    async def write_acks(self) -> None:
+        """Writes the acks as they come, batching the ones that queue up meanwhile"""
+        db = connections.get(Command._meta.default_connection)
+        while True:
+            batch = [await self.acks.get()]
+            while len(batch) < ACK_BATCH_SIZE and not self.acks.empty():
+                batch.append(self.acks.get_nowait())
+            acks = [ack for ack, _ in batch if ack is not None]
+            try:
+                if acks:
+                    await db.execute_query(CommandQuerys.APPLY_ACKS, [list(x) for x in zip(*acks)])
+            except Exception:
+                log.exception("commands.ack_failed", extra={"acks": len(acks)})
+            for _, done in batch:
+                done()
+
+    async def expire_loop(self) -> None:
+        timeout = timedelta(seconds=settings.command_ack_timeout_seconds)
+        db = connections.get(Command._meta.default_connection)
+        while True:
+            try:
+                expired, _ = await db.execute_query(CommandQuerys.EXPIRE_UNACKED, [timeout])
+                if expired:
+                    log.warning("commands.ack_timeout", extra={"commands": expired})
+            except Exception:
+                log.exception("commands.expire_failed")
+            await asyncio.sleep(settings.command_poll_seconds)
+
+    # ----- MQTT session -----
+    async def run(self) -> None:
+        group = settings.command_shared_group.strip("/")
+        subscription = f"$share/{group}/{self.prefix}/+/ack/+" if group else f"{self.prefix}/+/ack/+"
+        properties = Properties(PacketTypes.CONNECT)
+        properties.ReceiveMaximum = ACK_QUEUE_SIZE
+        properties.SessionExpiryInterval = SESSION_EXPIRY_SECONDS
+        delay = 1.0
+        while True:
+            try:
+                client = aiomqtt.Client(
+                    settings.mqtt_host,
+                    settings.mqtt_port,
+                    username=settings.mqtt_username,
+                    password=settings.mqtt_password,
+                    # stable per host, so the broker keeps the acks of a restarted dispatcher
+                    identifier=f"sentinel-dispatcher-{socket.gethostname()}",
+                    protocol=aiomqtt.ProtocolVersion.V5,
+                    clean_start=False,
+                    properties=properties,
+                    # bounded by the Receive Maximum; a full queue would discard messages
+                    max_queued_incoming_messages=0,
+                )
+                # acks are sent once written (write_acks), not on arrival
+                client._client.manual_ack_set(True)
+                async with client:
+                    await client.subscribe(subscription, qos=1)
+                    log.info("MQTT connected", extra={"host": settings.mqtt_host, "topic": subscription})
+                    delay = 1.0
+                    tasks = [
+                        asyncio.create_task(self.dispatch_loop(client)),
+                        asyncio.create_task(self.receive_acks(client)),
+                    ]
+                    try:
+                        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                        for t in done:
+                            t.result()
+                    finally:
+                        for t in tasks:
+                            t.cancel()
+                        await asyncio.gather(*tasks, return_exceptions=True)
+
+            except aiomqtt.MqttError as e:
+                log.warning("MQTT connection lost", extra={"error": str(e), "retry_in": delay})
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+
+async def main() -> None:
+    configure_logging()
+    db = DbContext()
+    await db.init(generate_schemas=False)
+    log.info("DB initialized")
+
+    dispatcher = CommandDispatcher(batch_size=settings.command_batch_size)
+
+    async def wake_up() -> None:
+        dispatcher.wake.set()  # (re)connected: commands queued meanwhile were not notified
+
+    listener = PgListener({COMMANDS_CHANNEL: lambda _: dispatcher.wake.set()}, on_connect=wake_up)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    tasks = [
+        asyncio.create_task(listener.run()),
+        asyncio.create_task(dispatcher.run()),
+        asyncio.create_task(dispatcher.write_acks()),
+        asyncio.create_task(dispatcher.expire_loop()),
+    ]
+    try:
+        # a crashed task stops the worker too, so the orchestrator can restart it
+        await asyncio.wait([asyncio.create_task(stop.wait()), *tasks], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await db.close()
+        log.info("DB connections closed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
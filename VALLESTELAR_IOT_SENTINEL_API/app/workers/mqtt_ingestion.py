@@ -0,0 +1,441 @@
+# app/workers/mqtt_ingestion.py
+"""
+MQTT -> Postgres ingestion worker.
+
+Runs as its own process (python -m app.workers.mqtt_ingestion), subscribes to
+    <MQTT_TOPIC_PREFIX>/<device serial>/<sensor name>
+and writes the readings into sensor_readings_5m in micro-batches (the rule evaluator worker
+reads them back from there).
+
+Accepted payloads:
+    12.5
+    {"value": 12.5, "ts": "2025-01-01T10:00:00Z", "quality": "ok", "meta": {...}}
+    [{"value": 12.5, "ts": ...}, ...]      (gateway flushing its buffer)
+
+Several workers can run at once: each has its own client id and they join the shared
+subscription INGEST_SHARED_GROUP, so the broker splits the readings between them.
+
+Backpressure: QoS 1 messages are acked only once their readings are stored (or rejected),
+in the order they arrived. The client connects with MQTT 5 and a Receive Maximum of
+INGEST_MAX_UNACKED, so the broker stops sending while that many are unacked: a slow database
+slows down the broker instead of growing memory, and messages received but not stored when
+the worker dies are delivered again (persistent session, duplicates are ignored).
+"""
+from __future__ import annotations
+
+from dotenv import load_dotenv, find_dotenv
+load_dotenv(find_dotenv())
+
+import asyncio
+import json
+import logging
+import math
+import signal
+import socket
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+import aiomqtt
+import asyncpg
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+from tortoise.exceptions import DBConnectionError, IntegrityError, OperationalError
+
+from app.core.config import settings
+from app.core.logging import configure_logging
+from app.dbs.postgres.context import DbContext
+from app.models.entities import Sensor, SensorReading
+from app.services.service_factory import service_factory
+
+log = logging.getLogger("app.mqtt_ingestion")
+
+# Unknown topics are remembered for a while so they do not hit the DB on every message
+NEGATIVE_CACHE_SECONDS = 60.0
+# Bounds of a payload, checked before anything reaches the database
+MAX_READINGS_PER_MESSAGE = 1000
+MAX_QUALITY_LENGTH = 20  # sensor_readings_5m.quality is VARCHAR(20)
+MAX_META_BYTES = 4096
+# Seconds between two ingest.throttled warnings
+BACKLOG_LOG_SECONDS = 60.0
+# The broker keeps the session (subscription and unacked messages) of a disconnected worker
+SESSION_EXPIRY_SECONDS = 24 * 3600
+# Largest Receive Maximum of MQTT 5
+MAX_RECEIVE_MAXIMUM = 65535
+
+# Errors of rows the database does not take (constraint, value out of range, text jsonb
+# rejects...): the batch is halved around them. asyncpg's own DataError (an argument it
+# cannot encode) is a ValueError; tortoise does not translate every PostgresError.
+REJECTED_ROW_ERRORS = (IntegrityError, OperationalError, asyncpg.PostgresError, ValueError)
+
+# Errors worth retrying the same batch for: the database is unreachable or restarting, or
+# the transaction lost a race. Anything else is about the rows themselves.
+TRANSIENT_DB_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    DBConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.TransactionRollbackError,
+    asyncpg.OperatorInterventionError,
+)
+
+
+class SensorTopicResolver:
+    """
+    Maps (device serial, sensor name) to the ids a reading row needs.
+    Sensors are looked up once and cached for the life of the process.
+    """
+
+    def __init__(self) -> None:
+        self._cache: dict[tuple[str, str], dict[str, Any]] = {}
+        self._unknown: dict[tuple[str, str], float] = {}
+
+    async def resolve(self, serial: str, name: str) -> Optional[dict[str, Any]]:
+        key = (serial, name)
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+
+        missed_at = self._unknown.get(key)
+        if missed_at is not None and time.monotonic() - missed_at < NEGATIVE_CACHE_SECONDS:
+            return None
+
+        rows = await Sensor.filter(device__serial=serial, name=name, is_enabled=True).values(
+            "id", "tenant_id", "site_id"
+        )
+        if not rows:
+            self._unknown[key] = time.monotonic()
+            return None
+
+        row = rows[0]
+        hit = {"sensor_id": row["id"], "tenant_id": row["tenant_id"], "site_id": row["site_id"]}
+        self._cache[key] = hit
+        self._unknown.pop(key, None)
+        return hit
+
+    def forget(self, sensor_id: Any) -> None:
+        """Drops a cached sensor (deleted since it was resolved): the next message looks it up again"""
+        for key in [k for k, v in self._cache.items() if v["sensor_id"] == sensor_id]:
+            del self._cache[key]
+
+
+def _parse_ts(ts: Any) -> datetime:
+    if ts is None:
+        return datetime.now(timezone.utc)
+    if not isinstance(ts, str):
+        raise ValueError("ts must be an ISO 8601 string")
+    parsed = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _parse_value(value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError("value must be a finite number")
+    try:
+        x = float(value)  # OverflowError for an int beyond the float range
+    except (OverflowError, ValueError):
+        raise ValueError("value must be a finite number")
+    if not math.isfinite(x):
+        raise ValueError("value must be a finite number")
+    return x
+
+
+def _check_meta(meta: Any) -> None:
+    if not isinstance(meta, dict):
+        raise ValueError("meta must be an object")
+    try:
+        # as jsonb will store it: no NaN/Infinity, no NUL character
+        encoded = json.dumps(meta, allow_nan=False)
+    except (ValueError, TypeError, RecursionError):
+        raise ValueError("meta must be valid JSON")
+    if len(encoded) > MAX_META_BYTES or "\\u0000" in encoded:
+        raise ValueError(f"meta must be an object of at most {MAX_META_BYTES} bytes, without NUL characters")
+
+
+def parse_payload(raw: bytes) -> list[dict[str, Any]]:
+    """
+    Returns the reading fields (value, ts, quality, meta) found in an MQTT payload.
+    Raises ValueError, and only ValueError, for anything the reading columns would not take.
+    """
+    try:
+        data = json.loads(raw)
+    except (ValueError, TypeError, RecursionError):
+        # ValueError also covers integers of more than sys.get_int_max_str_digits() digits
+        raise ValueError("payload is not JSON")
+    items = data if isinstance(data, list) else [data]
+    if len(items) > MAX_READINGS_PER_MESSAGE:
+        raise ValueError(f"more than {MAX_READINGS_PER_MESSAGE} readings")
+
+    out: list[dict[str, Any]] = []
+    for item in items:
+        if isinstance(item, (int, float)) and not isinstance(item, bool):
+            item = {"value": item}
+        if not isinstance(item, dict) or "value" not in item:
+            raise ValueError("reading without value")
+
+        value = _parse_value(item["value"])
+        quality = item.get("quality") or "ok"
+        if not isinstance(quality, str) or len(quality) > MAX_QUALITY_LENGTH or "\x00" in quality:
+            raise ValueError(f"quality must be a string of at most {MAX_QUALITY_LENGTH} characters")
+        meta = item.get("meta") or {}
+        _check_meta(meta)
+
+        out.append({"value": value, "ts": _parse_ts(item.get("ts")), "quality": quality, "meta": meta})
+    return out
+
+
+# a reading waiting to be written, with the callback that acks its message
+QueuedReading = tuple[dict[str, Any], Optional[Callable[[], None]]]
+
+
+class AckTracker:
+    """
+    Acks the QoS 1 messages of one connection once all their readings are flushed, in the
+    order they were received (MQTT requires PUBACKs in that order).
+    """
+
+    def __init__(self, ack: Callable[[int, int], Any]) -> None:
+        self._ack = ack
+        self._pending: deque[list[int]] = deque()  # [mid, qos, readings not flushed yet]
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def track(self, mid: int, qos: int, readings: int) -> Callable[[], None]:
+        """Registers a message; the returned callback is called once per flushed reading"""
+        entry = [mid, qos, readings]
+        self._pending.append(entry)
+        self._release()
+
+        def done() -> None:
+            entry[2] -= 1
+            self._release()
+        return done
+
+    def _release(self) -> None:
+        while self._pending and self._pending[0][2] <= 0:
+            mid, qos, _ = self._pending.popleft()
+            if qos > 0:
+                self._ack(mid, qos)
+
+
+class ReadingBatcher:
+    """
+    Bounded queue between the MQTT loop and Postgres.
+    - put() waits when the queue is full, so a slow database slows down consumption
+      from the broker instead of growing memory
+    - run() flushes every `batch_size` readings or `flush_seconds`, whatever comes first,
+      then calls the `ack` of each reading flushed
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int,
+        flush_seconds: float,
+        queue_size: int,
+        resolver: Optional[SensorTopicResolver] = None,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue: asyncio.Queue[QueuedReading] = asyncio.Queue(maxsize=queue_size)
+        self.svc = service_factory.get(SensorReading)
+        self.resolver = resolver
+        self._inflight: list[QueuedReading] = []
+
+    async def put(self, row: dict[str, Any], ack: Optional[Callable[[], None]] = None) -> None:
+        await self.queue.put((row, ack))
+
+    async def _next_batch(self) -> list[QueuedReading]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _upsert(self, rows: list[dict[str, Any]]) -> None:
+        # MQTT QoS 1 may redeliver: duplicates on (sensor_id, ts) are ignored
+        delay = 0.5
+        while True:
+            try:
+                result = await self.svc.bulk_upsert(rows, on_conflict="ignore")
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug(
+                        "ingest.flush",
+                        extra={"rows": len(rows), "inserted": result.inserted, "skipped": result.skipped},
+                    )
+                return
+            except TRANSIENT_DB_ERRORS as e:
+                if isinstance(e, ValueError):
+                    raise  # asyncpg DataError: an InterfaceError about the rows, not the connection
+                log.exception("ingest.flush_failed", extra={"rows": len(rows), "retry_in": delay})
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    async def _write(self, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Writes the rows, halving the batch around the ones the database rejects (a sensor
+        deleted since it was resolved, a value out of range...). Returns the rows stored.
+        """
+        try:
+            await self._upsert(rows)
+            return rows
+        except REJECTED_ROW_ERRORS as e:
+            if len(rows) > 1:
+                mid = len(rows) // 2
+                return await self._write(rows[:mid]) + await self._write(rows[mid:])
+            row = rows[0]
+            log.error(
+                "ingest.rejected",
+                extra={"sensor_id": str(row["sensor_id"]), "ts": row["ts"].isoformat(), "error": str(e)[:200]},
+            )
+            if isinstance(e, IntegrityError) and self.resolver is not None:
+                self.resolver.forget(row["sensor_id"])
+            return []
+
+    async def flush(self, batch: list[QueuedReading]) -> None:
+        await self._write([row for row, _ in batch])
+        for _, ack in batch:
+            if ack is not None:
+                ack()
+
+    async def run(self) -> None:
+        while True:
+            self._inflight = await self._next_batch()
+            await self.flush(self._inflight)
+            self._inflight = []
+
+    async def drain(self) -> None:
+        # the batch interrupted by shutdown is written again (duplicates are ignored); the
+        # connection is closed by then, the broker sends the unacked messages again
+        batch, self._inflight = self._inflight, []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+            if len(batch) >= self.batch_size:
+                await self.flush(batch)
+                batch = []
+        if batch:
+            await self.flush(batch)
+
+
+async def _readings(message: aiomqtt.Message, prefix: str, resolver: SensorTopicResolver) -> list[dict[str, Any]]:
+    """Reading rows of a message; none for unknown topics and invalid payloads"""
+    parts = message.topic.value[len(prefix) + 1:].split("/")
+    if len(parts) != 2:
+        return []
+    sensor = await resolver.resolve(parts[0], parts[1])
+    if sensor is None:
+        return []
+    try:
+        readings = parse_payload(message.payload)
+    except ValueError:
+        log.warning("ingest.bad_payload", extra={"topic": message.topic.value})
+        return []
+    except Exception:
+        # a bug in parsing must not let one message stop the worker
+        log.exception("ingest.bad_payload", extra={"topic": message.topic.value})
+        return []
+    return [{**sensor, **reading} for reading in readings]
+
+
+async def consume(batcher: ReadingBatcher, resolver: SensorTopicResolver) -> None:
+    prefix = settings.mqtt_topic_prefix.strip("/")
+    group = settings.ingest_shared_group.strip("/")
+    subscription = f"$share/{group}/{prefix}/+/+" if group else f"{prefix}/+/+"
+    receive_maximum = max(1, min(settings.ingest_max_unacked, MAX_RECEIVE_MAXIMUM))
+    properties = Properties(PacketTypes.CONNECT)
+    properties.ReceiveMaximum = receive_maximum
+    properties.SessionExpiryInterval = SESSION_EXPIRY_SECONDS
+    delay = 1.0
+    throttled_logged = 0.0
+    while True:
+        try:
+            client = aiomqtt.Client(
+                settings.mqtt_host,
+                settings.mqtt_port,
+                username=settings.mqtt_username,
+                password=settings.mqtt_password,
+                # stable per host, so a restarted worker gets its session back, and unique, so
+                # a second worker does not take the session (and connection) of the first
+                identifier=f"sentinel-ingestion-{socket.gethostname()}",
+                protocol=aiomqtt.ProtocolVersion.V5,
+                clean_start=False,
+                properties=properties,
+                # QoS 1 messages are bounded by the Receive Maximum; a full queue would
+                # discard messages that then could never be acked in order
+                max_queued_incoming_messages=0,
+            )
+            # aiomqtt has no option for it: without it paho acks QoS 1 messages on arrival
+            paho_client = client._client
+            paho_client.manual_ack_set(True)
+            acks = AckTracker(paho_client.ack)
+
+            async with client:
+                await client.subscribe(subscription, qos=1)
+                log.info("MQTT subscribed", extra={"host": settings.mqtt_host, "topic": subscription})
+                delay = 1.0
+
+                async for message in client.messages:
+                    if len(acks) >= receive_maximum and time.monotonic() - throttled_logged > BACKLOG_LOG_SECONDS:
+                        # the broker waits for acks: the database is the bottleneck
+                        throttled_logged = time.monotonic()
+                        log.warning("ingest.throttled", extra={"unacked": len(acks)})
+                    readings = await _readings(message, prefix, resolver)
+                    done = acks.track(message.mid, message.qos, len(readings))
+                    for reading in readings:
+                        await batcher.put(reading, done)
+
+        except aiomqtt.MqttError as e:
+            log.warning("MQTT connection lost", extra={"error": str(e), "retry_in": delay})
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+async def main() -> None:
+    configure_logging()
+    db = DbContext()
+    await db.init(generate_schemas=False)
+    log.info("DB initialized")
+
+    resolver = SensorTopicResolver()
+    batcher = ReadingBatcher(
+        batch_size=settings.ingest_batch_size,
+        flush_seconds=settings.ingest_flush_seconds,
+        queue_size=settings.ingest_queue_size,
+        resolver=resolver,
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    tasks = [
+        asyncio.create_task(consume(batcher, resolver)),
+        asyncio.create_task(batcher.run()),
+    ]
+    try:
+        # a crashed task stops the worker too, so the orchestrator can restart it
+        await asyncio.wait([asyncio.create_task(stop.wait()), *tasks], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await batcher.drain()
+        await db.close()
+        log.info("DB connections closed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
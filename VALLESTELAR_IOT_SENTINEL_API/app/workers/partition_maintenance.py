@@ -0,0 +1,69 @@
+# app/workers/partition_maintenance.py
+"""
+Partition maintenance worker for sensor_readings_5m.
+
+Runs as its own process (python -m app.workers.partition_maintenance). Every
+PARTITION_MAINTENANCE_INTERVAL_SECONDS it:
+- creates the monthly partitions of the next PARTITION_MONTHS_AHEAD months
+- applies the retention per tenant plan (RETENTION_DAYS_BY_PLAN)
+
+Does nothing while the table is not partitioned (see app/dbs/postgres/partitions.py).
+"""
+from __future__ import annotations
+
+from dotenv import load_dotenv, find_dotenv
+load_dotenv(find_dotenv())
+
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.core.logging import configure_logging
+from app.dbs.postgres import partitions
+from app.dbs.postgres.context import DbContext
+
+log = logging.getLogger("app.partition_maintenance")
+
+
+async def run_once(db_context: DbContext) -> None:
+    db = db_context.get_connection()
+    if not await partitions.is_partitioned(db):
+        log.warning("partition.not_partitioned", extra={"table": partitions.TABLE})
+        return
+    created = await partitions.ensure_partitions(db, settings.partition_months_ahead)
+    retention = await partitions.apply_retention(db, partitions.parse_retention(settings.retention_days_by_plan))
+    log.info("partition.maintenance", extra={"created": created, **retention})
+
+
+async def main() -> None:
+    configure_logging()
+    db = DbContext()
+    await db.init(generate_schemas=False)
+    log.info("DB initialized")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        while not stop.is_set():
+            try:
+                await run_once(db)
+            except Exception:
+                log.exception("partition.maintenance_failed")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.partition_maintenance_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await db.close()
+        log.info("DB connections closed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,232 @@
+# app/workers/rollups.py
+"""
+Rollup worker: keeps the aggregates of sensor_readings_5m up to date.
+- sensor_readings_1h / sensor_readings_1d: count/sum/min/max/avg/last per sensor and bucket
+- daily_metrics: per-site business metrics
+
+Runs as its own process (python -m app.workers.rollups). Every ROLLUP_INTERVAL_SECONDS each
+job looks at the readings written since its last run (job watermark on updated_at, so
+corrections count as well as new readings) and the readings deleted since then
+(sensor_reading_deletions), finds the buckets they touch and recomputes those buckets only.
+Buckets left without valid readings lose their rollup rows and metrics.
+
+Metric keys (one row per site, day and key):
+    tank:<tank id>:consumption_liters      sum of the level drops x capacity
+    zone:<zone id>:irrigation_minutes      time with flow > 0
+    energy:<system id>:solar_wh            integral of the solar power
+    energy:<system id>:battery_v_min|max   battery voltage range
+"""
+from __future__ import annotations
+
+from dotenv import load_dotenv, find_dotenv
+load_dotenv(find_dotenv())
+
+import asyncio
+import logging
+import signal
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from tortoise.transactions import in_transaction
+
+from app.core.config import settings
+from app.core.logging import configure_logging
+from app.dbs.postgres.context import DbContext
+from app.dbs.postgres.queries.rollups.rollup_queries import RollupQuerys
+from app.models.entities import DailyMetric, EnergySystem, IrrigationZone, SensorReading, Site, Tank
+from app.repositories.job_watermark_repository import (
+    DAILY_METRICS_ROLLUP_JOB,
+    EPOCH,
+    SENSOR_READINGS_ROLLUP_JOB,
+    get_watermark,
+    set_watermark,
+)
+from app.services.service_factory import service_factory
+
+log = logging.getLogger("app.rollups")
+
+# Longest gap between two readings that still counts as continuous (readings are every 5 minutes)
+MAX_READING_GAP = timedelta(minutes=15)
+
+
+class SensorReadingRollup:
+    """Hourly and daily per-sensor rollup tables, driven by the updated_at of the readings"""
+
+    job_name = SENSOR_READINGS_ROLLUP_JOB
+
+    async def run_once(self) -> None:
+        since = await get_watermark(self.job_name) or EPOCH
+        until = datetime.now(timezone.utc) - timedelta(seconds=settings.rollup_lag_seconds)
+        if until <= since:
+            return
+
+        # hourly first (the daily rows are built from it); both or none, with the watermark
+        async with in_transaction(SensorReading._meta.default_connection) as conn:
+            await conn.execute_query(RollupQuerys.UPSERT_HOURLY, [since, until])
+            await conn.execute_query(RollupQuerys.UPSERT_DAILY, [since, until])
+            await set_watermark(self.job_name, until)
+        log.info("rollup.sensor_readings", extra={"watermark": until.isoformat()})
+
+
+class DailyMetricRollup:
+    """Incremental daily_metrics rollup, driven by the updated_at of the readings"""
+
+    job_name = DAILY_METRICS_ROLLUP_JOB
+
+    def __init__(self) -> None:
+        self.svc = service_factory.get(DailyMetric)
+
+    async def run_once(self) -> int:
+        since = await get_watermark(self.job_name) or EPOCH
+        until = datetime.now(timezone.utc) - timedelta(seconds=settings.rollup_lag_seconds)
+        if until <= since:
+            return 0
+
+        db = SensorReading._meta.db
+        touched = await db.execute_query_dict(RollupQuerys.AFFECTED_SITE_DAYS, [since, until])
+        days_by_site: dict[UUID, set[date]] = defaultdict(set)
+        for row in touched:
+            days_by_site[row["site_id"]].add(row["metric_date"])
+
+        written = 0
+        for site_id, days in days_by_site.items():
+            written += await self.rollup_site(site_id, days)
+
+        await set_watermark(self.job_name, until)
+        log.info("rollup.daily_metrics", extra={"sites": len(days_by_site), "metrics": written, "watermark": until.isoformat()})
+        return written
+
+    async def rollup_site(self, site_id: UUID, days: set[date]) -> int:
+        site = await Site.get_or_none(id=site_id)
+        if site is None:
+            return 0
+
+        tanks = await Tank.filter(site_id=site_id, sensor_level_id__isnull=False).values(
+            "id", "name", "capacity_liters", "sensor_level_id"
+        )
+        zones = await IrrigationZone.filter(site_id=site_id, sensor_flow_id__isnull=False).values(
+            "id", "name", "sensor_flow_id"
+        )
+        systems = await EnergySystem.filter(site_id=site_id).values(
+            "id", "name", "sensor_battery_voltage_id", "sensor_solar_power_id"
+        )
+
+        sensor_ids = {t["sensor_level_id"] for t in tanks} | {z["sensor_flow_id"] for z in zones}
+        for s in systems:
+            sensor_ids.update(x for x in (s["sensor_battery_voltage_id"], s["sensor_solar_power_id"]) if x)
+        if not sensor_ids:
+            return 0
+
+        tz = ZoneInfo(site.timezone)
+        start = datetime.combine(min(days), time.min, tzinfo=tz)
+        end = datetime.combine(max(days) + timedelta(days=1), time.min, tzinfo=tz)
+        rows = await SensorReading._meta.db.execute_query_dict(
+            RollupQuerys.DAILY_SENSOR_STATS,
+            [list(sensor_ids), start, end, site.timezone, MAX_READING_GAP],
+        )
+        stats = {(r["sensor_id"], r["metric_date"]): r for r in rows if r["metric_date"] in days}
+
+        metrics: list[dict[str, Any]] = []
+
+        def add(day: date, key: str, value: Optional[float], meta: dict[str, Any]) -> None:
+            if value is None:
+                return
+            metrics.append({
+                "tenant_id": site.tenant_id,
+                "site_id": site_id,
+                "metric_date": day,
+                "metric_key": key,
+                "value": float(value),
+                "meta": meta,
+            })
+
+        for day in sorted(days):
+            for t in tanks:
+                st = stats.get((t["sensor_level_id"], day))
+                if st:
+                    liters = st["total_drop"] * t["capacity_liters"] / 100
+                    add(day, f"tank:{t['id']}:consumption_liters", liters, {"tank": t["name"], "samples": st["samples"]})
+            for z in zones:
+                st = stats.get((z["sensor_flow_id"], day))
+                if st:
+                    add(day, f"zone:{z['id']}:irrigation_minutes", st["active_minutes"], {"zone": z["name"], "samples": st["samples"]})
+            for s in systems:
+                st = stats.get((s["sensor_solar_power_id"], day))
+                if st:
+                    add(day, f"energy:{s['id']}:solar_wh", st["value_hours"], {"system": s["name"], "samples": st["samples"]})
+                st = stats.get((s["sensor_battery_voltage_id"], day))
+                if st:
+                    add(day, f"energy:{s['id']}:battery_v_min", st["min_value"], {"system": s["name"], "samples": st["samples"]})
+                    add(day, f"energy:{s['id']}:battery_v_max", st["max_value"], {"system": s["name"], "samples": st["samples"]})
+
+        if metrics:
+            await self.svc.bulk_upsert(metrics, on_conflict="update")
+
+        # metrics of days left without valid readings (all invalid or deleted) are removed
+        keys = [f"tank:{t['id']}:consumption_liters" for t in tanks]
+        keys += [f"zone:{z['id']}:irrigation_minutes" for z in zones]
+        for s in systems:
+            if s["sensor_solar_power_id"]:
+                keys.append(f"energy:{s['id']}:solar_wh")
+            if s["sensor_battery_voltage_id"]:
+                keys += [f"energy:{s['id']}:battery_v_min", f"energy:{s['id']}:battery_v_max"]
+        written = {(m["metric_date"], m["metric_key"]) for m in metrics}
+        for day in sorted(days):
+            stale = [k for k in keys if (day, k) not in written]
+            if stale:
+                await DailyMetric.filter(site_id=site_id, metric_date=day, metric_key__in=stale).delete()
+        return len(metrics)
+
+
+class ReadingDeletionPurge:
+    """Removes the sensor_reading_deletions rows both rollups have already processed"""
+
+    job_name = "sensor_reading_deletions_purge"
+
+    async def run_once(self) -> None:
+        watermarks = [await get_watermark(SENSOR_READINGS_ROLLUP_JOB), await get_watermark(DAILY_METRICS_ROLLUP_JOB)]
+        if None in watermarks:
+            return
+        await SensorReading._meta.db.execute_query(RollupQuerys.PURGE_DELETIONS, [min(watermarks)])
+
+
+async def run_forever(jobs: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        for job in jobs:
+            try:
+                await job.run_once()
+            except Exception:
+                # the watermark was not advanced: the same readings are retried next run
+                log.exception("rollup.failed", extra={"job": job.job_name})
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.rollup_interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main() -> None:
+    configure_logging()
+    db = DbContext()
+    await db.init(generate_schemas=False)
+    log.info("DB initialized")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await run_forever([SensorReadingRollup(), DailyMetricRollup(), ReadingDeletionPurge()], stop)
+    finally:
+        await db.close()
+        log.info("DB connections closed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
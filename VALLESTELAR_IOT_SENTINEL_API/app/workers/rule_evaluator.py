@@ -0,0 +1,151 @@
+# app/workers/rule_evaluator.py
+"""
+Rule evaluator worker: the only process that runs the rule engine (services/rule_engine.py).
+
+Runs as its own process (python -m app.workers.rule_evaluator). The engine keeps windows,
+durations and active rules in memory, so every reading of a sensor has to reach the same
+engine, whatever path stored it (API, one of several MQTT ingestion workers...). Instead of
+evaluating where readings are written, this worker reads them back from sensor_readings_5m:
+every RULE_POLL_SECONDS the readings of the sensors referenced by the enabled rules written
+since the previous poll (keyset on updated_at, id).
+
+Readings are only read once they are COMMIT_LAG old, so a batch whose updated_at was set just
+before a slower commit is not skipped. Corrections of a reading already seen (same sensor and
+ts) do not change the engine state.
+
+Several instances can run: a session advisory lock elects the one that evaluates, the others
+wait for it. The worker stops if it loses the lock (its connection), so the orchestrator
+restarts it as a standby.
+"""
+from __future__ import annotations
+
+from dotenv import load_dotenv, find_dotenv
+load_dotenv(find_dotenv())
+
+import asyncio
+import logging
+import signal
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+import asyncpg
+from tortoise import connections
+
+from app.core.config import settings
+from app.core.logging import configure_logging
+from app.dbs.postgres.context import DbContext
+from app.dbs.postgres.listener import dedicated_connection
+from app.dbs.postgres.queries.sensor_readings.sensor_reading_queries import SensorReadingQuerys
+from app.services.rule_engine import rule_engine
+
+log = logging.getLogger("app.rule_evaluator")
+
+LEADER_LOCK = "rule-evaluator"
+# Readings younger than this are left for the next poll (writes still committing)
+COMMIT_LAG = timedelta(seconds=2)
+# Readings read per query
+PAGE_SIZE = 5000
+
+ZERO_ID = UUID(int=0)
+
+
+class ReadingFeed:
+    """Readings written since the last call, for the sensors the engine has rules on"""
+
+    def __init__(self, since: datetime) -> None:
+        self.updated_at = since
+        self.id = ZERO_ID
+
+    async def poll(self) -> int:
+        sensor_ids = rule_engine.sensor_ids()
+        if not sensor_ids:
+            return 0
+        db = connections.get("default")
+        total = 0
+        while True:
+            rows = await db.execute_query_dict(
+                SensorReadingQuerys.WRITTEN_SINCE,
+                [self.updated_at, self.id, sensor_ids, COMMIT_LAG, PAGE_SIZE],
+            )
+            if not rows:
+                return total
+            await rule_engine.process(rows)
+            self.updated_at, self.id = rows[-1]["updated_at"], rows[-1]["id"]
+            total += len(rows)
+            if len(rows) < PAGE_SIZE:
+                return total
+
+
+async def acquire_leadership(stop: asyncio.Event) -> Optional[asyncpg.Connection]:
+    """Connection holding the leader lock, None if stopped while waiting for it"""
+    while not stop.is_set():
+        conn = await dedicated_connection()
+        if await conn.fetchval("SELECT pg_try_advisory_lock(hashtextextended($1, 0))", LEADER_LOCK):
+            return conn
+        await conn.close()
+        log.info("rules.standby")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.rule_poll_seconds * 10)
+        except asyncio.TimeoutError:
+            pass
+    return None
+
+
+async def run_forever(leader: asyncpg.Connection, stop: asyncio.Event) -> None:
+    lost = asyncio.Event()
+    leader.add_termination_listener(lambda _: lost.set())
+
+    await rule_engine.start()
+    since = await leader.fetchval("SELECT now()")
+    feed = ReadingFeed(since)
+    log.info("rules.evaluating", extra={"since": since.isoformat()})
+
+    while not stop.is_set():
+        if lost.is_set():
+            # another instance may take over: stop before two engines evaluate
+            raise RuntimeError("rule evaluator lost its leader lock connection")
+        try:
+            await feed.poll()
+        except Exception:
+            # the keyset was not advanced past the failed page: it is read again next poll
+            log.exception("rules.poll_failed")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.rule_poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main() -> None:
+    configure_logging()
+    db = DbContext()
+    await db.init(generate_schemas=False)
+    log.info("DB initialized")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    leader: Optional[asyncpg.Connection] = None
+    try:
+        if not settings.rule_engine_enabled:
+            log.warning("rules.disabled")
+            await stop.wait()
+            return
+        leader = await acquire_leadership(stop)
+        if leader is not None:
+            await run_forever(leader, stop)
+    finally:
+        await rule_engine.stop()
+        if leader is not None and not leader.is_closed():
+            await leader.close()
+        await db.close()
+        log.info("DB connections closed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())